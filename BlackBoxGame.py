@@ -6,61 +6,161 @@
 # is lost for each new entry/exit point. Behavior of the ray serves as an indicator of where the player should guess.
 # The goal is to correctly guess where each atom position is.
 
+import struct
+from functools import lru_cache
+from types import MappingProxyType
+
+from tracer import CellMap, legal_entries, grid_edge
+
+# snapshot header: magic, format version, board size, score, number of guesses off the board. It is followed by the
+# atom, found, guess, entry/exit and (from version 2) fired entry bitboards, (size * size + 7) // 8 little endian
+# bytes each, then one signed (row, column) pair per off the board guess
+_SNAPSHOT = struct.Struct('<2sBHhH')
+_MAGIC = b'BB'
+_VERSION = 2
+_BITBOARDS = {1: 4, 2: 5}  # bitboards stored by each format version
+_GUESS = struct.Struct('<ii')
+
 
 class BlackBoxGame:
     """Responsible for overall state of the game, creates new Player and Board object and atom positions.
     Interacts with Player class object to set/get player score, previous guesses, and previous entry/exit points.
     Interacts with Board class object to get board layout and set atom positions in place."""
 
-    def __init__(self, atom_positions):
+    __slots__ = ('_size', '_player', '_board', '_atom_positions', '_found', '_legal_entry', '_grid_edge',
+                 '_atom_on_grid_edge', '_double_deflection_squares', '_deflection_squares', '_reflection_squares',
+                 '_cell_map', '_exit_table', '_advisor', '_shots', '_owned')
+
+    def __init__(self, atom_positions, size=10, derived=None):
         """Initializes datamembers that create Player object and Board object with atom_positions. Initializes
         legal entry points, list of grid edges, list of atoms found to be within these grid edge positions,
         set of deflection and reflection squares and builds a set of all deflection, double deflection and
-        reflection squares with deflection_squares(), double_deflection_squares() and reflection_squares() methods."""
-        self._player = Player()  # creates Player class object
-        self._board = Board(atom_positions)  # creates Board class object
+        reflection squares with deflection_squares(), double_deflection_squares() and reflection_squares() methods.
+        The optional size sets the width and height of the board including the entry squares, 10 by default.
+        The optional derived takes a tuple from get_derived() of a game with the same atoms and size, whose square
+        sets and exit table are then shared instead of being built again."""
+        self._size = size
+        self._player = Player(size)  # creates Player class object
+        self._board = Board(atom_positions, size)  # creates Board class object
         self._atom_positions = atom_positions
-        self._atoms_left = dict()  # dictionary to track atoms remaining versus hit
-        for a in atom_positions:   # adds atoms to dictionary
-            self._atoms_left[a] = 'remaining'
-        self._legal_entry = [(0, 1), (0, 2), (0, 3), (0, 4), (0, 5), (0, 6), (0, 7), (0, 8), (1, 0), (2, 0), (3, 0),
-                             (4, 0), (5, 0), (6, 0), (7, 0), (8, 0), (1, 9), (2, 9), (3, 9), (4, 9), (5, 9), (6, 9),
-                             (7, 9), (8, 9), (9, 1), (9, 2), (9, 3), (9, 4), (9, 5), (9, 6), (9, 7), (9, 8)]
+        self._found = 0  # bitboard of atoms found, bit row * size + column
+        self._shots = 0  # bitboard of entry squares rays have been fired from
+        self._legal_entry = legal_entries(size)
         self._board.set_board(self._legal_entry)
-        self._grid_edge = [(1, 1), (1, 2), (1, 3), (1, 4), (1, 5), (1, 6), (1, 7), (1, 8), (2, 8), (3, 8), (4, 8),
-                           (5, 8), (6, 8), (7, 8), (2, 1), (3, 1), (4, 1), (5, 1), (6, 1), (7, 1), (8, 1), (8, 2),
-                           (8, 3), (8, 4), (8, 5), (8, 6), (8, 7), (8, 8)]
+        self._grid_edge = grid_edge(size)
         self._atom_on_grid_edge = [atom for atom in atom_positions if atom in self._grid_edge]
+        self._cell_map = None  # per-cell map for the loop based tracer, built by _get_cell_map() on first use
+        self._advisor = None  # ShotAdvisor for recommend_shots(), created on first use
+        self._owned = False  # True once add_atom() or remove_atom() has given the game its own copies to change
+        if derived is not None:
+            (self._reflection_squares, self._deflection_squares, self._double_deflection_squares,
+             self._exit_table) = derived
+            return
         self._double_deflection_squares = set()  # set to store tuples considered as double deflection squares
         self._deflection_squares = set()  # set to store tuples considered as deflection squares
         self._reflection_squares = set()  # set to store tuples considered as reflection squares
         self.reflection_squares()  # calls method to search for reflection squares
         self.deflection_squares()  # calls method to search for deflection squares
         self.double_deflection_squares()  # calls method to search for double deflection squares
+        self._exit_table = None  # entry -> exit lookup, built by _get_exit_table() on first use
 
     def shoot_ray(self, row, column):
         """Takes as parameters the row and column of the entry border square.
         If this is a corner square or a non-border square, will return False.
-        Otherwise, as helper function will kick off rec_shoot_ray() and return a tuple with (row,column) exit point."""
+        Otherwise, looks up the result in the precomputed exit table, adjusts the entry/exit score through
+        set_entry_exit() and returns a tuple with (row,column) exit point, or None if an atom was hit."""
         position = (row, column)
-        if position not in self._legal_entry:  # checks if entry is legal
-            return False
-        else:
-            return self.rec_shoot_ray(position, position)
+        table = self._get_exit_table()
+        if position not in table:
+            if position not in self._legal_entry:  # checks if entry is legal
+                return False
+            # ray could not be resolved when the table was built, trace it again to report it
+            self._player.set_entry_exit(position)
+            self._shots |= 1 << (row * self._size + column)
+            return self._get_cell_map().trace(row, column)
+        exit_point = table[position]
+        self._player.set_entry_exit(position)  # entry point is always used
+        self._shots |= 1 << (row * self._size + column)
+        if exit_point is not None:  # exit point is used unless the ray hit an atom
+            self._player.set_entry_exit(exit_point)
+        return exit_point
+
+    def trace_path(self, row, column):
+        """Takes as parameters the row and column of a legal entry square and returns a generator of the ray's
+        (event, (row, column)) pairs as described in CellMap.path(). The path is worked out lazily as it is read and
+        the score is not touched, so a path can be looked at before or after the ray is shot. Raises ValueError if
+        the square is not a legal entry."""
+        if (row, column) not in self._legal_entry:
+            raise ValueError('%s is not a legal entry square' % ((row, column),))
+        return self._get_cell_map().path(row, column)
+
+    def _get_exit_table(self):
+        """Returns the dictionary mapping every legal entry point to its exit point (None for a hit). The table is
+        built on first use by following each entry with the loop based tracer over a CellMap of the special squares
+        and is reused by every later shoot_ray() call. Entries whose ray cannot be resolved by the rules are left
+        out of the table."""
+        if self._exit_table is None:
+            cell_map = self._get_cell_map()
+            table = dict()
+            for entry in self._legal_entry:
+                try:
+                    table[entry] = cell_map.trace(entry[0], entry[1])
+                except RuntimeError:  # ray never reaches an exit, shoot_ray() reports it when fired
+                    pass
+            self._exit_table = table
+        return self._exit_table
+
+    def _get_cell_map(self):
+        """Returns the CellMap of the special squares the loop based tracer follows rays over, building it on first
+        use."""
+        if self._cell_map is None:
+            self._cell_map = CellMap(self._size, self._atom_positions, self._reflection_squares,
+                                     self._deflection_squares, self._double_deflection_squares)
+        return self._cell_map
+
+    def recommend_shots(self, k=3):
+        """Takes in the number of suggestions wanted and returns up to k (entry, expected bits, expected points)
+        tuples for entries not fired from yet, ranked by how much the ray is expected to reveal about the atoms for
+        each point it is expected to cost. Only rays the player has already fired are used. Does not adjust the
+        score."""
+        from advisor import ShotAdvisor  # advisor imports the solver, which imports this module
+        if self._advisor is None:
+            self._advisor = ShotAdvisor(len(set(self._atom_positions)), self._size)
+        table = self._get_exit_table()
+        for square in squares(self._shots, self._size):
+            if not self._advisor.has_observation(square):
+                if square in table:
+                    self._advisor.add_observation(square, table[square])
+                else:   # the rules could not resolve this ray, it tells the advisor nothing
+                    self._advisor.skip_entry(square)
+        return self._advisor.recommend(k, self._player.get_entry_exit())
+
+    def get_derived(self):
+        """Returns a tuple of everything the game works out from its atoms alone: the reflection, deflection and
+        double deflection square sets and the exit table. It can be passed as derived to a new BlackBoxGame with
+        the same atoms and size, and must not be changed. Later add_atom() or remove_atom() calls on this game work
+        on copies."""
+        self._owned = False
+        return (self._reflection_squares, self._deflection_squares, self._double_deflection_squares,
+                self._get_exit_table())
+
+    def exit_table(self):
+        """Returns a read-only view of the exit table so batch tooling can read every outcome in one call.
+        Keys are legal entry points, values are the exit point tuple or None if the ray hits an atom.
+        Does not adjust the player's score."""
+        return MappingProxyType(self._get_exit_table())
 
     def rec_shoot_ray(self, position, previous):
         """Takes as parameters the current square. Will recursively move through board squares and do checks for
-        different situations such as reflection, deflection, double deflection, and detour/combos. If any of these
-        situational methods are initiated entry/exit score adjustments are made by calling set_score().
+        different situations such as reflection, deflection, double deflection, and detour/combos.
         This will continue until ray reaches exit square and returns a tuple of the row and column exit point or
-        detects an atom hit. Checks current position for an atom. If successfully hit atom, ray will not exit."""
+        detects an atom hit. Checks current position for an atom. If successfully hit atom, ray will not exit.
+        Scoring is left to shoot_ray()."""
         if position in self._legal_entry and previous not in self._legal_entry:  # base case: checks if exit reached
-            self._player.set_entry_exit(position)
             return position  # returns tuple
-        elif position in self._atom_positions:  # detects a hit
+        elif position in self._board:  # detects a hit
             return
         elif position in self._reflection_squares:  # handles reflections
-            self._player.set_entry_exit(position)
             return position
         elif position in self._double_deflection_squares:  # if position is double deflection square
             return self.double_deflection(position, previous)  # determines next position based on double deflection
@@ -76,14 +176,13 @@ class BlackBoxGame:
     def move(self, position, previous):
         """Handles the first movement of the ray from the grid edge. Returns a new position"""
         if position in self._legal_entry and previous not in self._grid_edge:  # first move only
-            self._player.set_entry_exit(position)
             if position[0] == 0:  # moving right, along row
                 return ((position[0] + 1), position[1])
-            if position[0] == 9:  # moving left, along row
+            if position[0] == self._size - 1:  # moving left, along row
                 return ((position[0] - 1), position[1])
             if position[1] == 0:  # moving down, along column
                 return (position[0], (position[1] + 1))
-            if position[1] == 9:  # moving up, along column
+            if position[1] == self._size - 1:  # moving up, along column
                 return (position[0], (position[1] - 1))
         else:
             return self.successive_move(position, previous)
@@ -112,64 +211,50 @@ class BlackBoxGame:
 
     def deflection_squares(self):
         """Finds and builds a set containing square positions that require special handling. Searches the board for
-        deflection squares, which are all empty positions diagonal to an atom."""
-        # creates a list of all non-grid_edge atoms
-        non_grid_atoms = [atom for atom in self._atom_positions if atom not in self._atom_on_grid_edge]
-        for n in non_grid_atoms:  # iterate through list and compare if any are 1 position apart from another
-            for a in range(0, 3):
-                if self._board.get_board()[(n[0] - 1)][(n[1] - 1)] == ' ':  # diagonal up and left of atom
-                    self._deflection_squares.add(((n[0] - 1), (n[1] - 1)))
-                if self._board.get_board()[(n[0] + 1)][(n[1] - 1)] == ' ':  # diagonal down and left of atom
-                    self._deflection_squares.add(((n[0] + 1), (n[1] - 1)))
-                if self._board.get_board()[(n[0] - 1)][(n[1] + 1)] == ' ':  # diagonal up and right of atom
-                    self._deflection_squares.add(((n[0] - 1), (n[1] + 1)))
-                if self._board.get_board()[(n[0] + 1)][(n[1] + 1)] == ' ':  # diagonal down and right of atom
-                    self._deflection_squares.add(((n[0] + 1), (n[1] + 1)))
+        deflection squares, which are all empty positions diagonal to an atom that is not on the grid edge."""
+        for atom in self._atom_positions:
+            if not self.on_grid_edge(atom):
+                for square in diagonals(atom):
+                    if square not in self._board:
+                        self._deflection_squares.add(square)
 
     def deflection(self, position, previous):
-        """Takes in current position and if is a deflection square, determines new direction of movement.
-        Returns a new position as a tuple so that move() can continue the course."""
-        for a in self._atom_positions:
-            if position == ((a[0] - 1), (a[1] - 1)):  # check if diagonal up and left of atom
-                if previous == ((position[0] - 1), (position[1])):  # coming from above
-                    return ((position[0]), (position[1] - 1))
-                elif previous == ((position[0]), (position[1] - 1)):  # coming from left
-                    return ((position[0] - 1), (position[1]))
-            if position == ((a[0] + 1), (a[1] - 1)):  # check if diagonal down and left of atom
-                if previous == ((position[0] + 1), (position[1])):  # coming from below
-                    return ((position[0]), (position[1] - 1))
-                elif previous == ((position[0]), (position[1] - 1)):  # coming from left
-                    return ((position[0] + 1), (position[1]))
-            if position == ((a[0] - 1), (a[1] + 1)):  # check if diagonal up and right of atom
-                if previous == ((position[0] - 1), (position[1])):  # coming from above
-                    return ((position[0]), (position[1] + 1))
-                elif previous == ((position[0]), (position[1] + 1)):  # coming from right
-                    return ((position[0] - 1), (position[1]))
-            if position == ((a[0] + 1), (a[1] + 1)):  # check if diagonal down and right of atom
-                if previous == ((position[0] + 1), (position[1])):  # coming from below
-                    return ((position[0]), (position[1] + 1))
-                elif previous == ((position[0]), (position[1] + 1)):  # coming from right
-                    return ((position[0] + 1), (position[1]))
+        """Takes in current position and if is a deflection square, determines new direction of movement from the
+        atoms on its diagonals. Returns a new position as a tuple so that move() can continue the course."""
+        row, col = position
+        atoms = self._board
+        if previous == (row - 1, col):  # coming from above
+            if (row + 1, col + 1) in atoms:
+                return (row, col - 1)
+            if (row + 1, col - 1) in atoms:
+                return (row, col + 1)
+        elif previous == (row + 1, col):  # coming from below
+            if (row - 1, col + 1) in atoms:
+                return (row, col - 1)
+            if (row - 1, col - 1) in atoms:
+                return (row, col + 1)
+        elif previous == (row, col - 1):  # coming from left
+            if (row + 1, col + 1) in atoms:
+                return (row - 1, col)
+            if (row - 1, col + 1) in atoms:
+                return (row + 1, col)
+        elif previous == (row, col + 1):  # coming from right
+            if (row + 1, col - 1) in atoms:
+                return (row - 1, col)
+            if (row - 1, col - 1) in atoms:
+                return (row + 1, col)
 
     def double_deflection_squares(self):
         """Finds overlapping deflection squares that are identified as deflection squares for two separate atoms.
-        Adds double defleciton squares to a set. These squares are adjacent to the square between two atoms."""
+        Adds double defleciton squares to a set. These squares are adjacent to the square between two atoms, so
+        each atom only looks for a partner two squares to its right and two squares below it."""
         for n in self._atom_positions:
-            for a in self._atom_positions:
-                # vertical double deflection squares
-                if (n[0], (n[1] + 2)) == a:
-                    self._double_deflection_squares.add(((n[0] + 1), (n[1] + 1)))
-                    self._double_deflection_squares.add(((n[0] - 1), (n[1] + 1)))
-                if (n[0], (n[1] - 2)) == a:
-                    self._double_deflection_squares.add(((n[0] + 1), (n[1] - 1)))
-                    self._double_deflection_squares.add(((n[0] - 1), (n[1] - 1)))
-                # horizontal double deflection squares
-                if ((n[0] + 2), n[1]) == a:
-                    self._double_deflection_squares.add(((n[0] + 1), (n[1] + 1)))
-                    self._double_deflection_squares.add(((n[0] + 1), (n[1] - 1)))
-                if ((n[0] - 2), n[1]) == a:
-                    self._double_deflection_squares.add(((n[0] - 1), (n[1] + 1)))
-                    self._double_deflection_squares.add(((n[0] - 1), (n[1] - 1)))
+            if (n[0], n[1] + 2) in self._board:  # vertical double deflection squares
+                self._double_deflection_squares.add(((n[0] + 1), (n[1] + 1)))
+                self._double_deflection_squares.add(((n[0] - 1), (n[1] + 1)))
+            if (n[0] + 2, n[1]) in self._board:  # horizontal double deflection squares
+                self._double_deflection_squares.add(((n[0] + 1), (n[1] + 1)))
+                self._double_deflection_squares.add(((n[0] + 1), (n[1] - 1)))
 
     def double_deflection(self, position, previous):
         """Takes in current position if is a double deflection square. Reverses ray direction to return to sender."""
@@ -181,88 +266,235 @@ class BlackBoxGame:
         """Finds and builds a set containing square positions as tuples that require special handling.
         Searches the board for reflection squares. These are entry squares adjacent to an atom."""
         for a in self._atom_on_grid_edge:
-            # handles special case corner atoms
-            if a == (8, 8):
-                self._reflection_squares.add((9, 7))
-                self._reflection_squares.add((7, 9))
-            elif a == (8, 1):
-                self._reflection_squares.add((7, 0))
-                self._reflection_squares.add((9, 2))
-            elif a == (1, 1):
-                self._reflection_squares.add((2, 0))
-                self._reflection_squares.add((0, 2))
-            elif a == (1, 8):
-                self._reflection_squares.add((0, 7))
-                self._reflection_squares.add((2, 9))
-                # handles regular reflections
-            if a[0] == 1:  # handling of top horizontal edge
-                self._reflection_squares.add((a[0] - 1, a[1] + 1))  # add square to right of atom
-                self._reflection_squares.add((a[0] - 1, a[1] - 1))  # add square to left of atom
-            elif a[0] == 8:  # handling of bottom horizontal edge
-                self._reflection_squares.add((a[0] + 1, a[1] + 1))  # add square to right of atom
-                self._reflection_squares.add((a[0] + 1, a[1] - 1))  # add square to left of atom
-            elif a[1] == 1:  # handling of right and left column edges
-                self._reflection_squares.add((a[0] + 1, a[1] - 1))  # add square below atom
-                self._reflection_squares.add((a[0] - 1, a[1] - 1))  # add square above atom
-            elif a[1] == 8:
-                self._reflection_squares.add((a[0] + 1, a[1] + 1))  # add square below atom
-                self._reflection_squares.add((a[0] - 1, a[1] + 1))  # add square above atom
+            self._reflection_squares.update(self.atom_reflections(a))
+
+    def atom_reflections(self, a):
+        """Takes in an atom on the grid edge and returns the list of entry squares it reflects rays back out of."""
+        last = self._size - 1  # row/column of the entry squares on the bottom and right sides
+        edge = self._size - 2  # row/column of the grid edge on the bottom and right sides
+        squares = []
+        # handles special case corner atoms
+        if a == (edge, edge):
+            squares += [(last, edge - 1), (edge - 1, last)]
+        elif a == (edge, 1):
+            squares += [(edge - 1, 0), (last, 2)]
+        elif a == (1, 1):
+            squares += [(2, 0), (0, 2)]
+        elif a == (1, edge):
+            squares += [(0, edge - 1), (2, last)]
+        # handles regular reflections
+        if a[0] == 1:  # handling of top horizontal edge
+            squares += [(a[0] - 1, a[1] + 1), (a[0] - 1, a[1] - 1)]  # squares to the right and left of atom
+        elif a[0] == edge:  # handling of bottom horizontal edge
+            squares += [(a[0] + 1, a[1] + 1), (a[0] + 1, a[1] - 1)]  # squares to the right and left of atom
+        elif a[1] == 1:  # handling of right and left column edges
+            squares += [(a[0] + 1, a[1] - 1), (a[0] - 1, a[1] - 1)]  # squares below and above atom
+        elif a[1] == edge:
+            squares += [(a[0] + 1, a[1] + 1), (a[0] - 1, a[1] + 1)]  # squares below and above atom
+        return squares
+
+    def on_grid_edge(self, atom):
+        """Takes in an atom position inside the entry squares and returns True if it sits on the grid edge."""
+        return atom[0] in (1, self._size - 2) or atom[1] in (1, self._size - 2)
+
+    def add_atom(self, row, column):
+        """Takes in a row and column inside the entry squares and places an atom there. Only the special squares on
+        the atom's diagonals are worked out again, and the exit table is rebuilt on the next shot. Returns False if
+        the square is outside the playing area or already holds an atom, True otherwise."""
+        atom = (row, column)
+        if not (0 < row < self._size - 1 and 0 < column < self._size - 1) or atom in self._board:
+            return False
+        self._own()
+        self._board.add_atom(atom)
+        if self.on_grid_edge(atom):
+            self._atom_on_grid_edge.append(atom)
+        self._update_around(atom)
+        return True
+
+    def remove_atom(self, row, column):
+        """Takes in a row and column and takes the atom there off the board, forgetting it was found. Only the
+        special squares on the atom's diagonals are worked out again, and the exit table is rebuilt on the next
+        shot. Returns False if there is no atom there, True otherwise."""
+        atom = (row, column)
+        if atom not in self._board:
+            return False
+        self._own()
+        self._board.remove_atom(atom)
+        self._atom_on_grid_edge[:] = [other for other in self._atom_on_grid_edge if other != atom]
+        self._found &= ~(1 << (row * self._size + column))
+        self._update_around(atom)
+        return True
+
+    def _own(self):
+        """Gives the game its own copies of the board, atom list and special squares before they are changed for
+        the first time, since they may be shared with the caller, clones or a LayoutCache."""
+        if self._owned:
+            return
+        self._board = self._board.copy()
+        self._atom_positions = self._board.get_atoms()
+        self._atom_on_grid_edge = list(self._atom_on_grid_edge)
+        self._reflection_squares = set(self._reflection_squares)
+        self._deflection_squares = set(self._deflection_squares)
+        self._double_deflection_squares = set(self._double_deflection_squares)
+        if self._cell_map is not None:
+            self._cell_map = self._cell_map.copy()
+        self._owned = True
+
+    def _update_around(self, atom):
+        """Takes in a square whose atom was added or removed and works out again whether it and its diagonals are
+        reflection, deflection or double deflection squares, the only squares that atom has a say in. Updates the
+        cell map in place and drops the exit table and advisor."""
+        atoms = self._board
+        special = (self._reflection_squares, self._deflection_squares, self._double_deflection_squares)
+        for square in [atom] + diagonals(atom):
+            corners = diagonals(square)
+            present = [corner in atoms for corner in corners]
+            up_left, up_right, down_left, down_right = present
+            placed = [corner for corner, here in zip(corners, present) if here]
+            reflection = any(self.on_grid_edge(corner) and square in self.atom_reflections(corner)
+                             for corner in placed)
+            deflection = any(not self.on_grid_edge(corner) for corner in placed) and square not in atoms
+            double = ((up_left and up_right) or (down_left and down_right) or (up_left and down_left)
+                      or (up_right and down_right))
+            for flag, squares in zip((reflection, deflection, double), special):
+                if flag:
+                    squares.add(square)
+                else:
+                    squares.discard(square)
+            if self._cell_map is not None:
+                self._cell_map.set_square(square, atoms, *special)
+        self._exit_table = None
+        self._advisor = None
 
     def guess_atom(self, row, column):
         """Takes as parameters a row and column.
         If there is an atom at that location, will return True, otherwise will return False.
         The player's score will be adjusted accordingly by calling set_score within Player class object.
         The found_atom method within Board object will be called to mark atom as found."""
-        positions = self._board.get_atoms()
         position = (row, column)
-        for atom in positions:  # iterates through list of atoms
-            if position == atom:  # looks for a match
-                self._player.set_guess(position)
-                self.found_atom(position)  # marks atom as found
-                return True
-        else:
-            if position not in self._player.get_guess():
-                self._player.set_guess(position)
-                self._player.set_score('miss')  # adjusts score for a miss
-                return False
-            else:
-                return False
+        if self._board.has_atom(row, column):  # looks for a match in the atom bitboard
+            self._player.set_guess(position)
+            self.found_atom(position)  # marks atom as found
+            return True
+        if not self._player.has_guess(position):
+            self._player.set_guess(position)
+            self._player.set_score('miss')  # adjusts score for a miss
+        return False
 
     def get_score(self):
         """Returns the current score from Player class object from it's get_score() method."""
         return self._player.get_score()
 
+    def get_size(self):
+        """Returns the number of rows and columns of the board, entry squares included."""
+        return self._size
+
+    def get_atoms(self):
+        """Returns the list of atom positions the game was created with."""
+        return self._atom_positions
+
+    def get_reflection_squares(self):
+        """Returns the set of entry squares that reflect a ray straight back out."""
+        return self._reflection_squares
+
+    def snapshot(self):
+        """Returns the state of the game as bytes: the board size and atoms, the atoms found so far, the entries
+        fired from and the player's score, guesses and used entry/exit points. restore() turns them back into a
+        game."""
+        score, entry_exit, guess, other_guess = self._player.get_state()
+        other_guess = sorted(other_guess) if other_guess else []
+        width = (self._size * self._size + 7) // 8
+        parts = [_SNAPSHOT.pack(_MAGIC, _VERSION, self._size, score, len(other_guess))]
+        for bits in (self._board.get_atom_bits(), self._found, guess, entry_exit, self._shots):
+            parts.append(bits.to_bytes(width, 'little'))
+        for square in other_guess:
+            parts.append(_GUESS.pack(*square))
+        return b''.join(parts)
+
+    @classmethod
+    def restore(cls, data):
+        """Takes in bytes from snapshot() and returns a new game in the same state. Raises ValueError if the bytes
+        are not a snapshot. Version 1 snapshots, which did not keep the entries fired from, are still read."""
+        if len(data) < _SNAPSHOT.size:
+            raise ValueError('snapshot is too short')
+        magic, version, size, score, other_count = _SNAPSHOT.unpack_from(data)
+        width = (size * size + 7) // 8
+        if magic != _MAGIC or version not in _BITBOARDS:
+            raise ValueError('not a BlackBoxGame snapshot')
+        count = _BITBOARDS[version]
+        if len(data) != _SNAPSHOT.size + count * width + other_count * _GUESS.size:
+            raise ValueError('snapshot length does not match its header')
+        offset = _SNAPSHOT.size
+        bitboards = [0] * 5
+        for number in range(count):
+            bitboards[number] = int.from_bytes(data[offset:offset + width], 'little')
+            offset += width
+        atoms, found, guess, entry_exit, shots = bitboards
+        other_guess = set(_GUESS.iter_unpack(data[offset:])) if other_count else None
+        game = cls(squares(atoms, size), size)
+        game._found = found
+        game._shots = shots
+        game._player.set_state(score, entry_exit, guess, other_guess)
+        return game
+
+    def clone(self):
+        """Returns a copy of the game for look-ahead. The copy shares the board, atom positions, special square sets
+        and exit table and only the score, guesses, entry/exits and found atoms are copied. The exit table is built
+        first so every clone reuses it. Whichever game has an atom added or removed first copies the shared data
+        then."""
+        self._get_exit_table()
+        game = object.__new__(type(self))
+        for name in BlackBoxGame.__slots__:
+            setattr(game, name, getattr(self, name))
+        game._player = self._player.copy()
+        game._advisor = None  # the advisor follows one game's rays, the copy starts its own
+        self._owned = game._owned = False
+        return game
+
     def found_atom(self, atom):
-        """Takes in atom, and marks specified atom value as found in dictionary stored within datamember _atoms_left.
+        """Takes in atom, and sets its bit in the _found bitboard.
         This method is called when guess_atom() method from BlackBoxGame class matches an atom position"""
-        self._atoms_left[atom] = 'found'
+        if 0 <= atom[0] < self._size and 0 <= atom[1] < self._size:
+            self._found |= 1 << (atom[0] * self._size + atom[1])
 
     def atoms_left(self):
-        """Returns the number of atoms remaining (not hit) from Board class object's get_atoms method by iterating
-        through dictionary values and counting how many hold value 'remaining'. Returns integer with count."""
-        count = 0
-        for atom in self._atoms_left.values():
-            if atom == 'remaining':
-                count += 1
-        return count
+        """Returns the number of atoms remaining (not hit) by counting the atom bits from Board class object that
+        are not set in the _found bitboard. Returns integer with count."""
+        return bin(self._board.get_atom_bits() & ~self._found).count('1')
+
+    def get_board(self, reveal=True):
+        """Returns the board from Board class object get_board() method as a list of lists. With reveal set to
+        False the atoms that have not been found yet are drawn as empty squares."""
+        board = self._board.get_board()
+        if not reveal:
+            for row, col in squares(self._board.get_atom_bits() & ~self._found, self._size):
+                if board[row][col] == 'A':
+                    board[row][col] = ' '
+        return board
 
     def print_board(self):
         """Retrieves/prints current board from Board class object get_board() method."""
-        for i in range(len(self._board.get_board())):
-            print(self._board.get_board()[i])
+        for row in self._board.get_board():
+            print(row)
 
 
 class Player:
     """Creates Player class object for tracking player score. Methods within BlackBoxGame will rely/interact with
     methods within Player class object to get/set player score, keep track of previous guesses/entry/exit so that
-    repeat guesses are not allowed and not penalized multiple times."""
+    repeat guesses are not allowed and not penalized multiple times. Guesses and entry/exit points are kept as
+    integer bitboards with bit row * size + column set for every square used."""
+
+    __slots__ = ('_score', '_entry_exit', '_guess', '_other_guess', '_size')
 
-    def __init__(self):
+    def __init__(self, size=10):
         """Initializes datamembers for player _score, previous _entry_exit, and _guess. _score holds current score.
-        _entry_exit is a set that holds used entry/exits. _guess holds set of previously guessed positions."""
+        _entry_exit is a bitboard of used entry/exits. _guess is a bitboard of previously guessed positions, with
+        guesses off the board kept in the _other_guess set, created on first use."""
         self._score = 25
-        self._entry_exit = set()
-        self._guess = set()
+        self._entry_exit = 0
+        self._guess = 0
+        self._other_guess = None
+        self._size = size
 
     def set_score(self, reason):
         """Sets score, takes in a reason and adjusts the score based on game rules."""
@@ -276,52 +508,160 @@ class Player:
         return self._score
 
     def get_guess(self):
-        """Returns list of tuples that have already been guessed/targeted from _guess datamember."""
-        return self._guess
+        """Returns set of tuples that have already been guessed/targeted from _guess datamember."""
+        guesses = set(squares(self._guess, self._size))
+        if self._other_guess:
+            guesses |= self._other_guess
+        return guesses
+
+    def has_guess(self, guess):
+        """Takes in a tuple and returns True if it has already been guessed."""
+        row, column = guess
+        if 0 <= row < self._size and 0 <= column < self._size:
+            return self._guess >> (row * self._size + column) & 1 == 1
+        return self._other_guess is not None and guess in self._other_guess
 
     def set_guess(self, guess):
-        """Updates list of player guesses after each guess, takes in a tuple and updates the list _guess datamember."""
-        self._guess.add(guess)
+        """Updates player guesses after each guess, takes in a tuple and sets its bit in the _guess datamember."""
+        row, column = guess
+        if 0 <= row < self._size and 0 <= column < self._size:
+            self._guess |= 1 << (row * self._size + column)
+        else:
+            if self._other_guess is None:
+                self._other_guess = set()
+            self._other_guess.add(guess)
+
+    def get_state(self):
+        """Returns a tuple of the score, entry/exit bitboard, guess bitboard and set of off the board guesses (None
+        if there are none)."""
+        return self._score, self._entry_exit, self._guess, self._other_guess
+
+    def set_state(self, score, entry_exit, guess, other_guess):
+        """Takes in a tuple's worth of values from get_state() and makes them the player's state."""
+        self._score = score
+        self._entry_exit = entry_exit
+        self._guess = guess
+        self._other_guess = other_guess
+
+    def copy(self):
+        """Returns a new Player with the same score, guesses and entry/exit points."""
+        player = Player(self._size)
+        other_guess = set(self._other_guess) if self._other_guess else None
+        player.set_state(self._score, self._entry_exit, self._guess, other_guess)
+        return player
 
     def get_entry_exit(self):
-        """Returns list of previous entry/exit points from _entry_exit datamember."""
-        return self._entry_exit
+        """Returns set of previous entry/exit points from _entry_exit datamember."""
+        return set(squares(self._entry_exit, self._size))
 
     def set_entry_exit(self, position):
-        """Updates list of previous entry or exit points, takes in a tuple and updates the list in _entry_exit."""
-        if position not in self._entry_exit:    # if new entry/exit point
-            self.set_score('entry/exit')        # calls set_score to adjust score
-        self._entry_exit.add(position)          # adds position to list of used entry/exits
+        """Updates previous entry or exit points, takes in a tuple and sets its bit in _entry_exit."""
+        bit = 1 << (position[0] * self._size + position[1])
+        if not self._entry_exit & bit:      # if new entry/exit point
+            self.set_score('entry/exit')    # calls set_score to adjust score
+            self._entry_exit |= bit         # adds position to used entry/exits
 
 
 class Board:
     """Creates Board class object for tracking/managing locations of atoms.
     Methods within BlackBoxGame will interact with Board class object to see state of the game board
-    and to set/hit atom positions."""
-
-    def __init__(self, atom_positions):
-        """Initializes datamember that builds the game board with a list of lists by list comprehension.
-        Takes in a list of atom_positions from BlackBoxGame class and adds atoms to default board layout.
-        Atoms will be represented on the board as 'A'. During gameplay the player will not be able to see
-        the locations."""
-        self._board = [[" " for col in range(10)] for row in range(10)]     # builds board w/ list of lists
+    and to set/hit atom positions. Atoms and legal entry points are stored as integer bitboards and the grid of
+    characters is only drawn when asked for."""
+
+    __slots__ = ('_atom_positions', '_atoms', '_legal', '_size')
+
+    def __init__(self, atom_positions, size=10):
+        """Initializes datamembers for the board. Takes in a list of atom_positions from BlackBoxGame class and
+        sets their bits in the _atoms bitboard. Atoms will be represented on the board as 'A'. During gameplay the
+        player will not be able to see the locations. The optional size sets the number of rows and columns,
+        10 by default."""
         self._atom_positions = atom_positions
+        self._atoms = 0
+        for atom in atom_positions:
+            self._atoms |= 1 << (atom[0] * size + atom[1])
+        self._legal = 0
+        self._size = size
 
     def set_board(self, legal):
-        """Modifies default board layout to position atoms into place from _atom_positions datamember, adds visual
-        markers of * and X to represent legal entry points and corner positions."""
-        corners = [(0, 0), (0, 9), (9, 0), (9, 9)]
-        for atom in self._atom_positions:
-            self._board[atom[0]][atom[1]] = 'A'     # places visual representation of atom locations on the board
-        for l in legal:
-            self._board[l[0]][l[1]] = '*'           # places visual representation of legal entry points on the board
-        for c in corners:
-            self._board[c[0]][c[1]] = 'X'           # places visual representation of illegal entry points on the board
+        """Takes in the legal entry points and sets their bits in the _legal bitboard, they are drawn as * and the
+        corner positions as X."""
+        self._legal |= to_bits(tuple(legal), self._size)
 
     def get_atoms(self):
         """Returns list of remaining atoms."""
         return self._atom_positions
 
+    def __contains__(self, square):
+        """Takes in a (row, column) tuple and returns True if an atom sits there."""
+        return self.has_atom(square[0], square[1])
+
+    def add_atom(self, atom):
+        """Takes in an atom position and adds it to the atom list and bitboard."""
+        self._atom_positions.append(atom)
+        self._atoms |= 1 << (atom[0] * self._size + atom[1])
+
+    def remove_atom(self, atom):
+        """Takes in an atom position and removes it from the atom list and bitboard."""
+        self._atom_positions[:] = [other for other in self._atom_positions if other != atom]
+        self._atoms &= ~(1 << (atom[0] * self._size + atom[1]))
+
+    def copy(self):
+        """Returns a board with its own atom list and the same bitboards."""
+        board = Board(list(self._atom_positions), self._size)
+        board._legal = self._legal
+        return board
+
+    def get_atom_bits(self):
+        """Returns the bitboard of atom positions."""
+        return self._atoms
+
+    def has_atom(self, row, column):
+        """Takes in a row and column and returns True if an atom sits there."""
+        if 0 <= row < self._size and 0 <= column < self._size:
+            return self._atoms >> (row * self._size + column) & 1 == 1
+        return False
+
+    def get_square(self, row, column):
+        """Takes in a row and column and returns the character drawn there: X for corners, * for legal entry points,
+        A for atoms and a space otherwise."""
+        last = self._size - 1
+        if row in (0, last) and column in (0, last):
+            return 'X'
+        bit = 1 << (row * self._size + column)
+        if self._legal & bit:
+            return '*'
+        if self._atoms & bit:
+            return 'A'
+        return ' '
+
     def get_board(self):
-        """Returns the current game board."""
-        return self._board
+        """Returns the current game board drawn as a list of lists of one character strings."""
+        return [[self.get_square(row, col) for col in range(self._size)] for row in range(self._size)]
+
+
+@lru_cache(maxsize=64)
+def to_bits(positions, size):
+    """Takes in a tuple of (row, column) tuples and the board size, returns the bitboard with their bits set.
+    Results are cached since the same legal entry squares are set on every board."""
+    bits = 0
+    for row, column in positions:
+        bits |= 1 << (row * size + column)
+    return bits
+
+
+def diagonals(square):
+    """Takes in a (row, column) tuple and returns its four diagonal neighbours: up left, up right, down left and
+    down right."""
+    row, column = square
+    return [(row - 1, column - 1), (row - 1, column + 1), (row + 1, column - 1), (row + 1, column + 1)]
+
+
+def squares(bits, size):
+    """Takes in a bitboard and the board size, returns the list of (row, column) tuples whose bits are set."""
+    found = []
+    while bits:
+        low = bits & -bits
+        index = low.bit_length() - 1
+        found.append((index // size, index % size))
+        bits ^= low
+    return found
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# Date: 10/18/26
+# Description: Suggests which entry to shoot next. Keeps a pool of atom layouts that agree with every ray seen so
+# far, traces every entry of every layout in the pool and ranks entries by how much the outcome is expected to tell
+# (the entropy of the outcome over the pool, in bits) for each point the shot is expected to cost. While too many
+# layouts fit to list them, the pool is a uniform sample that is filtered by each new ray and topped up with single
+# atom moves that keep it consistent; once the solver can list every fitting layout within the pool size, the pool
+# is exact. Uses batch.py to trace the pool when numpy is installed.
+# Usage:
+#       advisor = ShotAdvisor(4)
+#       advisor.add_observation((4, 9), (9, 7))
+#       advisor.recommend(3) -> [((0, 4), 3.2, 1.9), ...]    (entry, expected bits, expected points)
+#   or straight from a game: game.recommend_shots(3)
+
+import random
+import time
+from math import comb, log2
+
+from solver import Solver, mask_tracer, to_atoms, HIT
+
+try:
+    import batch
+except ImportError:     # numpy is optional, the pool is traced in Python without it
+    batch = None
+
+
+class ShotAdvisor:
+    """Ranks entry squares by expected information gain per expected point lost. Observations are added one at a
+    time as rays are shot and the pool of fitting layouts is updated in place."""
+
+    def __init__(self, atom_count, size=10, samples=1024, moves=4, budget=0.15, seed=None):
+        """Takes in the number of hidden atoms, the board size, the most layouts to keep in the pool, how many
+        single atom moves each layout is offered when the pool is topped up, the seconds the solver may spend
+        listing layouts when too few samples survive a ray, and a seed for the sampling."""
+        self._size = size
+        self._samples = samples
+        self._moves = moves
+        self._budget = budget
+        self._rng = random.Random(seed)
+        self._tracer = mask_tracer(size)
+        self._solver = Solver(atom_count, size)
+        self._cells = [row * size + col for row in range(1, size - 1) for col in range(1, size - 1)]
+        self._observations = []     # (entry index, outcome), newest first so the strongest filter runs first
+        self._seen = set()          # entry squares observed so far
+        self._outcomes = None       # outcome of every entry for every layout in the pool, built on demand
+        if comb(len(self._cells), atom_count) <= samples:
+            self._pool = list(self._solver.masks())
+            self._exact = True      # the pool holds every fitting layout once
+        else:
+            self._pool = [self._random_layout(atom_count) for _ in range(samples)]
+            self._exact = False
+
+    def add_observation(self, entry, result):
+        """Takes in an entry square and the value shoot_ray() returned for it (exit square or None for a hit) and
+        narrows the pool. Raises ValueError for a square that is not a legal entry or exit."""
+        self._solver.add_observation(entry, result)
+        entry = tuple(entry)
+        index = self._tracer.get_entry_index(entry)
+        outcome = HIT if result is None else self._tracer.get_entry_index(tuple(result))
+        self._observations.insert(0, (index, outcome))
+        self._seen.add(entry)
+        self._outcomes = None
+        trace = self._tracer.trace
+        survivors = [mask for mask in self._pool if trace(mask, index) == outcome]
+        if self._exact:
+            self._pool = survivors
+            return
+        if survivors:
+            self._pool = self._top_up(survivors)
+            if len(set(self._pool)) * 4 >= self._samples:
+                return
+        # few different layouts fit, so the solver can list them quickly; if it lists them all within the pool
+        # size the pool becomes exact, otherwise what it found seeds the pool
+        found = []
+        deadline = time.perf_counter() + self._budget
+        for mask in self._solver.masks():
+            found.append(mask)
+            if len(found) == self._samples or (time.perf_counter() > deadline and found + survivors):
+                break
+        else:
+            self._pool = found
+            self._exact = True
+            return
+        self._pool = self._top_up(found + survivors)
+
+    def skip_entry(self, entry):
+        """Takes in an entry square whose ray was fired but could not be resolved and leaves it out of later
+        recommendations."""
+        self._seen.add(tuple(entry))
+
+    def has_observation(self, entry):
+        """Takes in an entry square and returns True if its ray has been observed or skipped."""
+        return tuple(entry) in self._seen
+
+    def is_exact(self):
+        """Returns True if the pool holds every fitting layout rather than a sample of them."""
+        return self._exact
+
+    def get_pool(self):
+        """Returns the list of layout bitsets in the pool."""
+        return self._pool
+
+    def recommend(self, k=3, used=()):
+        """Takes in the number of suggestions wanted and the entry/exit squares already charged, returns up to k
+        (entry, expected bits, expected points) tuples for entries not observed yet, best bits per point first.
+        Rays do not always retrace their path backwards, so a square used only as an exit is still worth firing
+        from and costs nothing to enter."""
+        if not self._pool:
+            return []
+        outcomes = self._get_outcomes()
+        entries = self._tracer.get_entries()
+        used = set(used)
+        total = len(self._pool)
+        ranked = []
+        for index, entry in enumerate(entries):
+            if entry in self._seen:
+                continue
+            gain = 0.0
+            cost = 0.0
+            for outcome, count in self._counts(outcomes, index):
+                share = count / total
+                gain -= share * log2(share)
+                cost += share * ((entry not in used) + (outcome >= 0 and outcome != index
+                                                        and entries[outcome] not in used))
+            if cost:
+                ranked.append((gain / cost, gain, entry, cost))
+            else:   # every outcome lands on squares already paid for
+                ranked.append((float('inf') if gain else 0.0, gain, entry, cost))
+        ranked.sort(key=lambda item: (-item[0], -item[1], item[2]))
+        return [(entry, round(gain, 4), round(cost, 4)) for _, gain, entry, cost in ranked[:k]]
+
+    def _get_outcomes(self):
+        """Returns the outcome of every entry for every pool layout, one row per layout. The pool is traced in one
+        batch into a NumPy array when numpy is installed, and into a list of lists otherwise."""
+        if self._outcomes is None:
+            size = self._size
+            if batch is not None:
+                codes = batch.trace_batch([to_atoms(mask, size) for mask in self._pool], size)
+                entry = batch.np.arange(codes.shape[1])
+                # reflections exit where they enter
+                self._outcomes = batch.np.where(codes == batch.REFLECT, entry, codes)
+            else:
+                trace = self._tracer.trace
+                entries = range(len(self._tracer.get_entries()))
+                self._outcomes = [[trace(mask, entry) for entry in entries] for mask in self._pool]
+        return self._outcomes
+
+    @staticmethod
+    def _counts(outcomes, index):
+        """Takes in the outcome rows and an entry index, returns (outcome, number of layouts) pairs for that
+        entry."""
+        if batch is not None:
+            values, counts = batch.np.unique(outcomes[:, index], return_counts=True)
+            return zip(values.tolist(), counts.tolist())
+        counts = dict()
+        for row in outcomes:
+            counts[row[index]] = counts.get(row[index], 0) + 1
+        return counts.items()
+
+    def _random_layout(self, atom_count):
+        """Takes in the number of atoms and returns a uniformly random layout bitset."""
+        mask = 0
+        for cell in self._rng.sample(self._cells, atom_count):
+            mask |= 1 << cell
+        return mask
+
+    def _fits(self, mask):
+        """Takes in a layout bitset and returns True if it agrees with every observation."""
+        trace = self._tracer.trace
+        for entry, outcome in self._observations:
+            if trace(mask, entry) != outcome:
+                return False
+        return True
+
+    def _top_up(self, seeds):
+        """Takes in fitting layouts and returns a pool of samples layouts drawn from them, each then offered moves
+        random single atom moves that are kept when the moved layout still fits. Moves are symmetric, so a uniform
+        pool stays uniform while duplicates spread out."""
+        rng = self._rng
+        cells = self._cells
+        pool = [rng.choice(seeds) for _ in range(self._samples)] if len(seeds) != self._samples else list(seeds)
+        for number, mask in enumerate(pool):
+            atoms = _cells_of(mask)
+            for _ in range(self._moves):
+                target = cells[int(rng.random() * len(cells))]
+                if mask >> target & 1:
+                    continue
+                which = int(rng.random() * len(atoms))
+                moved = mask ^ (1 << atoms[which]) ^ (1 << target)
+                if self._fits(moved):
+                    mask = moved
+                    atoms[which] = target
+            pool[number] = mask
+        return pool
+
+
+def _cells_of(mask):
+    """Takes in a layout bitset and returns the list of its set bit indexes."""
+    cells = []
+    while mask:
+        low = mask & -mask
+        cells.append(low.bit_length() - 1)
+        mask ^= low
+    return cells
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# Date: 10/18/26
+# Description: Traces every entry ray of many BlackBox layouts at once with NumPy. All rays of all boards advance one
+# square per iteration from an atom occupancy tensor, so tracing hundreds of thousands of layouts costs a few
+# hundred array operations instead of one BlackBoxGame and 32 shoot_ray() calls per layout. Requires numpy.
+# Usage:
+#       codes = trace_batch([[(7, 1), (7, 3), (3, 6), (1, 6)], [(2, 5), (6, 5), (6, 7)]])
+#       codes[0, 0] -> index into legal_entries(10) of the exit for the first entry, or HIT/REFLECT/TRAPPED
+
+from functools import lru_cache
+
+import numpy as np
+
+from BlackBoxGame import BlackBoxGame
+from tracer import legal_entries, grid_edge
+
+# exit codes below zero, codes from zero up are indexes into legal_entries(size)
+HIT = -1        # ray hit an atom, shoot_ray() returns None
+REFLECT = -2    # ray reflected at the entry square, shoot_ray() returns the entry square
+TRAPPED = -3    # ray never leaves the box, shoot_ray() raises RuntimeError
+
+# kinds of square in the per-board map, in the precedence rec_shoot_ray() checks them
+_EMPTY = 0
+_ATOM = 1
+_EDGE = 2
+_DOUBLE = 3
+_DEFLECT = 4
+
+
+@lru_cache(maxsize=None)
+def _geometry(size):
+    """Takes in the board size and returns the arrays shared by every board of that size: the flat index of each
+    legal entry square, the first step from each entry, the exit code of each square (-1 off the edge), the mask of
+    grid edge squares and a (entries, squares) matrix marking the grid edge atoms that reflect each entry."""
+    entries = legal_entries(size)
+    cells = size * size
+    entry_cell = np.array([row * size + col for row, col in entries], dtype=np.int32)
+    step_row = np.zeros(len(entries), dtype=np.int32)
+    step_col = np.zeros(len(entries), dtype=np.int32)
+    for index, (row, col) in enumerate(entries):
+        if row == 0:
+            step_row[index] = 1
+        elif row == size - 1:
+            step_row[index] = -1
+        elif col == 0:
+            step_col[index] = 1
+        else:
+            step_col[index] = -1
+    exit_code = np.full(cells, -1, dtype=np.int16)
+    exit_code[entry_cell] = np.arange(len(entries), dtype=np.int16)
+    ring = np.zeros(cells, dtype=bool)
+    reflects = np.zeros((len(entries), cells), dtype=np.uint8)
+    entry_index = {entry: index for index, entry in enumerate(entries)}
+    for atom in grid_edge(size):
+        ring[atom[0] * size + atom[1]] = True
+        # the game's own reflection rules decide which entries a single grid edge atom reflects
+        for square in BlackBoxGame([atom], size).get_reflection_squares():
+            if square in entry_index:
+                reflects[entry_index[square], atom[0] * size + atom[1]] = 1
+    return entry_cell, step_row, step_col, exit_code, ring.reshape(size, size), reflects
+
+
+def occupancy(layouts, size=10):
+    """Takes in a sequence of atom position lists and returns a (boards, size, size) boolean atom tensor."""
+    layouts = list(layouts)
+    board = []
+    rows = []
+    cols = []
+    for index, atoms in enumerate(layouts):
+        for row, col in atoms:
+            board.append(index)
+            rows.append(row)
+            cols.append(col)
+    occupied = np.zeros((len(layouts), size, size), dtype=bool)
+    occupied[board, rows, cols] = True
+    return occupied
+
+
+def _square_maps(occupied):
+    """Takes in a (boards, size, size) atom tensor and returns the flat per-square kind map and the diagonal atom
+    bits (1 up-left, 2 up-right, 4 down-left, 8 down-right) of every board."""
+    boards, size, _ = occupied.shape
+    _, _, _, exit_code, ring, _ = _geometry(size)
+    padded = np.zeros((boards, size + 2, size + 2), dtype=bool)
+    padded[:, 1:-1, 1:-1] = occupied
+    up_left = padded[:, :-2, :-2]
+    up_right = padded[:, :-2, 2:]
+    down_left = padded[:, 2:, :-2]
+    down_right = padded[:, 2:, 2:]
+    diagonal = (up_left.astype(np.uint8) | (up_right.astype(np.uint8) << 1) | (down_left.astype(np.uint8) << 2)
+                | (down_right.astype(np.uint8) << 3))
+    double = (up_left & up_right) | (down_left & down_right) | (up_left & down_left) | (up_right & down_right)
+    # deflection squares only come from atoms inside the grid edge, double deflections from any pair
+    inner = np.zeros_like(padded)
+    inner[:, 2:-2, 2:-2] = occupied[:, 1:-1, 1:-1] & ~ring[1:-1, 1:-1]
+    deflect = inner[:, :-2, :-2] | inner[:, :-2, 2:] | inner[:, 2:, :-2] | inner[:, 2:, 2:]
+    kind = np.zeros((boards, size, size), dtype=np.uint8)
+    kind[deflect] = _DEFLECT
+    kind[double] = _DOUBLE
+    kind = kind.reshape(boards, size * size)
+    kind[:, exit_code >= 0] = _EDGE
+    kind[occupied.reshape(boards, size * size)] = _ATOM
+    return kind, diagonal.reshape(boards, size * size)
+
+
+def trace_batch(layouts, size=10, chunk=16384):
+    """Takes in a sequence of atom position lists (or a (boards, size, size) boolean atom tensor) and returns an
+    int16 array of shape (boards, entries) holding the exit code of every legal entry of every board. Codes from
+    zero up index legal_entries(size); HIT, REFLECT and TRAPPED mark the other outcomes. Boards are traced chunk at
+    a time to bound memory."""
+    if isinstance(layouts, np.ndarray):
+        occupied = layouts.astype(bool, copy=False)
+        size = occupied.shape[1]
+    else:
+        occupied = occupancy(layouts, size)
+    entries = len(legal_entries(size))
+    codes = np.empty((occupied.shape[0], entries), dtype=np.int16)
+    for start in range(0, occupied.shape[0], chunk):
+        codes[start:start + chunk] = _trace_chunk(occupied[start:start + chunk])
+    return codes
+
+
+def _trace_chunk(occupied):
+    """Takes in a (boards, size, size) atom tensor and advances all of its rays in lockstep until every ray has
+    left the box, hit an atom or run out of steps. Returns the (boards, entries) exit codes."""
+    boards, size, _ = occupied.shape
+    cells = size * size
+    entry_cell, step_row, step_col, exit_code, _, reflects = _geometry(size)
+    entries = len(entry_cell)
+    kind, diagonal = _square_maps(occupied)
+    kind = kind.ravel()
+    diagonal = diagonal.ravel()
+    result = np.full(boards * entries, TRAPPED, dtype=np.int16)
+
+    # reflections are decided at the entry square before the ray moves
+    reflected = (occupied.reshape(boards, cells).astype(np.uint8) @ reflects.T) > 0
+    result[reflected.ravel()] = REFLECT
+    ray = np.flatnonzero(~reflected.ravel())
+    base = (ray // entries) * cells
+    entry = ray % entries
+    dr = step_row[entry]
+    dc = step_col[entry]
+    position = entry_cell[entry] + dr * size + dc
+
+    for _ in range(4 * cells + 1):
+        if ray.size == 0:
+            break
+        k = kind[base + position]
+        edge = k == _EDGE
+        result[ray[edge]] = exit_code[position[edge]]
+        result[ray[k == _ATOM]] = HIT
+
+        double = k == _DOUBLE
+        dr[double] = -dr[double]
+        dc[double] = -dc[double]
+
+        deflect = np.flatnonzero(k == _DEFLECT)
+        if deflect.size:
+            bits = diagonal[base[deflect] + position[deflect]]
+            vertical = dr[deflect] != 0
+            forward = np.where(vertical, dr[deflect], dc[deflect]) > 0
+            # atoms diagonally ahead: plus is the one on the down/right side, minus on the up/left side
+            plus_bit = np.where(vertical, forward * 2 + 1, 2 + forward)
+            minus_bit = np.where(vertical, forward * 2, forward)
+            plus = (bits >> plus_bit.astype(np.uint8)) & 1 == 1
+            minus = (bits >> minus_bit.astype(np.uint8)) & 1 == 1
+            away = np.where(plus, -1, np.where(minus, 1, 0)).astype(np.int32)
+            dr[deflect] = np.where(vertical, 0, away)
+            dc[deflect] = np.where(vertical, away, 0)
+            stuck = np.zeros(k.shape, dtype=bool)
+            stuck[deflect[~(plus | minus)]] = True
+        else:
+            stuck = False
+
+        alive = ~(edge | (k == _ATOM) | stuck)
+        ray = ray[alive]
+        base = base[alive]
+        dr = dr[alive]
+        dc = dc[alive]
+        position = position[alive] + dr * size + dc
+    return result.reshape(boards, entries)
+
+
+def decode(codes, size=10):
+    """Takes in one board's row of exit codes and returns the dictionary BlackBoxGame.exit_table() would hold for
+    it: entry square -> exit square, or None for a hit. Trapped entries are left out, as in the game's table."""
+    entries = legal_entries(size)
+    table = dict()
+    for entry, code in zip(entries, codes.tolist()):
+        if code >= 0:
+            table[entry] = entries[code]
+        elif code == HIT:
+            table[entry] = None
+        elif code == REFLECT:
+            table[entry] = entry
+    return table
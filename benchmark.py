@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# Date: 10/18/26
+# Description: Benchmark suite for BlackBoxGame. Sweeps atom count, board size and layout family (random, grid edge
+# atoms for reflections, spread out atoms for deflections, atom pairs for double deflections) and times game
+# construction, the first shoot_ray() (which builds the exit table), later shoot_ray() calls and guess_atom().
+# Reports latency percentiles and operations per second, saves them as a JSON baseline and compares a new run with
+# a saved one, exiting with status 1 when a median or 99th percentile got slower than its allowed threshold.
+# Usage:
+#       python3 benchmark.py --save baseline.json
+#       python3 benchmark.py --compare baseline.json --threshold 0.25 --tail-threshold 0.5
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from BlackBoxGame import BlackBoxGame
+from tracer import legal_entries, grid_edge
+
+FAMILIES = ('random', 'edge', 'deflection', 'double')
+OPERATIONS = ('construct', 'first_shot', 'shoot_ray', 'guess_atom')
+
+
+def make_layout(family, atom_count, size, rng):
+    """Takes in a layout family, number of atoms, board size and random.Random, returns a list of atom positions.
+    edge puts atoms on the grid edge so entries reflect, deflection keeps atoms two squares apart diagonally or more
+    so rays turn, double places atoms in pairs two squares apart on a row or column."""
+    inside = [(row, col) for row in range(1, size - 1) for col in range(1, size - 1)]
+    atom_count = min(atom_count, len(inside))
+    if family == 'edge':
+        ring = grid_edge(size)
+        return rng.sample(ring, min(atom_count, len(ring)))
+    if family == 'deflection':
+        atoms = []
+        inner = [(row, col) for row, col in inside if 2 <= row <= size - 3 and 2 <= col <= size - 3]
+        rng.shuffle(inner)
+        for square in inner:
+            if all(abs(square[0] - a[0]) > 2 or abs(square[1] - a[1]) > 2 for a in atoms):
+                atoms.append(square)
+                if len(atoms) == atom_count:
+                    break
+        return atoms
+    if family == 'double':
+        atoms = set()
+        tries = 0
+        while len(atoms) < atom_count - 1 and tries < 1000:
+            tries += 1
+            row, col = rng.choice(inside)
+            pair = (row, col + 2) if rng.random() < 0.5 else (row + 2, col)
+            if pair in inside and row not in (1, size - 2) and col not in (1, size - 2):
+                atoms.update(((row, col), pair))
+        return list(atoms)[:atom_count]
+    return rng.sample(inside, atom_count)
+
+
+def percentile(values, fraction):
+    """Takes in a sorted list and a fraction between 0 and 1, returns the value at that rank."""
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def summarise(samples):
+    """Takes in a list of nanosecond timings and returns p50/p90/p99 latency in microseconds and ops per second."""
+    samples.sort()
+    total = sum(samples) or 1
+    return {'p50_us': round(percentile(samples, 0.5) / 1000, 3), 'p90_us': round(percentile(samples, 0.9) / 1000, 3),
+            'p99_us': round(percentile(samples, 0.99) / 1000, 3), 'ops_per_sec': round(len(samples) * 1e9 / total),
+            'ops': len(samples)}
+
+
+def run_scenario(family, atom_count, size, games, seed):
+    """Takes in one point of the sweep and the number of games to play, returns a dictionary of operation ->
+    summary for it."""
+    rng = random.Random(seed)
+    clock = time.perf_counter_ns
+    timings = {operation: [] for operation in OPERATIONS}
+    entries = legal_entries(size)
+    squares = [(row, col) for row in range(1, size - 1) for col in range(1, size - 1)]
+    for _ in range(games):
+        atoms = make_layout(family, atom_count, size, rng)
+        start = clock()
+        game = BlackBoxGame(atoms, size)
+        timings['construct'].append(clock() - start)
+        shots = rng.sample(entries, len(entries))
+        for number, entry in enumerate(shots):
+            start = clock()
+            try:
+                game.shoot_ray(*entry)
+            except RuntimeError:    # rays that never leave the box are timed like the rest
+                pass
+            timings['first_shot' if number == 0 else 'shoot_ray'].append(clock() - start)
+        for square in rng.sample(squares, min(len(squares), 2 * len(atoms) + 2)):
+            start = clock()
+            game.guess_atom(*square)
+            timings['guess_atom'].append(clock() - start)
+    return {operation: summarise(values) for operation, values in timings.items()}
+
+
+def run_suite(atom_counts, sizes, games, seed=0, repeat=3):
+    """Takes in the atom counts, board sizes, games per scenario and repeats, runs every family for each combination
+    and returns a dictionary of scenario name -> operation -> summary. Each scenario is run repeat times and the
+    run with the lowest median is kept per operation, which keeps scheduler noise out of the comparison."""
+    results = dict()
+    for size in sizes:
+        for atom_count in atom_counts:
+            for family in FAMILIES:
+                name = '%s-%datoms-%dx%d' % (family, atom_count, size, size)
+                best = dict()
+                for _ in range(repeat):
+                    for operation, summary in run_scenario(family, atom_count, size, games, seed).items():
+                        if operation not in best or summary['p50_us'] < best[operation]['p50_us']:
+                            best[operation] = summary
+                results[name] = best
+    return results
+
+
+def compare(current, baseline, threshold, tail_threshold=0.5):
+    """Takes in two suite results, the allowed median slowdown and the allowed 99th percentile slowdown as
+    fractions, returns a list of messages, one per metric whose median or tail latency grew by more than its
+    threshold. Tails are noisier, so they get a looser threshold of their own. Scenarios missing from either side
+    are skipped."""
+    regressions = []
+    for name, operations in current.items():
+        for operation, summary in operations.items():
+            before = baseline.get(name, {}).get(operation)
+            if not before:
+                continue
+            for key, allowed in (('p50_us', threshold), ('p99_us', tail_threshold)):
+                if not before.get(key):
+                    continue
+                ratio = summary[key] / before[key]
+                if ratio > 1 + allowed:
+                    regressions.append('%s %s %s %.3fus -> %.3fus (+%.0f%%)' % (name, operation, key[:3], before[key],
+                                                                              summary[key], (ratio - 1) * 100))
+    return regressions
+
+
+def main():
+    """Parses the command line, runs the suite, prints the table and saves or compares results."""
+    parser = argparse.ArgumentParser(description='Benchmark BlackBoxGame construction, shoot_ray and guess_atom.')
+    parser.add_argument('--atoms', type=int, nargs='+', default=[2, 4, 8])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 20])
+    parser.add_argument('--games', type=int, default=300, help='games per scenario')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='runs per scenario, the fastest median is kept')
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON baseline to compare the results with')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed median slowdown, 0.2 is 20%%')
+    parser.add_argument('--tail-threshold', type=float, default=0.5, help='allowed 99th percentile slowdown')
+    args = parser.parse_args()
+    results = run_suite(args.atoms, args.sizes, args.games, args.seed, args.repeat)
+    print('%-28s %-11s %10s %10s %10s %12s' % ('scenario', 'operation', 'p50 us', 'p90 us', 'p99 us', 'ops/s'))
+    for name, operations in results.items():
+        for operation, summary in operations.items():
+            print('%-28s %-11s %10.3f %10.3f %10.3f %12d' % (name, operation, summary['p50_us'], summary['p90_us'],
+                                                              summary['p99_us'], summary['ops_per_sec']))
+    if args.save:
+        with open(args.save, 'w') as handle:
+            json.dump({'python': sys.version.split()[0], 'results': results}, handle, indent=1, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)['results']
+        regressions = compare(results, baseline, args.threshold, args.tail_threshold)
+        for message in regressions:
+            print('REGRESSION', message)
+        if regressions:
+            sys.exit(1)
+        print('no regressions over %.0f%% (median) or %.0f%% (p99)' % (args.threshold * 100,
+                                                                      args.tail_threshold * 100))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# Date: 10/18/26
+# Description: Headless command line runner for scripted BlackBox games. Reads one JSON game per line from files or
+# stdin, plays its shots and guesses and writes one JSON result per line, in input order. Lines are read, played and
+# written as a stream, so memory stays flat however long the input is; with --jobs the lines go to worker processes
+# in chunks, with only a few chunks in flight at a time. Nothing but the game engine is imported, so no display is
+# needed.
+# Usage:
+#       python3 -m blackbox games.jsonl > results.jsonl
+#       cat games.jsonl | python3 -m blackbox --jobs 4
+# Games (the optional "id" is echoed back):
+#       {"id": 1, "atoms": [[7, 1], [7, 3], [3, 6], [1, 6]], "size": 10, "shots": [[4, 9], [0, 2]], "guesses": [[7, 1]]}
+# Results, an exit is a [row, column] list, null for a hit, false for an illegal entry or "trapped":
+#       {"id": 1, "exits": [[9, 7], [0, 2]], "hits": [true], "score": 21, "atoms_left": 3}
+#       {"line": 2, "error": "..."}     for a line that could not be played
+
+import argparse
+import json
+import os
+import sys
+from collections import deque
+
+from BlackBoxGame import BlackBoxGame
+
+MAX_SIZE = 100      # largest board a game may ask for
+CHUNK = 256         # lines handed to a worker at a time
+
+
+def play(game_def):
+    """Takes in a game as a dictionary with atoms, size, shots and guesses, plays the shots then the guesses and
+    returns the result dictionary. Raises ValueError, KeyError, TypeError or OverflowError for a malformed game."""
+    if not isinstance(game_def, dict):
+        raise ValueError('a game must be a JSON object')
+    size = int(game_def.get('size', 10))
+    if not 3 <= size <= MAX_SIZE:
+        raise ValueError('size must be between 3 and %d' % MAX_SIZE)
+    inside = range(1, size - 1)
+    atoms = [(int(row), int(col)) for row, col in game_def['atoms']]
+    if any(row not in inside or col not in inside for row, col in atoms):
+        raise ValueError('atoms must be inside the entry squares')
+    game = BlackBoxGame(atoms, size)
+    exits = []
+    for row, col in game_def.get('shots', ()):
+        try:
+            exit_point = game.shoot_ray(int(row), int(col))
+        except RuntimeError:
+            exit_point = 'trapped'
+        exits.append(list(exit_point) if isinstance(exit_point, tuple) else exit_point)
+    hits = [game.guess_atom(int(row), int(col)) for row, col in game_def.get('guesses', ())]
+    result = {'exits': exits, 'hits': hits, 'score': game.get_score(), 'atoms_left': game.atoms_left()}
+    if 'id' in game_def:
+        result = dict(id=game_def['id'], **result)
+    return result
+
+
+def play_line(number, line):
+    """Takes in a line number and a JSON game line, returns the JSON result line (without newline), or None for a
+    blank line."""
+    if not line.strip():
+        return None
+    try:
+        result = play(json.loads(line))
+    except (ValueError, KeyError, TypeError, OverflowError) as error:
+        result = {'line': number, 'error': str(error) or type(error).__name__}
+    return json.dumps(result)
+
+
+def play_chunk(chunk):
+    """Takes in a list of (line number, line) pairs and returns the list of their result lines. Runs in a worker
+    process with --jobs."""
+    return [play_line(number, line) for number, line in chunk]
+
+
+def read_lines(paths):
+    """Takes in a list of file paths ('-' for stdin) and yields (line number, line) pairs, counting across files."""
+    number = 0
+    for path in paths or ['-']:
+        stream = sys.stdin if path == '-' else open(path)
+        try:
+            for line in stream:
+                number += 1
+                yield number, line
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+
+def chunks(lines, size):
+    """Takes in an iterator of lines and a chunk size, yields lists of up to size lines."""
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run(lines, out, jobs=1, chunk=CHUNK):
+    """Takes in an iterator of (line number, line) pairs, a writable text stream, the number of worker processes
+    and the lines per chunk, plays every game and writes the results in input order. With more than one job at most
+    four chunks per worker are queued at once, so reading never runs far ahead of writing. Returns the number of
+    results written."""
+    written = 0
+    if jobs <= 1:
+        for number, line in lines:
+            result = play_line(number, line)
+            if result is not None:
+                out.write(result + '\n')
+                written += 1
+        return written
+    import multiprocessing      # only paid for when asked to run in parallel
+    pending = deque()
+    with multiprocessing.Pool(jobs) as pool:
+        for part in chunks(lines, chunk):
+            pending.append(pool.apply_async(play_chunk, (part,)))
+            if len(pending) >= jobs * 4:
+                written += _write(pending.popleft().get(), out)
+        while pending:
+            written += _write(pending.popleft().get(), out)
+    return written
+
+
+def _write(results, out):
+    """Takes in a list of result lines and a stream, writes the lines that are not None and returns how many."""
+    results = [result for result in results if result is not None]
+    if results:
+        out.write('\n'.join(results) + '\n')
+    return len(results)
+
+
+def main():
+    """Parses the command line and plays the games."""
+    parser = argparse.ArgumentParser(prog='python3 -m blackbox',
+                                     description='Play scripted BlackBox games from JSON lines.')
+    parser.add_argument('paths', nargs='*', help="JSON lines files, '-' or nothing for stdin")
+    parser.add_argument('--jobs', type=int, default=1, help='worker processes')
+    parser.add_argument('--chunk', type=int, default=CHUNK, help='lines handed to a worker at a time')
+    parser.add_argument('--output', '-o', help='file to write results to instead of stdout')
+    args = parser.parse_args()
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        run(read_lines(args.paths), out, args.jobs, max(1, args.chunk))
+    except BrokenPipeError:     # the reader went away, e.g. piped into head; keep the exit flush quiet
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
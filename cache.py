@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# Date: 10/18/26
+# Description: Bounded least recently used cache of the data BlackBoxGame works out from its atoms (reflection,
+# deflection and double deflection squares and the exit table). Layouts are keyed by a canonical form over the eight
+# rotations and mirror images of the board, so a layout, its rotations and its reflections share one entry and the
+# squares and exits are mapped back onto the layout asked for. Games built through the cache share the data instead
+# of building it again.
+# Usage:
+#       cache = LayoutCache(4096)
+#       game = cache.game([(7, 1), (7, 3), (3, 6), (1, 6)])
+#       cache.get_stats() -> {'hits': ..., 'symmetric_hits': ..., 'misses': ..., 'evictions': ..., 'layouts': ...}
+
+from collections import OrderedDict
+from functools import lru_cache
+
+from BlackBoxGame import BlackBoxGame
+from tracer import legal_entries, symmetries
+
+
+@lru_cache(maxsize=None)
+def _transforms(size):
+    """Takes in the board size and returns the eight symmetries of the board and, for each one, the index of the
+    symmetry that undoes it."""
+    transforms = symmetries(size)
+    probe = [(0, 1), (1, 0)]  # no symmetry but the identity leaves both in place
+    inverse = []
+    for transform in transforms:
+        for index, other in enumerate(transforms):
+            if all(other(*transform(*square)) == square for square in probe):
+                inverse.append(index)
+                break
+    return transforms, inverse
+
+
+def canonical(atom_positions, size=10):
+    """Takes in a list of atom positions and the board size, returns (canonical, index): the smallest sorted tuple
+    of atoms among the eight symmetries of the layout and the index into symmetries(size) of the one that gives it.
+    Layouts that are rotations or mirror images of each other have the same canonical form."""
+    return _canonical(tuple(sorted(set(atom_positions))), size)
+
+
+@lru_cache(maxsize=1 << 16)
+def _canonical(atom_positions, size):
+    """Takes in a sorted tuple of atom positions and the board size and does the work of canonical(). Recent
+    layouts are remembered so looking one up again skips the eight transforms."""
+    best = None
+    best_index = 0
+    for index, transform in enumerate(_transforms(size)[0]):
+        layout = tuple(sorted({transform(*atom) for atom in atom_positions}))
+        if best is None or layout < best:
+            best = layout
+            best_index = index
+    return best, best_index
+
+
+class LayoutCache:
+    """Least recently used cache of derived game data keyed by (size, canonical layout). Each entry keeps the data
+    of every orientation asked for so far, the canonical orientation first."""
+
+    def __init__(self, capacity=4096):
+        """Takes in the most canonical layouts to keep."""
+        self._capacity = capacity
+        self._entries = OrderedDict()  # (size, canonical) -> {symmetry index: derived tuple}
+        self._hits = 0
+        self._symmetric_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, atom_positions, size=10):
+        """Takes in a list of atom positions and the board size, returns the tuple BlackBoxGame.get_derived() would
+        give for them, from the cache when this layout or one of its symmetries has been seen."""
+        layout, index = canonical(atom_positions, size)
+        key = (size, layout)
+        orientations = self._entries.get(key)
+        if orientations is None:
+            self._misses += 1
+            orientations = {0: BlackBoxGame(list(layout), size).get_derived()}
+            self._entries[key] = orientations
+            if len(self._entries) > self._capacity:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        elif index in orientations:
+            self._hits += 1
+            self._entries.move_to_end(key)
+            return orientations[index]
+        else:
+            self._hits += 1
+            self._symmetric_hits += 1
+            self._entries.move_to_end(key)
+        if index not in orientations:
+            orientations[index] = self._orient(orientations[0], index, size)
+        return orientations[index]
+
+    def game(self, atom_positions, size=10):
+        """Takes in a list of atom positions and the board size, returns a new BlackBoxGame sharing the cached
+        data."""
+        return BlackBoxGame(atom_positions, size, self.get(atom_positions, size))
+
+    def get_stats(self):
+        """Returns a dictionary of hits (symmetric_hits of them served by mapping another orientation), misses,
+        evictions and the number of layouts held."""
+        return {'hits': self._hits, 'symmetric_hits': self._symmetric_hits, 'misses': self._misses,
+                'evictions': self._evictions, 'layouts': len(self._entries)}
+
+    def clear(self):
+        """Empties the cache and resets the statistics."""
+        self.__init__(self._capacity)
+
+    @staticmethod
+    def _orient(derived, index, size):
+        """Takes in the derived tuple of a canonical layout and the index of the symmetry that maps the wanted
+        layout onto it, returns the derived tuple of the wanted layout."""
+        transforms, inverse = _transforms(size)
+        forward = transforms[index]
+        back = transforms[inverse[index]]
+        reflection, deflection, double, table = derived
+        oriented = dict()
+        for entry in legal_entries(size):
+            exit_point = table.get(forward(*entry), False)
+            if exit_point is not False:     # trapped entries stay out of the table
+                oriented[entry] = back(*exit_point) if exit_point is not None else None
+        return ({back(*square) for square in reflection}, {back(*square) for square in deflection},
+                {back(*square) for square in double}, oriented)
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# Date: 10/18/26
+# Description: Append-only binary event log for BlackBox games. Every new game, atom, shoot_ray() and guess_atom()
+# becomes one fixed size 32 byte record holding the score after it, so final scores and timelines can be rebuilt
+# from the file alone (see replay.py). Records are packed into an in-memory batch and whole batches are written by a
+# background thread, so playing a game never waits on the disk.
+# Usage:
+#       with EventLog('events.log') as log:
+#           game = log.game([(7, 1), (7, 3), (3, 6), (1, 6)])
+#           game.shoot_ray(4, 9)
+#           game.guess_atom(7, 1)
+
+import os
+import queue
+import struct
+import threading
+import time
+
+from BlackBoxGame import BlackBoxGame
+
+# one record: game id, time in ns, kind, flags, row, column, exit row, exit column, score, atoms left, padding
+EVENT = struct.Struct('<QqBBhhhhhH2x')
+
+# kinds of event
+NEW = 0         # row holds the board size, column the number of atoms
+ATOM = 1        # one per atom right after NEW, row and column hold its position
+SHOOT = 2       # row and column are the entry, exit row and column the exit or -1 if there is none
+GUESS = 3       # row and column are the guess
+
+# flags
+HIT = 1         # the ray hit an atom, or the guess found one
+ILLEGAL = 2     # the entry was not a legal entry square
+TRAPPED = 4     # the ray never left the box
+REFLECT = 8     # the entry is a reflection square, so the ray came straight back out (a double deflection that
+                # also comes back out where it went in does not set it)
+
+BATCH = 1 << 16     # bytes packed before a batch is handed to the writer thread
+
+# range of the signed 16 bit square and score fields
+LOWEST = -1 << 15
+HIGHEST = (1 << 15) - 1
+
+
+class EventLog:
+    """Writes events to an append-only file. Events are packed into a bytearray and every BATCH bytes the batch
+    goes on a queue to a writer thread. Game ids are a random 32 bit prefix for this log object followed by a
+    32 bit counter, so logs written by several processes into one file keep their games apart."""
+
+    def __init__(self, path, batch=BATCH, pending=64):
+        """Takes in the file path, the batch size in bytes and how many batches may wait for the writer before
+        recording slows down to let it catch up."""
+        self._file = open(path, 'ab')
+        self._batch = batch
+        self._buffer = bytearray()
+        self._queue = queue.Queue(pending)
+        self._next_game = int.from_bytes(os.urandom(4), 'little') << 32
+        self._error = None      # exception that stopped the writer thread, raised by flush()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write, daemon=True)
+        self._writer.start()
+
+    def __enter__(self):
+        """Returns the log for use in a with block."""
+        return self
+
+    def __exit__(self, *exc):
+        """Closes the log at the end of a with block."""
+        self.close()
+
+    def game(self, atom_positions, size=10, derived=None):
+        """Takes in the arguments of BlackBoxGame, records a NEW event and one ATOM event per atom, and returns
+        the game wrapped in a RecordedGame that records every shot and guess. Raises ValueError, before anything is
+        recorded, for a size, atom count or atom that does not fit its field or if the log is closed."""
+        self._check_open()
+        check_square(size, len(atom_positions))
+        for row, column in atom_positions:
+            check_square(row, column)
+        game = BlackBoxGame(atom_positions, size, derived)
+        game_id = self._next_game
+        self._next_game += 1
+        self.record(game_id, NEW, 0, size, len(atom_positions), -1, -1, game.get_score(), game.atoms_left())
+        for row, column in atom_positions:
+            self.record(game_id, ATOM, 0, row, column, -1, -1, game.get_score(), game.atoms_left())
+        return RecordedGame(game, self, game_id)
+
+    def record(self, game_id, kind, flags, row, column, exit_row, exit_column, score, atoms_left):
+        """Takes in the fields of one event and adds it to the current batch, handing the batch to the writer
+        thread once it is full. Squares must already be checked with check_square(); a score beyond the field is
+        recorded as its lowest or highest value, since it is only known after the game has moved on. Raises
+        ValueError if the log is closed."""
+        self._check_open()
+        score = min(max(score, LOWEST), HIGHEST)
+        self._buffer += EVENT.pack(game_id, time.time_ns(), kind, flags, row, column, exit_row, exit_column, score,
+                                   atoms_left)
+        if len(self._buffer) >= self._batch:
+            self._queue.put(bytes(self._buffer))
+            self._buffer.clear()
+
+    def flush(self):
+        """Hands the partly filled batch to the writer thread and waits until everything recorded is on disk.
+        Raises the exception that stopped the writer if writing failed, or ValueError if the log is closed."""
+        self._check_open()
+        if self._buffer:
+            self._queue.put(bytes(self._buffer))
+            self._buffer.clear()
+        self._queue.join()
+        if self._error is not None:
+            raise self._error
+
+    def close(self):
+        """Flushes the log, stops the writer thread and closes the file. Raises like flush() if writing failed,
+        after closing. Closing a closed log does nothing."""
+        if self._closed:
+            return
+        try:
+            self.flush()
+        finally:
+            self._closed = True
+            self._queue.put(None)
+            self._writer.join()
+            self._file.close()
+
+    def _check_open(self):
+        """Raises ValueError if the log is closed."""
+        if self._closed:
+            raise ValueError('log is closed')
+
+    def _write(self):
+        """Runs in the writer thread: writes batches from the queue to the file until it gets None. After a
+        failed write the exception is kept for flush() and later batches are dropped, so nothing waits on the
+        queue forever."""
+        while True:
+            batch = self._queue.get()
+            try:
+                if batch is not None and self._error is None:
+                    self._file.write(batch)
+                    self._file.flush()
+            except Exception as error:
+                self._error = error
+            finally:
+                self._queue.task_done()
+            if batch is None:
+                return
+
+
+class RecordedGame:
+    """Wraps a BlackBoxGame and records its shots and guesses to an EventLog. Every other method is passed
+    straight through to the game."""
+
+    __slots__ = ('_game', '_log', '_id')
+
+    def __init__(self, game, log, game_id):
+        """Takes in the game, the EventLog and the game id to record under."""
+        self._game = game
+        self._log = log
+        self._id = game_id
+
+    def __getattr__(self, name):
+        """Returns the game's own attribute for anything not recorded."""
+        return getattr(self._game, name)
+
+    def get_game_id(self):
+        """Returns the id the game's events are recorded under."""
+        return self._id
+
+    def shoot_ray(self, row, column):
+        """Shoots the ray with BlackBoxGame.shoot_ray() and records the result. Raises ValueError, leaving the
+        game alone, for a square that does not fit an event or if the log is closed."""
+        self._log._check_open()
+        check_square(row, column)
+        game = self._game
+        try:
+            exit_point = game.shoot_ray(row, column)
+        except RuntimeError:
+            self._log.record(self._id, SHOOT, TRAPPED, row, column, -1, -1, game.get_score(), game.atoms_left())
+            raise
+        if exit_point is False:
+            flags, exit_row, exit_column = ILLEGAL, -1, -1
+        elif exit_point is None:
+            flags, exit_row, exit_column = HIT, -1, -1
+        elif exit_point == (row, column) and exit_point in game.get_reflection_squares():
+            flags, (exit_row, exit_column) = REFLECT, exit_point
+        else:
+            flags, (exit_row, exit_column) = 0, exit_point
+        self._log.record(self._id, SHOOT, flags, row, column, exit_row, exit_column, game.get_score(),
+                         game.atoms_left())
+        return exit_point
+
+    def guess_atom(self, row, column):
+        """Guesses with BlackBoxGame.guess_atom() and records the result. Raises ValueError, leaving the game
+        alone, for a square that does not fit an event or if the log is closed."""
+        self._log._check_open()
+        check_square(row, column)
+        game = self._game
+        hit = game.guess_atom(row, column)
+        self._log.record(self._id, GUESS, HIT if hit else 0, row, column, -1, -1, game.get_score(),
+                         game.atoms_left())
+        return hit
+
+
+def check_square(row, column):
+    """Takes in a row and column and raises ValueError unless both are ints that fit an event's 16 bit fields."""
+    for value in (row, column):
+        if not isinstance(value, int) or not LOWEST <= value <= HIGHEST:
+            raise ValueError('%r does not fit an event field' % (value,))
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# Date: 10/18/26
+# Description: Differential fuzzer for the ray engines. Builds random and adversarial layouts (atoms on the grid
+# edge, in the corners, in adjacent and one-apart pairs, in dense clusters), traces every entry of every layout with
+# the reference, the original recursive walk frozen in reference.py, and with each engine under test, and shrinks
+# any layout where they disagree to one where removing any atom makes them agree. Work is cut into seeded chunks spread over a process pool, so a run
+# finds the same layouts whatever the number of workers, and layouts checked per second is reported as it goes.
+# Usage:
+#       python3 fuzz.py --layouts 1000000 --workers 8
+#       python3 fuzz.py --engines table,edited --sizes 5,6,10 --kinds edge,corner
+#       python3 fuzz.py --engines mymodule:my_engine
+
+import argparse
+import importlib
+import json
+import random
+import sys
+import time
+
+from BlackBoxGame import BlackBoxGame
+from reference import ReferenceGame
+from solver import mask_tracer, to_mask, HIT, TRAPPED
+from tracer import legal_entries, grid_edge
+
+try:
+    import batch
+except ImportError:     # numpy is optional, the batch engine is left out without it
+    batch = None
+
+# Engines are module level functions taking (layouts, size), a list of atom lists on one board size, and returning
+# one tuple per layout of the outcome of every entry in legal_entries(size) order: the exit's index, HIT or TRAPPED.
+
+
+def _outcome(exit_point, index):
+    """Takes in what a ray returned (exit square or None) and the entry -> index dictionary, returns its code."""
+    return HIT if exit_point is None else index[exit_point]
+
+
+def recursive_engine(layouts, size):
+    """The reference: follows every ray with the original recursive walk and special square finders kept in
+    reference.py, which share no rule code with the other engines. A ray stuck on a deflection square counts as
+    TRAPPED; any other error is a bug in the reference and is raised."""
+    entries = legal_entries(size)
+    index = {entry: number for number, entry in enumerate(entries)}
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 8 * size * size + 200))
+    results = []
+    for atoms in layouts:
+        game = ReferenceGame(atoms, size)
+        outcomes = []
+        for entry in entries:
+            try:
+                outcomes.append(_outcome(game.shoot_ray(*entry), index))
+            except RecursionError:
+                raise
+            except RuntimeError:
+                outcomes.append(TRAPPED)
+        results.append(tuple(outcomes))
+    return results
+
+
+def table_engine(layouts, size):
+    """Reads every ray from the exit table shoot_ray() uses, built by the loop tracer over a CellMap."""
+    entries = legal_entries(size)
+    index = {entry: number for number, entry in enumerate(entries)}
+    results = []
+    for atoms in layouts:
+        table = BlackBoxGame(atoms, size).exit_table()
+        results.append(tuple(_outcome(table[entry], index) if entry in table else TRAPPED for entry in entries))
+    return results
+
+
+def path_engine(layouts, size):
+    """Follows every ray with BlackBoxGame.trace_path() and reads where the path ends."""
+    entries = legal_entries(size)
+    index = {entry: number for number, entry in enumerate(entries)}
+    results = []
+    for atoms in layouts:
+        game = BlackBoxGame(atoms, size)
+        outcomes = []
+        for entry in entries:
+            try:
+                for event, square in game.trace_path(*entry):
+                    pass
+            except RuntimeError:
+                outcomes.append(TRAPPED)
+                continue
+            outcomes.append(index[square] if event == 'exit' else HIT)
+        results.append(tuple(outcomes))
+    return results
+
+
+def edited_engine(layouts, size):
+    """Builds each layout one add_atom() at a time on a game that starts with a decoy atom, which is then removed,
+    so the incrementally kept special squares are the ones traced."""
+    entries = legal_entries(size)
+    index = {entry: number for number, entry in enumerate(entries)}
+    results = []
+    for atoms in layouts:
+        decoy = (1, 1) if (1, 1) not in atoms else (size - 2, size - 2)
+        game = BlackBoxGame([decoy], size)
+        game.exit_table()
+        for atom in atoms:
+            game.add_atom(*atom)
+        if decoy not in atoms:
+            game.remove_atom(*decoy)
+        table = game.exit_table()
+        results.append(tuple(_outcome(table[entry], index) if entry in table else TRAPPED for entry in entries))
+    return results
+
+
+def solver_engine(layouts, size):
+    """Traces every ray with the solver's bitset tracer."""
+    tracer = mask_tracer(size)
+    count = len(legal_entries(size))
+    return [tuple(tracer.trace(to_mask(atoms, size), entry) for entry in range(count)) for atoms in layouts]
+
+
+def batch_engine(layouts, size):
+    """Traces every ray of every layout at once with batch.trace_batch(). Reflections are reported as exits at the
+    entry square."""
+    codes = batch.trace_batch(layouts, size)
+    entry = batch.np.arange(codes.shape[1])
+    codes = batch.np.where(codes == batch.REFLECT, entry, codes)
+    return [tuple(row) for row in codes.tolist()]
+
+
+ENGINES = {'recursive': recursive_engine, 'table': table_engine, 'path': path_engine, 'edited': edited_engine,
+           'solver': solver_engine}
+if batch is not None:
+    ENGINES['batch'] = batch_engine
+
+
+# Layout makers are module level functions taking (rng, size) and returning a list of distinct atoms inside the
+# entry squares.
+
+
+def random_atoms(rng, size):
+    """Returns one to an eighth of the inner squares, at random."""
+    inner = [(row, col) for row in range(1, size - 1) for col in range(1, size - 1)]
+    return rng.sample(inner, rng.randint(1, max(1, len(inner) // 8)))
+
+
+def edge_atoms(rng, size):
+    """Returns atoms mostly on the grid edge, where the reflection rules apply, with a few inside it."""
+    ring = list(grid_edge(size))
+    atoms = set(rng.sample(ring, rng.randint(1, max(1, len(ring) // 3))))
+    atoms.update(random_atoms(rng, size)[:rng.randint(0, 2)])
+    return sorted(atoms)
+
+
+def corner_atoms(rng, size):
+    """Returns atoms packed into the three by three blocks at the corners of the playing area."""
+    last = size - 2
+    near = [(row, col) for row in range(1, last + 1) for col in range(1, last + 1)
+            if min(row - 1, last - row) < 3 and min(col - 1, last - col) < 3]
+    return rng.sample(near, rng.randint(1, min(len(near), 8)))
+
+
+def pair_atoms(rng, size):
+    """Returns pairs of atoms side by side, diagonal or one square apart, the layouts behind double deflections."""
+    atoms = set()
+    for _ in range(rng.randint(1, 4)):
+        row, col = rng.randrange(1, size - 1), rng.randrange(1, size - 1)
+        step_row, step_col = rng.choice([(0, 1), (1, 0), (1, 1), (1, -1), (0, 2), (2, 0), (2, 2), (2, -2)])
+        for atom in ((row, col), (row + step_row, col + step_col)):
+            if 0 < atom[0] < size - 1 and 0 < atom[1] < size - 1:
+                atoms.add(atom)
+    return sorted(atoms)
+
+
+def dense_atoms(rng, size):
+    """Returns a dense cluster: most squares of a small window somewhere on the board."""
+    width = rng.randint(2, min(5, size - 2))
+    top, left = rng.randint(1, size - 1 - width), rng.randint(1, size - 1 - width)
+    share = rng.uniform(0.4, 0.9)
+    atoms = [(row, col) for row in range(top, top + width) for col in range(left, left + width) if rng.random() < share]
+    return atoms or [(top, left)]
+
+
+KINDS = {'random': random_atoms, 'edge': edge_atoms, 'corner': corner_atoms, 'pair': pair_atoms,
+         'dense': dense_atoms}
+
+
+def disagreements(reference, engine, atoms, size):
+    """Takes in two engines, a layout and the board size, returns the list of (entry, reference outcome, engine
+    outcome) where they differ."""
+    expected, = reference([atoms], size)
+    found, = engine([atoms], size)
+    entries = legal_entries(size)
+    return [(entries[number], want, got) for number, (want, got) in enumerate(zip(expected, found)) if want != got]
+
+
+def shrink(reference, engine, atoms, size):
+    """Takes in two engines that disagree on a layout and returns a smaller layout they still disagree on, from
+    which no single atom can be removed without them agreeing."""
+    atoms = list(atoms)
+    shrunk = True
+    while shrunk and len(atoms) > 1:
+        shrunk = False
+        for number in range(len(atoms)):
+            fewer = atoms[:number] + atoms[number + 1:]
+            if disagreements(reference, engine, fewer, size):
+                atoms = fewer
+                shrunk = True
+                break
+    return atoms
+
+
+def check_chunk(work):
+    """Takes in a (engine names, seed, layouts, sizes, kinds, most mismatches to keep) work unit, checks that many
+    layouts made from one random.Random seeded from seed and returns (layouts checked, rays checked, mismatches).
+    Each mismatch is a dictionary of the engine, size, shrunk atoms and differing entries. Runs inside worker
+    processes."""
+    names, seed, count, sizes, kinds, keep = work
+    rng = random.Random(seed)
+    reference = ENGINES['recursive']
+    engines = [(name, load_engine(name)) for name in names]
+    by_size = dict()
+    for _ in range(count):
+        size = rng.choice(sizes)
+        by_size.setdefault(size, []).append(KINDS[rng.choice(kinds)](rng, size))
+    rays = 0
+    mismatches = []
+    for size, layouts in by_size.items():
+        expected = reference(layouts, size)
+        rays += len(layouts) * len(legal_entries(size))
+        for name, engine in engines:
+            for atoms, want, got in zip(layouts, expected, engine(layouts, size)):
+                if want != got and len(mismatches) < keep:
+                    atoms = shrink(reference, engine, atoms, size)
+                    mismatches.append({'engine': name, 'size': size, 'atoms': atoms,
+                                       'entries': disagreements(reference, engine, atoms, size)})
+    return count, rays, mismatches
+
+
+def fuzz(names, layouts, sizes=(5, 6, 8, 10, 12), kinds=tuple(KINDS), workers=None, chunk=500, seed=0, keep=5):
+    """Takes in the engine names to check against the reference, the number of layouts, the board sizes and layout
+    kinds to draw from, worker processes (None for one per core, 1 to check in this process), layouts per work unit,
+    the run seed and the most mismatches kept per work unit. Yields (layouts checked, rays checked, new mismatches,
+    layouts per second) each time a chunk finishes."""
+    chunks = [(tuple(names), (seed << 32) + number, min(chunk, layouts - start), tuple(sizes), tuple(kinds), keep)
+              for number, start in enumerate(range(0, layouts, chunk))]
+    checked = rays = 0
+    started = time.perf_counter()
+    if workers == 1:
+        results = map(check_chunk, chunks)
+        pool = None
+    else:
+        from multiprocessing import Pool
+        pool = Pool(workers)
+        results = pool.imap_unordered(check_chunk, chunks)
+    try:
+        for count, chunk_rays, mismatches in results:
+            checked += count
+            rays += chunk_rays
+            yield checked, rays, mismatches, checked / (time.perf_counter() - started)
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+
+def load_engine(name):
+    """Takes in an engine name, either one of ENGINES or module:function, and returns the function."""
+    if ':' in name:
+        module, function = name.split(':', 1)
+        return getattr(importlib.import_module(module), function)
+    return ENGINES[name]
+
+
+def main():
+    """Parses the command line, runs the fuzzer, prints progress to stderr and each shrunk mismatch as a JSON line
+    to stdout. Exits with status 1 if any engine disagreed with the reference."""
+    parser = argparse.ArgumentParser(description='Check ray engines against the original recursive walk in reference.py.')
+    parser.add_argument('--layouts', type=int, default=100000)
+    parser.add_argument('--engines', default=','.join(name for name in ENGINES if name != 'recursive'),
+                        help='comma separated names from %s or module:function' % ', '.join(ENGINES))
+    parser.add_argument('--sizes', default='5,6,8,10,12', help='comma separated board sizes')
+    parser.add_argument('--kinds', default=','.join(KINDS), help='comma separated layout kinds')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, one per core by default')
+    parser.add_argument('--chunk', type=int, default=500, help='layouts per work unit')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    names = args.engines.split(',')
+    sizes = [int(size) for size in args.sizes.split(',')]
+    kinds = args.kinds.split(',')
+    failed = False
+    for checked, rays, mismatches, rate in fuzz(names, args.layouts, sizes, kinds, args.workers, args.chunk,
+                                                args.seed):
+        for mismatch in mismatches:
+            failed = True
+            print(json.dumps(mismatch), flush=True)
+        print('%10d layouts  %12d rays  %8.0f layouts/s' % (checked, rays, rate), file=sys.stderr, flush=True)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,149 @@
+#!/usr/bin/env python3
+# Date: 10/18/26
+# Description: Tkinter window for playing BlackBox. The board is one tk.Canvas. Grid lines are drawn once when the
+# window opens; a cell only gets a canvas item the first time something is shown on it (a ray marker, a guess, an
+# atom) and that item is reconfigured from then on, so nothing piles up however long the session runs. Ray paths
+# reuse one line item per entry square. Score and results are labels bound to StringVars.
+# Todo: randomize atom starting positions or create popup window for player to input
+# Usage:
+#       python3 game.py
+
 import tkinter as tk
 from BlackBoxGame import *
 
-"""
-Todo: 
-1. randomize atom starting positions or create popup window for player to input
-2. setup print board in gui
+BOARD_PIXELS = 640  # the board is scaled to about this many pixels wide
+PATH_DELAY = 30     # milliseconds between animated ray path steps
+RAY_COLOURS = ('#d62728', '#1f77b4', '#2ca02c', '#9467bd', '#ff7f0e', '#8c564b', '#e377c2', '#17becf')
+
+
+class BoardView:
+    """Draws a BlackBoxGame board on a canvas and updates only the cells that change."""
+
+    def __init__(self, parent, game):
+        """Takes in the parent widget and the game, creates the canvas and draws the grid lines and corners."""
+        self._game = game
+        self._size = game.get_size()
+        self._cell = max(2, min(48, BOARD_PIXELS // self._size))
+        side = self._cell * self._size
+        self._canvas = tk.Canvas(parent, width=side, height=side, background='white', highlightthickness=0)
+        self._cells = dict()    # (row, column) -> (rectangle item, text item), created on first use
+        self._atoms = []        # atom items, drawn once and shown or hidden
+        self._atoms_shown = False
+        self._rays = 0
+        self._paths = dict()    # entry square -> [line item, the path animating it], reused for every shot from it
+        self._draw_grid()
+
+    def get_canvas(self):
+        """Returns the canvas widget so it can be placed in a layout."""
+        return self._canvas
+
+    def square_at(self, x, y):
+        """Takes in canvas pixel coordinates and returns the (row, column) square under them, or None."""
+        row, column = int(y // self._cell), int(x // self._cell)
+        if 0 <= row < self._size and 0 <= column < self._size:
+            return row, column
+        return None
+
+    def _draw_grid(self):
+        """Draws the grid lines, the shaded entry border and the corners once."""
+        canvas = self._canvas
+        cell = self._cell
+        side = cell * self._size
+        last = self._size - 1
+        canvas.create_rectangle(0, 0, side, side, fill='#e8e8e8', outline='')
+        canvas.create_rectangle(cell, cell, side - cell, side - cell, fill='white', outline='')
+        for corner in ((0, 0), (0, last), (last, 0), (last, last)):
+            x, y = corner[1] * cell, corner[0] * cell
+            canvas.create_rectangle(x, y, x + cell, y + cell, fill='#a0a0a0', outline='')
+        if cell >= 6:   # lines would cover the cells on very large boards
+            for line in range(self._size + 1):
+                canvas.create_line(line * cell, 0, line * cell, side, fill='#c0c0c0')
+                canvas.create_line(0, line * cell, side, line * cell, fill='#c0c0c0')
+
+    def mark(self, square, text='', fill='', colour='black'):
+        """Takes in a square, the text to show in it, its background colour and text colour, and updates that
+        square's items, creating them the first time."""
+        items = self._cells.get(square)
+        canvas = self._canvas
+        if items is None:
+            x, y = square[1] * self._cell, square[0] * self._cell
+            half = self._cell / 2
+            items = (canvas.create_rectangle(x + 1, y + 1, x + self._cell - 1, y + self._cell - 1, outline=''),
+                     canvas.create_text(x + half, y + half, font=('calibre', max(6, self._cell // 3), 'bold')))
+            self._cells[square] = items
+        canvas.itemconfigure(items[0], fill=fill)
+        canvas.itemconfigure(items[1], text=text, fill=colour)
+
+    def show_ray(self, entry, exit_point):
+        """Takes in an entry square and what shoot_ray() returned for it and marks the ray: H for a hit, R for a
+        reflection, otherwise the same numbered colour at the entry and the exit."""
+        if exit_point is None:
+            self.mark(entry, 'H', '#ffd0d0')
+        elif exit_point == entry:
+            self.mark(entry, 'R', '#fff0b0')
+        else:
+            self._rays += 1
+            colour = RAY_COLOURS[self._rays % len(RAY_COLOURS)]
+            self.mark(entry, str(self._rays), colour=colour)
+            self.mark(exit_point, str(self._rays), colour=colour)
+
+    def show_path(self, path, colour='#606060'):
+        """Takes in a ray path from BlackBoxGame.trace_path() and animates it as a line that grows by a square
+        every PATH_DELAY milliseconds. The path is read one step per frame, so long paths cost nothing up front. Each
+        entry square has one line item, redrawn for every path from it, and a newer path stops an older one."""
+        half = self._cell / 2
+        points = []
+        drawn = None    # the [line item, path] entry of self._paths once the entry square is known
+
+        def step():
+            nonlocal drawn
+            if drawn is not None and drawn[1] is not path:
+                return      # a newer path from the same entry took the line over
+            try:
+                event, (row, column) = next(path)
+            except (StopIteration, RuntimeError):
+                return
+            if event == 'enter':
+                drawn = self._paths.get((row, column))
+                if drawn is None:
+                    drawn = self._paths[(row, column)] = [None, path]
+                else:
+                    drawn[1] = path
+                    self._canvas.itemconfigure(drawn[0], state='hidden')
+            if event in ('enter', 'cell', 'hit', 'exit'):
+                points.extend((column * self._cell + half, row * self._cell + half))
+                if len(points) >= 4:
+                    if drawn[0] is None:
+                        drawn[0] = self._canvas.create_line(*points, fill=colour, width=max(1, self._cell // 12),
+                                                            arrow='last')
+                    else:
+                        self._canvas.coords(drawn[0], *points)
+                        self._canvas.itemconfigure(drawn[0], fill=colour, state='normal')
+            self._canvas.after(PATH_DELAY, step)
+
+        step()
+
+    def show_guess(self, square, correct):
+        """Takes in a guessed square and whether it held an atom and marks it."""
+        if correct:
+            self.mark(square, 'A', '#b0e0b0')
+        else:
+            self.mark(square, 'X', '', '#d62728')
+
+    def toggle_atoms(self):
+        """Shows the atoms if they are hidden and hides them if they are shown. Atom items are drawn the first time
+        and only their state changes afterwards."""
+        if not self._atoms:
+            cell = self._cell
+            for row, column in self._game.get_atoms():
+                x, y = column * cell, row * cell
+                self._atoms.append(self._canvas.create_oval(x + cell * 0.2, y + cell * 0.2, x + cell * 0.8,
+                                                            y + cell * 0.8, fill='black', state='hidden'))
+        self._atoms_shown = not self._atoms_shown
+        for item in self._atoms:
+            self._canvas.itemconfigure(item, state='normal' if self._atoms_shown else 'hidden')
+        return self._atoms_shown
 
-"""
 
 root = tk.Tk()
 game = BlackBoxGame([(8,8), (1,1), (1,8)])
@@ -20,62 +157,108 @@ shoot_row_var = tk.StringVar()
 shoot_col_var = tk.StringVar()
 guess_row_var = tk.StringVar()
 guess_col_var = tk.StringVar()
+# and for the text shown after each action, the labels below stay bound to them
+score_var = tk.StringVar(value='Current Score:' + str(game.get_score()))
+shoot_result_var = tk.StringVar()
+guess_result_var = tk.StringVar()
+
+board = BoardView(root, game)
+help_popup = None
+
+
+def readSquare(row_var, col_var):
+    """Takes in the row and column StringVars, returns the (row, column) they hold and clears them, or None if
+    they do not hold whole numbers."""
+    try:
+        square = (int(row_var.get()), int(col_var.get()))
+    except ValueError:
+        return None
+    row_var.set("")
+    col_var.set("")
+    return square
+
 
-# defining a function that will get the current score
 def getScore():
-    """
-    Todo: docstrings
-    """
-    score = game.get_score()
-    guessScoreLabel = tk.Label(root, text='Current Score:' + str(score))
-    guessScoreLabel.grid(row=10, column=1)
+    """Updates the score label from the game."""
+    score_var.set('Current Score:' + str(game.get_score()))
+
+
+def shootSquare(row, col):
+    """Shoots a ray from row, col, shows the result next to the board and on it and updates the score."""
+    try:
+        ray = game.shoot_ray(row, col)
+    except RuntimeError:
+        shoot_result_var.set('result: ray never leaves the box')
+        board.mark((row, col), '?', '#e0e0ff')
+    else:
+        shoot_result_var.set('result:' + str(ray))
+        if ray is not False:
+            board.show_ray((row, col), ray)
+            board.show_path(game.trace_path(row, col))
+    getScore()
+
+
+def guessSquare(row, col):
+    """Guesses an atom at row, col, shows the result next to the board and on it and updates the score."""
+    guess = game.guess_atom(row, col)
+    guess_result_var.set('guess:' + str(guess))
+    if 0 <= row < game.get_size() and 0 <= col < game.get_size():
+        board.show_guess((row, col), guess)
+    getScore()
 
-def guessAtom():
-    """
-    Todo: docstrings
-    """
-    guessRow = int(guess_row_var.get())
-    guessCol = int(guess_col_var.get())
-    guess = game.guess_atom(guessRow,guessCol)
-    guessLabel = tk.Label(root, text = 'guess:'+str(guess))
-    guessLabel.grid(row=8, column=1)
-    guess_row_var.set("")
-    guess_col_var.set("")
 
 def shootRay():
-    """
-    Todo: docstrings
-    """
-    shootRow = int(shoot_row_var.get())
-    shootCol = int(shoot_col_var.get())
-    ray = game.shoot_ray(shootRow, shootCol)
-    shootLabel = tk.Label(root, text = 'result:'+str(ray))
-    shootLabel.grid(row=3, column=1)
-    shoot_row_var.set("")
-    shoot_col_var.set("")
+    """Shoots a ray from the square typed into the shoot entries."""
+    square = readSquare(shoot_row_var, shoot_col_var)
+    if square is None:
+        shoot_result_var.set('result: enter a row and column')
+        return
+    shootSquare(*square)
+
+
+def guessAtom():
+    """Guesses the square typed into the guess entries."""
+    square = readSquare(guess_row_var, guess_col_var)
+    if square is None:
+        guess_result_var.set('guess: enter a row and column')
+        return
+    guessSquare(*square)
+
+
+def boardClick(event):
+    """Shoots a ray when a border square is clicked and guesses when an inner square is clicked."""
+    square = board.square_at(event.x, event.y)
+    if square is None:
+        return
+    last = game.get_size() - 1
+    if square[0] in (0, last) or square[1] in (0, last):
+        shootSquare(*square)
+    else:
+        guessSquare(*square)
+
 
 def displayBoard():
-    """
-    Todo: docstrings    guessRow = int(guess_row_var.get())
+    """Shows or hides the atoms on the board."""
+    shown = board.toggle_atoms()
+    board_btn.configure(text='Hide Board' if shown else 'Display Board')
 
-    """
-    board = game.print_board()
-    boardLabel = tk.Label(root, text=board)
-    boardLabel.grid(row=20, column=1)
 
 def displayHelp():
-    """
-    Todo: docstrings
-    """
-    description = "To the play the game either enter (row, column) to guess an atom position or \n\
+    """Shows the help window, creating it the first time; closing it only hides it."""
+    global help_popup
+    if help_popup is None:
+        description = "To the play the game either enter (row, column) to guess an atom position or \n\
                    enter an entry row and column to specify where to shoot a ray into the blackbox from.\n\
+                   Clicking a border square of the board shoots from it, clicking an inner square guesses it.\n\
                    For rules and additional information about blackbox visit:\n\
                    https://en.wikipedia.org/wiki/Black_Box_(game)"
-    popup = tk.Tk()
-    popup.wm_title('Help')
-    helpLabel = tk.Label(popup, text=description)
-    helpLabel.grid(row=0, column=0)
-    popup.mainloop()
+        help_popup = tk.Toplevel(root)
+        help_popup.wm_title('Help')
+        help_popup.protocol('WM_DELETE_WINDOW', help_popup.withdraw)
+        helpLabel = tk.Label(help_popup, text=description)
+        helpLabel.grid(row=0, column=0)
+    help_popup.deiconify()
+    help_popup.lift()
 
 
 # creating a label for guess and shoot
@@ -85,6 +268,11 @@ guess_col_label = tk.Label(root, text='Column', font=('calibre', 10, 'bold')).gr
 shoot_row_label = tk.Label(root, text='Row', font=('calibre', 10, 'bold')).grid(row=1, column=1)
 shoot_col_label = tk.Label(root, text='Column', font=('calibre', 10, 'bold')).grid(row=1, column=2)
 
+# result labels, created once and updated through their StringVars
+shoot_result_label = tk.Label(root, textvariable=shoot_result_var)
+guess_result_label = tk.Label(root, textvariable=guess_result_var)
+score_label = tk.Label(root, textvariable=score_var)
+
 
 # creating a entry for guessing atom position and shooting a ray to enumerate location
 guess_row_entry = tk.Entry(root, textvariable=guess_row_var, font=('calibre', 10, 'normal'))
@@ -107,20 +295,24 @@ help_btn = tk.Button(root, text='Help', command=displayHelp)
 shoot_row_entry.grid(row=2, column=1)
 shoot_col_entry.grid(row=2, column=2)
 shoot_btn.grid(row=3, column=2)
+shoot_result_label.grid(row=3, column=1)
 # guess entry and button
 guess_row_entry.grid(row=5, column=1)
 guess_col_entry.grid(row=5, column=2)
 guess_btn.grid(row=6, column=2)
+guess_result_label.grid(row=8, column=1)
 # check score button
 score_btn.grid(row=7, column=1)
-# print gameboard button
+score_label.grid(row=10, column=1)
+# show atoms button
 board_btn.grid(row=7, column=2)
 # help button
 help_btn.grid(row=7, column=3)
+# the board itself, clicks shoot or guess
+board.get_canvas().grid(row=0, column=4, rowspan=21, padx=20, pady=20)
+board.get_canvas().bind('<Button-1>', boardClick)
 
 
 # performing an infinite loop
 # for the window to display
 root.mainloop()
-
-
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# Date: 10/18/26
+# Description: Opt-in counters and timers for BlackBox games. InstrumentedGame is a BlackBoxGame that times each
+# pass of its constructor (reflection, deflection and double deflection squares, the cell map and the exit table)
+# and follows its rays with CellMap.path() so every step, deflection, double deflection, reflection, hit and exit is
+# counted, per game and in one process wide total. Rays are traced once, for the exit table, so each shot adds the
+# counts its ray had then to the shot counters. Plain BlackBoxGame objects are untouched, so games built without
+# this module pay nothing for it. Counts come out as a dictionary or as Prometheus text.
+# Usage:
+#       from metrics import InstrumentedGame, get_global
+#       game = InstrumentedGame([(7, 1), (7, 3), (3, 6), (1, 6)])
+#       game.shoot_ray(4, 9)
+#       game.get_metrics().get_stats()      (this game)
+#       print(get_global().to_prometheus())     (every instrumented game so far)
+
+from time import perf_counter
+
+from BlackBoxGame import BlackBoxGame
+from tracer import CellMap
+
+# counters kept for traced rays, in the order they are reported
+RAY_COUNTERS = ('rays', 'steps', 'deflections', 'double_deflections', 'reflections', 'hits', 'exits', 'trapped')
+
+# counters kept for shoot_ray() calls on legal entries, whether or not the ray was traced for that shot
+SHOT_COUNTERS = ('shots',) + tuple('shot_' + name for name in RAY_COUNTERS[1:])
+
+# constructor and first use passes that are timed
+PHASES = ('reflection_squares', 'deflection_squares', 'double_deflection_squares', 'cell_map', 'exit_table')
+
+# path event -> counter it adds to
+_EVENT_COUNTER = {'cell': 'steps', 'deflect': 'deflections', 'double': 'double_deflections',
+                  'reflect': 'reflections', 'hit': 'hits', 'exit': 'exits'}
+
+_HELP = {'rays': 'Rays traced.', 'steps': 'Squares inside the box passed through by traced rays.',
+         'deflections': 'Deflections along traced rays.', 'double_deflections': 'Double deflections along traced rays.',
+         'reflections': 'Rays reflected straight back at their entry.', 'hits': 'Rays absorbed by an atom.',
+         'exits': 'Rays that left the box.', 'trapped': 'Rays that never leave the box.',
+         'shots': 'Rays shot from a legal entry.', 'shot_steps': 'Squares inside the box passed through by shot rays.',
+         'shot_deflections': 'Deflections along shot rays.',
+         'shot_double_deflections': 'Double deflections along shot rays.',
+         'shot_reflections': 'Shot rays reflected straight back at their entry.',
+         'shot_hits': 'Shot rays absorbed by an atom.', 'shot_exits': 'Shot rays that left the box.',
+         'shot_trapped': 'Shot rays that never leave the box.'}
+
+
+class Metrics:
+    """Ray and shot counters, the longest ray seen and the total seconds and number of runs of each timed
+    phase."""
+
+    def __init__(self):
+        """Starts every counter and timer at zero."""
+        self._counts = dict.fromkeys(RAY_COUNTERS + SHOT_COUNTERS, 0)
+        self._max_steps = 0
+        self._seconds = dict.fromkeys(PHASES, 0.0)
+        self._runs = dict.fromkeys(PHASES, 0)
+
+    def add_ray(self, counts):
+        """Takes in the counter -> count dictionary of one traced ray and adds it."""
+        for name, count in counts.items():
+            self._counts[name] += count
+        self._counts['rays'] += 1
+        if counts['steps'] > self._max_steps:
+            self._max_steps = counts['steps']
+
+    def add_shot(self, counts):
+        """Takes in the counter -> count dictionary of the ray a shot followed and adds it to the shot counters."""
+        for name, count in counts.items():
+            self._counts['shot_' + name] += count
+        self._counts['shots'] += 1
+
+    def add_time(self, phase, seconds):
+        """Takes in the name of a phase and the seconds one run of it took and adds them."""
+        self._seconds[phase] += seconds
+        self._runs[phase] += 1
+
+    def reset(self):
+        """Sets every counter and timer back to zero."""
+        self.__init__()
+
+    def get_stats(self):
+        """Returns a dictionary of the ray and shot counters, max_steps and mean_steps, and a phases dictionary of
+        phase -> {'seconds': total, 'runs': count}."""
+        stats = dict(self._counts)
+        stats['max_steps'] = self._max_steps
+        stats['mean_steps'] = round(self._counts['steps'] / self._counts['rays'], 3) if self._counts['rays'] else 0
+        stats['phases'] = {phase: {'seconds': self._seconds[phase], 'runs': self._runs[phase]} for phase in PHASES}
+        return stats
+
+    def to_prometheus(self, prefix='blackbox'):
+        """Takes in a metric name prefix and returns the metrics in the Prometheus text exposition format."""
+        lines = []
+        for name in RAY_COUNTERS + SHOT_COUNTERS:
+            metric = '%s_%s_total' % (prefix, name)
+            lines += ['# HELP %s %s' % (metric, _HELP[name]), '# TYPE %s counter' % metric,
+                      '%s %d' % (metric, self._counts[name])]
+        metric = '%s_max_steps' % prefix
+        lines += ['# HELP %s Most squares passed through by one traced ray.' % metric, '# TYPE %s gauge' % metric,
+                  '%s %d' % (metric, self._max_steps)]
+        for unit, values, text in (('seconds', self._seconds, 'Seconds spent in'), ('runs', self._runs, 'Runs of')):
+            metric = '%s_phase_%s_total' % (prefix, unit)
+            lines += ['# HELP %s %s each game setup phase.' % (metric, text), '# TYPE %s counter' % metric]
+            lines += ['%s{phase="%s"} %s' % (metric, phase, repr(values[phase])) for phase in PHASES]
+        return '\n'.join(lines) + '\n'
+
+
+_GLOBAL = Metrics()
+
+
+def get_global():
+    """Returns the process wide Metrics every InstrumentedGame adds to."""
+    return _GLOBAL
+
+
+class CountingCellMap(CellMap):
+    """CellMap whose trace() walks path() and counts what the ray does into a list of Metrics. The counts of the
+    last ray traced from each entry are kept for the shots that read it from the exit table."""
+
+    def __init__(self, size, atom_positions, reflection, deflection, double_deflection, targets):
+        """Takes in the CellMap arguments and the list of Metrics to count into."""
+        CellMap.__init__(self, size, atom_positions, reflection, deflection, double_deflection)
+        self._targets = targets
+        self._ray_counts = dict()   # entry square -> counts of the last ray traced from it
+
+    def copy(self):
+        """Returns a copy like CellMap.copy(), with its own ray counts."""
+        cell_map = CellMap.copy(self)
+        cell_map._ray_counts = dict(self._ray_counts)
+        return cell_map
+
+    def get_ray_counts(self, row, column):
+        """Takes in an entry square and returns the counts of the last ray traced from it, tracing it first if it
+        has not been. The counts of a trapped ray are returned rather than raised."""
+        if (row, column) not in self._ray_counts:
+            try:
+                self.trace(row, column)
+            except RuntimeError:
+                pass
+        return self._ray_counts[(row, column)]
+
+    def trace(self, row, column):
+        """Follows the ray like CellMap.trace(), counting its steps and events. A ray that never leaves the box is
+        counted as trapped and the RuntimeError is raised again."""
+        counts = dict.fromkeys(RAY_COUNTERS[1:], 0)
+        result = None
+        try:
+            for event, square in self.path(row, column):
+                if event in _EVENT_COUNTER:
+                    counts[_EVENT_COUNTER[event]] += 1
+                if event == 'exit':
+                    result = square
+        except RuntimeError:
+            counts['trapped'] = 1
+            raise
+        finally:
+            self._ray_counts[(row, column)] = counts
+            for metrics in self._targets:
+                metrics.add_ray(counts)
+        return result
+
+
+class InstrumentedGame(BlackBoxGame):
+    """BlackBoxGame that records Metrics for itself and into the process wide total. Clones share the metrics of
+    the game they were made from."""
+
+    __slots__ = ('_metrics',)
+
+    def __init__(self, atom_positions, size=10, derived=None):
+        """Takes in the same arguments as BlackBoxGame. Phases skipped because derived data was passed in are not
+        timed."""
+        self._metrics = Metrics()
+        BlackBoxGame.__init__(self, atom_positions, size, derived)
+
+    def get_metrics(self):
+        """Returns this game's Metrics."""
+        return self._metrics
+
+    def clone(self):
+        """Returns a copy of the game like BlackBoxGame.clone(), sharing this game's metrics."""
+        game = BlackBoxGame.clone(self)
+        game._metrics = self._metrics
+        return game
+
+    def shoot_ray(self, row, column):
+        """Shoots a ray like BlackBoxGame.shoot_ray() and adds it to the shot counters if the entry was legal."""
+        try:
+            exit_point = BlackBoxGame.shoot_ray(self, row, column)
+        except RuntimeError:
+            self._count_shot(row, column)
+            raise
+        if exit_point is not False:
+            self._count_shot(row, column)
+        return exit_point
+
+    def _count_shot(self, row, column):
+        """Takes in a legal entry square and adds the counts of its ray to the shot counters."""
+        counts = self._get_cell_map().get_ray_counts(row, column)
+        self._metrics.add_shot(counts)
+        _GLOBAL.add_shot(counts)
+
+    def _timed(self, phase, method):
+        """Takes in a phase name and a BlackBoxGame method, runs the method on this game and records the time."""
+        start = perf_counter()
+        result = method(self)
+        seconds = perf_counter() - start
+        self._metrics.add_time(phase, seconds)
+        _GLOBAL.add_time(phase, seconds)
+        return result
+
+    def reflection_squares(self):
+        """Finds the reflection squares like BlackBoxGame.reflection_squares() and times it."""
+        return self._timed('reflection_squares', BlackBoxGame.reflection_squares)
+
+    def deflection_squares(self):
+        """Finds the deflection squares like BlackBoxGame.deflection_squares() and times it."""
+        return self._timed('deflection_squares', BlackBoxGame.deflection_squares)
+
+    def double_deflection_squares(self):
+        """Finds the double deflection squares like BlackBoxGame.double_deflection_squares() and times it."""
+        return self._timed('double_deflection_squares', BlackBoxGame.double_deflection_squares)
+
+    def _get_exit_table(self):
+        """Returns the exit table, timing it the time it is built. Every ray traced for it is counted."""
+        if self._exit_table is not None:
+            return self._exit_table
+        return self._timed('exit_table', BlackBoxGame._get_exit_table)
+
+    def _get_cell_map(self):
+        """Returns a CountingCellMap of the special squares, timing it the time it is built."""
+        if self._cell_map is None:
+            start = perf_counter()
+            self._cell_map = CountingCellMap(self._size, self._atom_positions, self._reflection_squares,
+                                             self._deflection_squares, self._double_deflection_squares,
+                                             [self._metrics, _GLOBAL])
+            seconds = perf_counter() - start
+            self._metrics.add_time('cell_map', seconds)
+            _GLOBAL.add_time('cell_map', seconds)
+        return self._cell_map
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# Date: 10/18/26
+# Description: One hidden layout played by many players at once. A Puzzle is the read-only part of a game, the
+# atoms and the outcome of every entry, packed into one flat buffer: a header, the atom bitboard and one signed
+# 16 bit outcome per legal entry. publish() copies the buffer into multiprocessing.shared_memory once and other
+# processes attach() to it by name and read it in place. A Session is what each player owns: the puzzle it plays,
+# a Player for score, guesses and used entry/exits, and the found atoms bitboard, a few hundred bytes in all.
+# Usage:
+#       puzzle = Puzzle.from_atoms([(7, 1), (7, 3), (3, 6), (1, 6)]).publish()
+#       name = puzzle.get_name()                 (hand it to worker processes)
+#       shared = Puzzle.attach(name)             (in a worker)
+#       session = shared.session()
+#       session.shoot_ray(4, 9), session.guess_atom(7, 1), session.get_score()
+#       shared.close(); puzzle.close(); puzzle.unlink()
+
+import struct
+from multiprocessing import shared_memory
+
+from BlackBoxGame import BlackBoxGame, Player, to_bits
+from tracer import legal_entries
+
+# buffer header: magic, format version, board size, number of atoms, number of legal entries. It is followed by
+# the atom bitboard, (size * size + 7) // 8 little endian bytes padded to an even length, then one native signed
+# 16 bit outcome per legal entry in legal_entries(size) order
+_HEADER = struct.Struct('<4sBHHH')
+_MAGIC = b'BBPZ'
+_VERSION = 1
+
+# outcomes below zero, outcomes from zero up are indexes into legal_entries(size)
+HIT = -1
+TRAPPED = -3
+
+
+class Puzzle:
+    """Read-only atom layout and exit table held in one buffer, either bytes or a shared memory block. Nothing in
+    it changes once it is built, so any number of sessions in any number of processes can read it at once."""
+
+    __slots__ = ('_size', '_atom_count', '_atoms', '_outcomes', '_atom_bits', '_memory', '_owner')
+
+    def __init__(self, data, memory=None, owner=False):
+        """Takes in a buffer laid out as described above, the SharedMemory it lives in (None for bytes) and
+        whether this object created that memory. Use from_atoms() or attach() rather than calling this directly.
+        Raises ValueError if the buffer is not a puzzle."""
+        data = memoryview(data)
+        if len(data) < _HEADER.size:
+            raise ValueError('puzzle is too short')
+        magic, version, size, atom_count, entry_count = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION or entry_count != len(legal_entries(size)):
+            raise ValueError('not a BlackBox puzzle')
+        width = _width(size)
+        if len(data) < _HEADER.size + width + 2 * entry_count:
+            raise ValueError('puzzle length does not match its header')
+        self._size = size
+        self._atom_count = atom_count
+        self._atoms = data[_HEADER.size:_HEADER.size + width]
+        offset = _HEADER.size + width
+        self._outcomes = data[offset:offset + 2 * entry_count].cast('h')
+        self._atom_bits = None  # the atom bitboard as an int, read on first use
+        self._memory = memory
+        self._owner = owner
+
+    @classmethod
+    def from_atoms(cls, atom_positions, size=10, derived=None):
+        """Takes in the arguments of BlackBoxGame and returns a puzzle of that layout held in bytes."""
+        game = BlackBoxGame(atom_positions, size, derived)
+        table = game.exit_table()
+        entries = legal_entries(size)
+        index = {entry: number for number, entry in enumerate(entries)}
+        outcomes = []
+        for entry in entries:
+            if entry not in table:
+                outcomes.append(TRAPPED)
+            elif table[entry] is None:
+                outcomes.append(HIT)
+            else:
+                outcomes.append(index[table[entry]])
+        atoms = to_bits(tuple(atom_positions), size).to_bytes(_width(size), 'little')
+        header = _HEADER.pack(_MAGIC, _VERSION, size, len(set(atom_positions)), len(entries))
+        return cls(header + atoms + struct.pack('=%dh' % len(outcomes), *outcomes))
+
+    @classmethod
+    def attach(cls, name):
+        """Takes in the name of a published puzzle and returns a puzzle reading it in place. Call close() when
+        done; the process that published it unlinks it. Before Python 3.13 attaching registers the block with the
+        resource tracker, which is harmless for workers started by multiprocessing from the publishing process since
+        they share its tracker."""
+        try:
+            memory = shared_memory.SharedMemory(name, track=False)
+        except TypeError:   # no track argument before Python 3.13
+            memory = shared_memory.SharedMemory(name)
+        return cls(memory.buf, memory)
+
+    def publish(self, name=None):
+        """Takes in an optional name for the block, copies the puzzle into new shared memory and returns a puzzle
+        reading it there. The returned puzzle owns the block and should be unlinked once every worker is done."""
+        data = self.to_bytes()
+        memory = shared_memory.SharedMemory(name, create=True, size=len(data))
+        memory.buf[:len(data)] = data
+        return Puzzle(memory.buf, memory, owner=True)
+
+    def to_bytes(self):
+        """Returns the puzzle's buffer as bytes."""
+        header = _HEADER.pack(_MAGIC, _VERSION, self._size, self._atom_count, len(self._outcomes))
+        return header + self._atoms.tobytes() + self._outcomes.tobytes()
+
+    def get_name(self):
+        """Returns the name of the shared memory block holding the puzzle, or None if it is held in bytes."""
+        return self._memory.name if self._memory is not None else None
+
+    def get_size(self):
+        """Returns the number of rows and columns of the board, entry squares included."""
+        return self._size
+
+    def get_atom_count(self):
+        """Returns the number of atoms hidden in the puzzle."""
+        return self._atom_count
+
+    def get_atom_bits(self):
+        """Returns the bitboard of atom positions."""
+        if self._atom_bits is None:
+            self._atom_bits = int.from_bytes(self._atoms, 'little')
+        return self._atom_bits
+
+    def has_atom(self, row, column):
+        """Takes in a row and column and returns True if an atom sits there."""
+        if 0 <= row < self._size and 0 <= column < self._size:
+            index = row * self._size + column
+            return self._atoms[index >> 3] >> (index & 7) & 1 == 1
+        return False
+
+    def get_outcome(self, row, column):
+        """Takes in a square and returns its entry index and outcome code (an exit index, HIT or TRAPPED), or None
+        if it is not a legal entry."""
+        index = entry_index(self._size, row, column)
+        if index is None:
+            return None
+        return index, self._outcomes[index]
+
+    def session(self):
+        """Returns a new Session playing this puzzle."""
+        return Session(self)
+
+    def close(self):
+        """Stops reading the puzzle's shared memory. The puzzle cannot be used afterwards."""
+        self._atoms.release()
+        self._outcomes.release()
+        if self._memory is not None:
+            self._memory.close()
+
+    def unlink(self):
+        """Frees the shared memory block. Only the puzzle returned by publish() may do this."""
+        if self._memory is not None and self._owner:
+            self._memory.unlink()
+
+
+class Session:
+    """One player's game of a Puzzle. Scoring follows BlackBoxGame: 1 point for each new entry or exit square and
+    5 for each new wrong guess."""
+
+    __slots__ = ('_puzzle', '_player', '_found')
+
+    def __init__(self, puzzle):
+        """Takes in the puzzle to play."""
+        self._puzzle = puzzle
+        self._player = Player(puzzle.get_size())
+        self._found = 0  # bitboard of atoms found, bit row * size + column
+
+    def get_puzzle(self):
+        """Returns the puzzle being played."""
+        return self._puzzle
+
+    def shoot_ray(self, row, column):
+        """Takes in the row and column of an entry square and returns what BlackBoxGame.shoot_ray() would: the
+        (row, column) exit square, None for a hit or False for a square that is not a legal entry. Raises
+        RuntimeError if the ray never leaves the box; the entry is still charged."""
+        outcome = self._puzzle.get_outcome(row, column)
+        if outcome is None:
+            return False
+        index, code = outcome
+        self._player.set_entry_exit((row, column))
+        if code == TRAPPED:
+            raise RuntimeError('ray from %s never leaves the box' % ((row, column),))
+        if code == HIT:
+            return None
+        exit_point = legal_entries(self._puzzle.get_size())[code]
+        self._player.set_entry_exit(exit_point)
+        return exit_point
+
+    def guess_atom(self, row, column):
+        """Takes in a row and column, returns True if an atom is there. A wrong guess costs 5 points the first time
+        it is made."""
+        position = (row, column)
+        if self._puzzle.has_atom(row, column):
+            self._player.set_guess(position)
+            self._found |= 1 << (row * self._puzzle.get_size() + column)
+            return True
+        if not self._player.has_guess(position):
+            self._player.set_guess(position)
+            self._player.set_score('miss')
+        return False
+
+    def get_score(self):
+        """Returns the player's current score."""
+        return self._player.get_score()
+
+    def atoms_left(self):
+        """Returns the number of atoms not found yet."""
+        return bin(self._puzzle.get_atom_bits() & ~self._found).count('1')
+
+
+def entry_index(size, row, column):
+    """Takes in the board size and a square, returns the square's index in legal_entries(size), or None if it is
+    not a legal entry."""
+    last = size - 1
+    if row == 0 and 0 < column < last:
+        return column - 1
+    if 0 < row < last:
+        if column == 0:
+            return size - 2 + row - 1
+        if column == last:
+            return 2 * (size - 2) + row - 1
+        return None
+    if row == last and 0 < column < last:
+        return 3 * (size - 2) + column - 1
+    return None
+
+
+def _width(size):
+    """Takes in the board size and returns the bytes taken by its atom bitboard, padded to an even number."""
+    width = (size * size + 7) // 8
+    return width + width % 2
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# Date: 10/18/26
+# Description: Generates atom layouts that the full set of rays pins down to exactly one answer, so no player is
+# marked wrong for a guess the rays could not tell apart. Each random candidate is traced from every entry; layouts
+# with a ray that never leaves the box or outside the wanted difficulty are dropped at once, and the rest are handed
+# to the solver, whose search stops at the second layout that fits every ray. Candidates can be checked across a
+# process pool.
+# Usage:
+#       python3 puzzles.py --count 1000 --atoms 4 --difficulty hard --jobs 4 > puzzles.jsonl
+#   or  from puzzles import generate
+#       for atoms in generate(10, 4, difficulty='medium', seed=1): game = BlackBoxGame(atoms)
+
+import argparse
+import json
+import os
+import random
+from collections import deque
+
+from BlackBoxGame import BlackBoxGame
+from solver import Solver
+from tracer import legal_entries
+
+# share of the rays that hit an atom or come straight back out: the more of them, the more the rays give away
+DIFFICULTY = {'easy': 0.5, 'medium': 0.35, 'hard': 0.0}   # name -> lowest share, checked in this order
+CHUNK = 32  # puzzles a worker makes per task
+ATTEMPTS = 20000    # candidates tried in a row without a puzzle before giving up on the settings
+
+
+def rate(game):
+    """Takes in a game and returns the name of its difficulty, worked out from the share of its rays that hit or
+    reflect. Returns None if a ray never leaves the box."""
+    table = game.exit_table()
+    entries = legal_entries(game.get_size())
+    if len(table) != len(entries):
+        return None
+    giveaways = sum(1 for entry, exit_point in table.items() if exit_point is None or exit_point == entry)
+    share = giveaways / len(entries)
+    for name, low in DIFFICULTY.items():
+        if share >= low:
+            return name
+
+
+def is_unique(game, atom_count=None):
+    """Takes in a game and optionally the number of atoms the player is told about, returns True if no other
+    layout with that many atoms gives the same result on every ray. Stops searching at the second layout found."""
+    if atom_count is None:
+        atom_count = len(set(game.get_atoms()))
+    table = game.exit_table()
+    if len(table) != len(legal_entries(game.get_size())):
+        return False    # the solver cannot be told about rays that never leave the box
+    solver = Solver(atom_count, game.get_size())
+    for entry, exit_point in table.items():
+        solver.add_observation(entry, exit_point)
+    found = 0
+    for _ in solver.masks():
+        found += 1
+        if found == 2:
+            return False
+    return found == 1
+
+
+def make(count, atom_count, size=10, difficulty=None, rng=None):
+    """Takes in the number of puzzles wanted, the atoms per puzzle, the board size, a difficulty name from
+    DIFFICULTY (None for any) and a random.Random, returns a list of count uniquely solvable layouts, each a sorted
+    list of (row, column) atoms. Raises ValueError if ATTEMPTS candidates in a row fail, as happens for settings
+    that cannot be met, such as one atom on an easy board."""
+    if difficulty is not None and difficulty not in DIFFICULTY:
+        raise ValueError('difficulty must be one of %s' % ', '.join(DIFFICULTY))
+    rng = rng or random.Random()
+    cells = [(row, col) for row in range(1, size - 1) for col in range(1, size - 1)]
+    if not 0 < atom_count <= len(cells):
+        raise ValueError('atom count must be between 1 and %d' % len(cells))
+    puzzles = []
+    failed = 0
+    while len(puzzles) < count:
+        if failed == ATTEMPTS:
+            raise ValueError('no %s puzzle with %d atoms on a size %d board in %d tries'
+                             % (difficulty or 'uniquely solvable', atom_count, size, ATTEMPTS))
+        failed += 1
+        atoms = sorted(rng.sample(cells, atom_count))
+        game = BlackBoxGame(atoms, size)
+        level = rate(game)
+        if level is None or (difficulty is not None and level != difficulty):
+            continue
+        if is_unique(game, atom_count):
+            puzzles.append(atoms)
+            failed = 0
+    return puzzles
+
+
+def _make_chunk(args):
+    """Takes in (count, atom count, size, difficulty, seed) and runs make() with a generator seeded from it. Runs
+    in a worker process."""
+    count, atom_count, size, difficulty, seed = args
+    return make(count, atom_count, size, difficulty, random.Random(seed))
+
+
+def generate(count, atom_count, size=10, difficulty=None, jobs=1, seed=None, chunk=CHUNK):
+    """Takes in the number of puzzles wanted, the atoms per puzzle, the board size, a difficulty name (None for
+    any), the number of worker processes, a seed and the puzzles per worker task, and yields the puzzles as they
+    are made. Work is cut into chunks with their own seeds, so the same seed gives the same puzzles in the same
+    order for any number of jobs."""
+    if seed is None:
+        seed = int.from_bytes(os.urandom(8), 'little')
+    tasks = ((min(chunk, count - start), atom_count, size, difficulty, '%s:%d' % (seed, start))
+             for start in range(0, count, chunk))
+    if jobs <= 1:
+        for task in tasks:
+            yield from _make_chunk(task)
+        return
+    import multiprocessing      # only paid for when asked to run in parallel
+    pending = deque()
+    with multiprocessing.Pool(jobs) as pool:
+        for task in tasks:
+            pending.append(pool.apply_async(_make_chunk, (task,)))
+            if len(pending) >= jobs * 4:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+
+
+def main():
+    """Parses the command line and prints one puzzle per line as JSON, ready for python3 -m blackbox."""
+    parser = argparse.ArgumentParser(description='Generate uniquely solvable BlackBox layouts.')
+    parser.add_argument('--count', type=int, default=100)
+    parser.add_argument('--atoms', type=int, default=4)
+    parser.add_argument('--size', type=int, default=10)
+    parser.add_argument('--difficulty', choices=sorted(DIFFICULTY))
+    parser.add_argument('--jobs', type=int, default=1, help='worker processes')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+    for atoms in generate(args.count, args.atoms, args.size, args.difficulty, args.jobs, args.seed):
+        print(json.dumps({'atoms': atoms, 'size': args.size}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# Date: 10/18/26
+# Description: Frozen copy of the original recursive ray walk and the original reflection, deflection and double
+# deflection square finders, kept apart from BlackBoxGame so the fuzzer's reference does not share the rewritten
+# rule code it checks. The methods are the first BlackBoxGame's, changed only where they had to be: the 10x10
+# literals are worked out from the board size, the scoring calls are left out, and a ray reaching a deflection
+# square from a side no rule covers raises RuntimeError instead of wandering off the board. Do not change the rules
+# here to follow BlackBoxGame; a change in the game that shows up as a fuzzer mismatch is what this file is for.
+# Usage:
+#       game = ReferenceGame([(7, 1), (7, 3), (3, 6), (1, 6)])
+#       game.shoot_ray(4, 9)
+
+
+class ReferenceGame:
+    """The original rules, for one layout on one board size."""
+
+    def __init__(self, atom_positions, size=10):
+        """Takes in a list of (row, column) atoms and the board size, builds the board and the special squares."""
+        last = size - 1
+        self._atom_positions = list(atom_positions)
+        self._legal_entry = ([(0, col) for col in range(1, last)] + [(row, 0) for row in range(1, last)] +
+                             [(row, last) for row in range(1, last)] + [(last, col) for col in range(1, last)])
+        self._grid_edge = ([(1, col) for col in range(1, last)] + [(row, last - 1) for row in range(2, last - 1)] +
+                           [(row, 1) for row in range(2, last)] + [(last - 1, col) for col in range(2, last)])
+        self._last = last
+        self._board = [[" " for col in range(size)] for row in range(size)]
+        for atom in self._atom_positions:
+            self._board[atom[0]][atom[1]] = 'A'
+        for l in self._legal_entry:
+            self._board[l[0]][l[1]] = '*'
+        for c in [(0, 0), (0, last), (last, 0), (last, last)]:
+            self._board[c[0]][c[1]] = 'X'
+        self._atom_on_grid_edge = [atom for atom in self._atom_positions if atom in self._grid_edge]
+        self._double_deflection_squares = set()
+        self._deflection_squares = set()
+        self._reflection_squares = set()
+        self.reflection_squares()
+        self.deflection_squares()
+        self.double_deflection_squares()
+
+    def shoot_ray(self, row, column):
+        """Takes in the row and column of an entry square, returns False for a square that is not a legal entry,
+        otherwise the (row, column) exit square or None if the ray hit an atom. Raises RuntimeError if the ray
+        gets stuck on a deflection square."""
+        position = (row, column)
+        if position not in self._legal_entry:
+            return False
+        return self.rec_shoot_ray(position, position)
+
+    def rec_shoot_ray(self, position, previous):
+        """Takes in the current square and the one before it and follows the ray recursively to its exit square,
+        or None for a hit."""
+        if position in self._legal_entry and previous not in self._legal_entry:  # base case: checks if exit reached
+            return position
+        elif position in self._atom_positions:  # detects a hit
+            return
+        elif position in self._reflection_squares:  # handles reflections
+            return position
+        elif position in self._double_deflection_squares:  # if position is double deflection square
+            return self.double_deflection(position, previous)
+        elif position in self._deflection_squares:  # if position is deflection square
+            new_position = self.deflection(position, previous)
+            if new_position is None:
+                raise RuntimeError('ray is stuck on deflection square %s' % (position,))
+            previous = position
+            return self.rec_shoot_ray(new_position, previous)
+        else:
+            new_position = self.move(position, previous)  # if none of the above apply, continues moving forward
+            previous = position
+            return self.rec_shoot_ray(new_position, previous)
+
+    def move(self, position, previous):
+        """Handles the first movement of the ray from the grid edge. Returns a new position"""
+        if position in self._legal_entry and previous not in self._grid_edge:  # first move only
+            if position[0] == 0:  # moving right, along row
+                return ((position[0] + 1), position[1])
+            if position[0] == self._last:  # moving left, along row
+                return ((position[0] - 1), position[1])
+            if position[1] == 0:  # moving down, along column
+                return (position[0], (position[1] + 1))
+            if position[1] == self._last:  # moving up, along column
+                return (position[0], (position[1] - 1))
+        else:
+            return self.successive_move(position, previous)
+
+    def successive_move(self, position, previous=None):
+        """If not the first move, then moves forward based on previous position. Returns a new position."""
+        if previous is not None and position is not None:
+            # post deflection movement handling
+            if position[0] > previous[0] and position[1] != previous[1]:
+                return ((position[0] + 1), (position[1]))
+            if position[0] < previous[0] and position[1] != previous[1]:
+                return ((position[0] - 1), (position[1]))
+            if position[1] > previous[1] and position[0] != previous[0]:
+                return ((position[0]), (position[1] + 1))
+            if position[1] < previous[1] and position[0] != previous[0]:
+                return ((position[0]), (position[1] - 1))
+            # normal movement handling
+            if position[0] > previous[0]:  # if moving right, along row
+                return ((position[0] + 1), position[1])
+            if position[0] < previous[0]:  # if moving left, along row
+                return ((position[0] - 1), position[1])
+            if position[1] > previous[1]:  # if moving down, along column
+                return (position[0], (position[1] + 1))
+            if position[1] < previous[1]:  # if moving up, along column
+                return (position[0], (position[1] - 1))
+
+    def deflection_squares(self):
+        """Finds and builds a set containing square positions that require special handling. Searches the board for
+        deflection squares, which are all empty positions diagonal to an atom."""
+        non_grid_atoms = [atom for atom in self._atom_positions if atom not in self._atom_on_grid_edge]
+        for n in non_grid_atoms:
+            if self._board[(n[0] - 1)][(n[1] - 1)] == ' ':  # diagonal up and left of atom
+                self._deflection_squares.add(((n[0] - 1), (n[1] - 1)))
+            if self._board[(n[0] + 1)][(n[1] - 1)] == ' ':  # diagonal down and left of atom
+                self._deflection_squares.add(((n[0] + 1), (n[1] - 1)))
+            if self._board[(n[0] - 1)][(n[1] + 1)] == ' ':  # diagonal up and right of atom
+                self._deflection_squares.add(((n[0] - 1), (n[1] + 1)))
+            if self._board[(n[0] + 1)][(n[1] + 1)] == ' ':  # diagonal down and right of atom
+                self._deflection_squares.add(((n[0] + 1), (n[1] + 1)))
+
+    def deflection(self, position, previous):
+        """Takes in current position and if is a deflection square, determines new direction of movement.
+        Returns a new position as a tuple so that move() can continue the course."""
+        for a in self._atom_positions:
+            if position == ((a[0] - 1), (a[1] - 1)):  # check if diagonal up and left of atom
+                if previous == ((position[0] - 1), (position[1])):  # coming from above
+                    return ((position[0]), (position[1] - 1))
+                elif previous == ((position[0]), (position[1] - 1)):  # coming from left
+                    return ((position[0] - 1), (position[1]))
+            if position == ((a[0] + 1), (a[1] - 1)):  # check if diagonal down and left of atom
+                if previous == ((position[0] + 1), (position[1])):  # coming from below
+                    return ((position[0]), (position[1] - 1))
+                elif previous == ((position[0]), (position[1] - 1)):  # coming from left
+                    return ((position[0] + 1), (position[1]))
+            if position == ((a[0] - 1), (a[1] + 1)):  # check if diagonal up and right of atom
+                if previous == ((position[0] - 1), (position[1])):  # coming from above
+                    return ((position[0]), (position[1] + 1))
+                elif previous == ((position[0]), (position[1] + 1)):  # coming from right
+                    return ((position[0] - 1), (position[1]))
+            if position == ((a[0] + 1), (a[1] + 1)):  # check if diagonal down and right of atom
+                if previous == ((position[0] + 1), (position[1])):  # coming from below
+                    return ((position[0]), (position[1] + 1))
+                elif previous == ((position[0]), (position[1] + 1)):  # coming from right
+                    return ((position[0] + 1), (position[1]))
+
+    def double_deflection_squares(self):
+        """Finds overlapping deflection squares that are identified as deflection squares for two separate atoms.
+        Adds double deflection squares to a set. These squares are adjacent to the square between two atoms."""
+        for n in self._atom_positions:
+            for a in self._atom_positions:
+                # vertical double deflection squares
+                if (n[0], (n[1] + 2)) == a:
+                    self._double_deflection_squares.add(((n[0] + 1), (n[1] + 1)))
+                    self._double_deflection_squares.add(((n[0] - 1), (n[1] + 1)))
+                if (n[0], (n[1] - 2)) == a:
+                    self._double_deflection_squares.add(((n[0] + 1), (n[1] - 1)))
+                    self._double_deflection_squares.add(((n[0] - 1), (n[1] - 1)))
+                # horizontal double deflection squares
+                if ((n[0] + 2), n[1]) == a:
+                    self._double_deflection_squares.add(((n[0] + 1), (n[1] + 1)))
+                    self._double_deflection_squares.add(((n[0] + 1), (n[1] - 1)))
+                if ((n[0] - 2), n[1]) == a:
+                    self._double_deflection_squares.add(((n[0] - 1), (n[1] + 1)))
+                    self._double_deflection_squares.add(((n[0] - 1), (n[1] - 1)))
+
+    def double_deflection(self, position, previous):
+        """Takes in current position if is a double deflection square. Reverses ray direction to return to sender."""
+        new_position = previous
+        previous = position
+        return self.rec_shoot_ray(new_position, previous)
+
+    def reflection_squares(self):
+        """Finds and builds a set containing square positions as tuples that require special handling.
+        Searches the board for reflection squares. These are entry squares adjacent to an atom."""
+        last = self._last
+        for a in self._atom_on_grid_edge:
+            # handles special case corner atoms
+            if a == (last - 1, last - 1):
+                self._reflection_squares.add((last, last - 2))
+                self._reflection_squares.add((last - 2, last))
+            elif a == (last - 1, 1):
+                self._reflection_squares.add((last - 2, 0))
+                self._reflection_squares.add((last, 2))
+            elif a == (1, 1):
+                self._reflection_squares.add((2, 0))
+                self._reflection_squares.add((0, 2))
+            elif a == (1, last - 1):
+                self._reflection_squares.add((0, last - 2))
+                self._reflection_squares.add((2, last))
+                # handles regular reflections
+            if a[0] == 1:  # handling of top horizontal edge
+                self._reflection_squares.add((a[0] - 1, a[1] + 1))  # add square to right of atom
+                self._reflection_squares.add((a[0] - 1, a[1] - 1))  # add square to left of atom
+            elif a[0] == last - 1:  # handling of bottom horizontal edge
+                self._reflection_squares.add((a[0] + 1, a[1] + 1))  # add square to right of atom
+                self._reflection_squares.add((a[0] + 1, a[1] - 1))  # add square to left of atom
+            elif a[1] == 1:  # handling of right and left column edges
+                self._reflection_squares.add((a[0] + 1, a[1] - 1))  # add square below atom
+                self._reflection_squares.add((a[0] - 1, a[1] - 1))  # add square above atom
+            elif a[1] == last - 1:
+                self._reflection_squares.add((a[0] + 1, a[1] + 1))  # add square below atom
+                self._reflection_squares.add((a[0] - 1, a[1] + 1))  # add square above atom
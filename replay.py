@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# Date: 10/18/26
+# Description: Reads event logs written by eventlog.py. The file is memory-mapped as a NumPy record array, so final
+# scores of millions of games and per entry point statistics are worked out with a few array operations instead of
+# one Python object per event. Requires numpy.
+# Usage:
+#       python3 replay.py events.log                       (final score summary)
+#       python3 replay.py events.log --entries             (shots, hits, reflections, returns per entry point)
+#       python3 replay.py events.log --timeline GAME_ID    (every event of one game)
+
+import argparse
+import os
+
+import numpy as np
+
+from eventlog import EVENT, NEW, ATOM, SHOOT, GUESS, HIT, ILLEGAL, TRAPPED, REFLECT
+
+# the same layout as eventlog.EVENT
+EVENT_DTYPE = np.dtype([('game', '<u8'), ('time', '<i8'), ('kind', 'u1'), ('flags', 'u1'), ('row', '<i2'),
+                        ('column', '<i2'), ('exit_row', '<i2'), ('exit_column', '<i2'), ('score', '<i2'),
+                        ('atoms_left', '<u2'), ('padding', 'V2')])
+assert EVENT_DTYPE.itemsize == EVENT.size
+
+KINDS = {NEW: 'new', ATOM: 'atom', SHOOT: 'shoot', GUESS: 'guess'}
+
+
+def load(path):
+    """Takes in the path of an event log and returns its events as a read-only memory-mapped record array. A
+    partly written record at the end of the file is left out."""
+    count = os.path.getsize(path) // EVENT_DTYPE.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=EVENT_DTYPE)
+    return np.memmap(path, dtype=EVENT_DTYPE, mode='r', shape=(count,))
+
+
+def final_scores(events):
+    """Takes in an event array and returns three arrays: the id of every game, its score after its last event and
+    the atoms it had left then."""
+    games = events['game']
+    ids, first_from_end = np.unique(games[::-1], return_index=True)
+    last = len(games) - 1 - first_from_end
+    return ids, np.asarray(events['score'][last]), np.asarray(events['atoms_left'][last])
+
+
+def score_summary(events):
+    """Takes in an event array and returns a dictionary with the number of games, how many were finished (no
+    atoms left), and the mean and histogram of the final scores of finished games."""
+    ids, scores, atoms_left = final_scores(events)
+    finished = scores[atoms_left == 0]
+    values, counts = np.unique(finished, return_counts=True)
+    return {'games': int(len(ids)), 'finished': int(len(finished)),
+            'mean': round(float(finished.mean()), 3) if len(finished) else None,
+            'histogram': dict(zip(values.tolist(), counts.tolist()))}
+
+
+def timeline(events, game_id):
+    """Takes in an event array and a game id, returns the list of that game's events in order as dictionaries."""
+    rows = np.asarray(events[events['game'] == game_id])
+    steps = []
+    for event in rows.tolist():
+        game, stamp, kind, flags, row, column, exit_row, exit_column, score, atoms_left, _ = event
+        step = {'time': stamp, 'event': KINDS.get(kind, kind), 'row': row, 'column': column, 'score': score,
+                'atoms_left': atoms_left}
+        if kind == SHOOT:
+            if flags & ILLEGAL:
+                step['exit'] = False
+            elif flags & TRAPPED:
+                step['exit'] = 'trapped'
+            elif flags & HIT:
+                step['exit'] = None
+            else:
+                step['exit'] = (exit_row, exit_column)
+        elif kind == GUESS:
+            step['hit'] = bool(flags & HIT)
+        steps.append(step)
+    return steps
+
+
+def entry_stats(events):
+    """Takes in an event array and returns a dictionary of entry square -> counts of shots, hits, reflections
+    (the entry is a reflection square, as BlackBoxGame defines them), returns (the ray came back out where it went
+    in some other way, such as off a double deflection), trapped rays and illegal entries over every game."""
+    shots = np.asarray(events[events['kind'] == SHOOT])
+    if len(shots) == 0:
+        return dict()
+    row = shots['row'].astype(np.int64)
+    column = shots['column'].astype(np.int64)
+    keys, inverse = np.unique(((row + 32768) << 16) | (column + 32768), return_inverse=True)
+    flags = shots['flags']
+    returned = (flags == 0) & (shots['exit_row'] == shots['row']) & (shots['exit_column'] == shots['column'])
+    columns = {'shots': np.bincount(inverse, minlength=len(keys)),
+               'hits': np.bincount(inverse, weights=flags & HIT != 0, minlength=len(keys)),
+               'reflections': np.bincount(inverse, weights=flags & REFLECT != 0, minlength=len(keys)),
+               'returns': np.bincount(inverse, weights=returned, minlength=len(keys)),
+               'trapped': np.bincount(inverse, weights=flags & TRAPPED != 0, minlength=len(keys)),
+               'illegal': np.bincount(inverse, weights=flags & ILLEGAL != 0, minlength=len(keys))}
+    stats = dict()
+    for index, key in enumerate(keys.tolist()):
+        square = ((key >> 16) - 32768, (key & 0xffff) - 32768)
+        stats[square] = {name: int(values[index]) for name, values in columns.items()}
+    return stats
+
+
+def main():
+    """Parses the command line and prints the report asked for."""
+    parser = argparse.ArgumentParser(description='Summarise a BlackBox event log.')
+    parser.add_argument('path')
+    parser.add_argument('--entries', action='store_true', help='statistics per entry point')
+    parser.add_argument('--timeline', type=int, metavar='GAME_ID', help='every event of one game')
+    args = parser.parse_args()
+    events = load(args.path)
+    if args.timeline is not None:
+        for step in timeline(events, args.timeline):
+            print(step)
+    elif args.entries:
+        print('%-10s %8s %8s %12s %8s %8s %8s' % ('entry', 'shots', 'hits', 'reflections', 'returns', 'trapped',
+                                                  'illegal'))
+        for square, counts in sorted(entry_stats(events).items()):
+            print('%-10s %8d %8d %12d %8d %8d %8d' % (str(square), counts['shots'], counts['hits'],
+                                                      counts['reflections'], counts['returns'], counts['trapped'],
+                                                      counts['illegal']))
+    else:
+        print(score_summary(events))
+
+
+if __name__ == '__main__':
+    main()
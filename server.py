@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# Date: 10/18/26
+# Description: Headless asyncio server hosting many BlackBoxGame sessions at once. Clients send one JSON object per
+# line over TCP or a Unix socket and get one JSON object per line back, in the same order, so a client may pipeline
+# as many requests as it likes on a connection. Sessions live in a bounded table that drops the least recently used
+# session when full and any session left idle too long. Also holds a load generator client that reports requests
+# per second and latency percentiles.
+# Usage:
+#       python3 server.py serve --port 7777 --sessions 10000 --idle 600
+#       python3 server.py load --port 7777 --connections 8 --requests 20000 --depth 32
+# Requests (the optional "tag" is echoed back):
+#       {"cmd": "new", "atoms": [[7, 1], [7, 3], [3, 6], [1, 6]], "size": 10}  or  {"cmd": "new", "atoms": 4}
+#       {"cmd": "shoot", "session": "...", "row": 4, "column": 9}
+#       {"cmd": "guess", "session": "...", "row": 7, "column": 1}
+#       {"cmd": "score", "session": "..."}
+#       {"cmd": "board", "session": "..."}
+
+import argparse
+import asyncio
+import json
+import random
+import secrets
+import time
+from collections import OrderedDict, deque
+
+from BlackBoxGame import BlackBoxGame
+
+# largest board a client may ask for. Exit tables are built inside the event loop, and a board this size traces
+# every entry in at most 72 rays of 4 * 20 * 20 steps, a few tens of milliseconds, even if every ray loops
+MAX_SIZE = 20
+MAX_LINE = 1 << 16      # longest request line accepted
+
+
+class SessionTable:
+    """Bounded table of session id -> BlackBoxGame kept in least recently used order. Adding a session to a full
+    table evicts the least recently used one, and sessions not used for idle seconds are dropped as the table is
+    touched, oldest first, so no background sweep is needed."""
+
+    def __init__(self, capacity=10000, idle=600.0, clock=time.monotonic):
+        """Takes in the most sessions to hold, the idle timeout in seconds and the clock to read."""
+        self._capacity = capacity
+        self._idle = idle
+        self._clock = clock
+        self._sessions = OrderedDict()     # session id -> (game, last used), least recently used first
+        self._evictions = 0
+        self._expirations = 0
+
+    def __len__(self):
+        """Returns the number of live sessions."""
+        return len(self._sessions)
+
+    def new(self, game):
+        """Takes in a game, stores it under a new session id and returns the id."""
+        now = self._clock()
+        self._expire(now)
+        while len(self._sessions) >= self._capacity:
+            self._sessions.popitem(last=False)
+            self._evictions += 1
+        session = secrets.token_hex(8)
+        self._sessions[session] = (game, now)
+        return session
+
+    def get(self, session):
+        """Takes in a session id and returns its game, or None if there is no such session. Marks it as used."""
+        now = self._clock()
+        self._expire(now)
+        entry = self._sessions.get(session)
+        if entry is None:
+            return None
+        self._sessions[session] = (entry[0], now)
+        self._sessions.move_to_end(session)
+        return entry[0]
+
+    def get_stats(self):
+        """Returns a dictionary with the number of sessions, evictions for space and expirations for idleness."""
+        return {'sessions': len(self._sessions), 'evictions': self._evictions, 'expirations': self._expirations}
+
+    def _expire(self, now):
+        """Takes in the current time and drops sessions from the old end that have been idle too long."""
+        sessions = self._sessions
+        while sessions:
+            session, (game, used) = next(iter(sessions.items()))
+            if now - used < self._idle:
+                break
+            del sessions[session]
+            self._expirations += 1
+
+
+class GameServer:
+    """Answers JSON requests against a SessionTable. handle() does the work for one decoded request and
+    serve_connection() runs it line by line for one client."""
+
+    def __init__(self, table):
+        """Takes in the SessionTable to keep games in."""
+        self._table = table
+        self._commands = {'new': self.new, 'shoot': self.shoot, 'guess': self.guess, 'score': self.score,
+                          'board': self.board, 'stats': self.stats}
+
+    def handle(self, request):
+        """Takes in a decoded request, runs its command and returns the response dictionary. Problems with the
+        request are reported as {"ok": false, "error": ...} rather than raised."""
+        if not isinstance(request, dict):
+            return {'ok': False, 'error': 'request must be a JSON object'}
+        command = self._commands.get(request.get('cmd'))
+        if command is None:
+            response = {'ok': False, 'error': 'unknown command %r' % (request.get('cmd'),)}
+        else:
+            try:
+                response = command(request)
+            except (KeyError, TypeError, ValueError, ArithmeticError) as error:
+                response = {'ok': False, 'error': 'bad request: %s' % (error,)}
+        if 'tag' in request:
+            response['tag'] = request['tag']
+        return response
+
+    def new(self, request):
+        """Starts a game from a list of [row, column] atoms, or from that many random atoms."""
+        size = int(request.get('size', 10))
+        if not 3 <= size <= MAX_SIZE:
+            raise ValueError('size must be between 3 and %d' % MAX_SIZE)
+        atoms = request.get('atoms', 4)
+        inside = range(1, size - 1)
+        if isinstance(atoms, int):
+            squares = [(row, col) for row in inside for col in inside]
+            atoms = random.sample(squares, atoms)
+        else:
+            atoms = [(int(row), int(col)) for row, col in atoms]
+            if any(row not in inside or col not in inside for row, col in atoms):
+                raise ValueError('atoms must be inside the entry squares')
+        return {'ok': True, 'session': self._table.new(BlackBoxGame(atoms, size))}
+
+    def shoot(self, request):
+        """Shoots a ray, the exit is a [row, column] list, null for a hit or false for an illegal entry."""
+        game = self._game(request)
+        if game is None:
+            return self._missing(request)
+        try:
+            exit_point = game.shoot_ray(int(request['row']), int(request['column']))
+        except RuntimeError:
+            return {'ok': False, 'error': 'ray never leaves the box', 'score': game.get_score()}
+        if exit_point:
+            exit_point = list(exit_point)
+        return {'ok': True, 'exit': exit_point, 'score': game.get_score()}
+
+    def guess(self, request):
+        """Guesses an atom position."""
+        game = self._game(request)
+        if game is None:
+            return self._missing(request)
+        hit = game.guess_atom(int(request['row']), int(request['column']))
+        return {'ok': True, 'hit': hit, 'score': game.get_score(), 'atoms_left': game.atoms_left()}
+
+    def score(self, request):
+        """Reports the score and atoms left."""
+        game = self._game(request)
+        if game is None:
+            return self._missing(request)
+        return {'ok': True, 'score': game.get_score(), 'atoms_left': game.atoms_left()}
+
+    def board(self, request):
+        """Returns the board as one string per row, with atoms not found yet hidden."""
+        game = self._game(request)
+        if game is None:
+            return self._missing(request)
+        return {'ok': True, 'board': [''.join(row) for row in game.get_board(reveal=False)]}
+
+    def stats(self, request):
+        """Reports the session table statistics."""
+        return dict(self._table.get_stats(), ok=True)
+
+    def _game(self, request):
+        """Takes in a request and returns the game of its session, or None."""
+        return self._table.get(request['session'])
+
+    def _missing(self, request):
+        """Returns the response for a session that does not exist or has been evicted."""
+        return {'ok': False, 'error': 'no session %r' % (request['session'],)}
+
+    async def serve_connection(self, reader, writer):
+        """Reads request lines from one client and writes the responses in the same order. The client does not have
+        to wait for an answer before sending the next request, so pipelined requests cost no round trip each."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    response = self.handle(json.loads(line))
+                except ValueError:
+                    response = {'ok': False, 'error': 'request is not valid JSON'}
+                writer.write(json.dumps(response, separators=(',', ':')).encode() + b'\n')
+                await writer.drain()    # only waits when the client is not reading its answers
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host='127.0.0.1', port=7777, unix=None, sessions=10000, idle=600.0):
+    """Takes in where to listen, either host and port or a Unix socket path, the session table size and idle
+    timeout, and serves clients until cancelled."""
+    server = GameServer(SessionTable(sessions, idle))
+    if unix:
+        listener = await asyncio.start_unix_server(server.serve_connection, unix, limit=MAX_LINE)
+    else:
+        listener = await asyncio.start_server(server.serve_connection, host, port, limit=MAX_LINE)
+    async with listener:
+        await listener.serve_forever()
+
+
+async def _open(host, port, unix):
+    """Takes in the server address and returns an asyncio (reader, writer) pair connected to it."""
+    if unix:
+        return await asyncio.open_unix_connection(unix, limit=MAX_LINE)
+    return await asyncio.open_connection(host, port, limit=MAX_LINE)
+
+
+async def _load_connection(host, port, unix, requests, depth, games, latencies):
+    """Takes in the server address, number of requests to send, pipeline depth and games to play on one
+    connection. Keeps depth requests in flight, appends the latency of each one in seconds to latencies and
+    returns the number of error responses."""
+    reader, writer = await _open(host, port, unix)
+    sessions = []
+    for _ in range(games):
+        writer.write(b'{"cmd":"new","atoms":4}\n')
+        await writer.drain()
+        sessions.append(json.loads(await reader.readline())['session'])
+    rng = random.Random()
+    sent = deque()
+    errors = 0
+
+    async def receive():
+        nonlocal errors
+        for _ in range(requests):
+            response = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - sent.popleft())
+            if not response['ok']:
+                errors += 1
+            window.release()
+
+    window = asyncio.Semaphore(depth)
+    receiver = asyncio.ensure_future(receive())
+    for number in range(requests):
+        await window.acquire()
+        session = rng.choice(sessions)
+        if number % 4 == 3:
+            request = {'cmd': 'guess', 'session': session, 'row': rng.randint(1, 8), 'column': rng.randint(1, 8)}
+        elif number % 8 == 7:
+            request = {'cmd': 'score', 'session': session}
+        else:
+            row, column = rng.choice([(0, rng.randint(1, 8)), (9, rng.randint(1, 8)), (rng.randint(1, 8), 0)])
+            request = {'cmd': 'shoot', 'session': session, 'row': row, 'column': column}
+        sent.append(time.perf_counter())
+        writer.write(json.dumps(request).encode() + b'\n')
+        if window.locked():
+            await writer.drain()
+    await receiver
+    writer.close()
+    return errors
+
+
+async def load(host='127.0.0.1', port=7777, unix=None, connections=8, requests=10000, depth=32, games=50):
+    """Takes in the server address, number of client connections, requests per connection, pipeline depth and
+    games per connection, drives the server and returns a dictionary with requests per second, latency
+    percentiles in milliseconds and the error count."""
+    latencies = []
+    started = time.perf_counter()
+    errors = await asyncio.gather(*[_load_connection(host, port, unix, requests, depth, games, latencies)
+                                    for _ in range(connections)])
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+
+    def percentile(fraction):
+        return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000, 3)
+
+    return {'requests': len(latencies), 'requests_per_sec': round(len(latencies) / elapsed),
+            'p50_ms': percentile(0.5), 'p99_ms': percentile(0.99), 'p999_ms': percentile(0.999),
+            'max_ms': round(latencies[-1] * 1000, 3), 'errors': sum(errors)}
+
+
+def main():
+    """Parses the command line and runs the server or the load generator."""
+    parser = argparse.ArgumentParser(description='Serve BlackBox games as JSON lines, or load test a server.')
+    parser.add_argument('mode', choices=('serve', 'load'))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7777)
+    parser.add_argument('--unix', help='Unix socket path to use instead of TCP')
+    parser.add_argument('--sessions', type=int, default=10000, help='most sessions kept by the server')
+    parser.add_argument('--idle', type=float, default=600.0, help='seconds before an unused session is dropped')
+    parser.add_argument('--connections', type=int, default=8, help='load generator connections')
+    parser.add_argument('--requests', type=int, default=10000, help='load generator requests per connection')
+    parser.add_argument('--depth', type=int, default=32, help='load generator requests in flight per connection')
+    parser.add_argument('--games', type=int, default=50, help='load generator games per connection')
+    args = parser.parse_args()
+    if args.mode == 'serve':
+        try:
+            asyncio.run(serve(args.host, args.port, args.unix, args.sessions, args.idle))
+        except KeyboardInterrupt:
+            pass
+    else:
+        print(json.dumps(asyncio.run(load(args.host, args.port, args.unix, args.connections, args.requests,
+                                          args.depth, args.games))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# Date: 10/18/26
+# Description: On-disk database of the ray signature of every layout with a given number of atoms, so the layouts
+# that fit a set of shoot_ray() results can be looked up instead of enumerated. A layout's id is its rank among all
+# sets of that many inner squares, and its signature is one byte per legal entry (the outcome code plus 4). The
+# builder traces every layout, spread over a process pool and with batch.py when numpy is installed, and writes the
+# (signature, id) records sorted by signature, followed by a postings index: for every entry and outcome, the sorted
+# numbers of the records with that outcome there. Lookups memory-map the file. Observations on the first entries in
+# legal_entries() order narrow the records by binary search, then the shortest posting among the other observed
+# entries gives the candidates, and only those records are read. Known limitation: time grows with the shortest
+# posting and with the number of layouts found. On the 10x10 four atom file a full signature takes about 60us and a
+# query with a rare outcome a few hundred, but a few common outcomes (hits on two entries, say) read up to 200,000
+# records and take around 10ms. Each record takes one byte per entry plus four for its id, and the postings take
+# four more bytes per record per entry: about 164 bytes per layout on a 10x10 board, so the four atom file
+# (635,376 layouts) is about 100MB and the five atom file (7,624,512 layouts) about 1.25GB. Building holds about
+# three times the records' size in memory with NumPy (roughly 1GB for five atoms); without NumPy every record
+# becomes a Python bytes object, so builds of more than PYTHON_LIMIT layouts are refused.
+# Usage:
+#       python3 signatures.py build signatures-10-4.db --atoms 4 --workers 8
+#       python3 signatures.py lookup signatures-10-4.db 0,1:hit 4,9:9,7
+#   or  db = SignatureDB('signatures-10-4.db')
+#       db.layouts([((0, 1), None), ((4, 9), (9, 7))])
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+from bisect import bisect_left, bisect_right
+from itertools import combinations
+from math import comb
+
+from BlackBoxGame import BlackBoxGame
+from solver import HIT, TRAPPED
+from tracer import legal_entries
+
+try:
+    import numpy as np
+    import batch
+except ImportError:     # numpy is optional, layouts are traced and filtered in Python without it
+    np = None
+    batch = None
+
+# file header: magic, format version, board size, atoms per layout, number of legal entries, number of records.
+# It is followed by the records, each one signature byte per legal entry then the layout id as a little endian
+# 32 bit unsigned int, sorted by signature. Then come the postings bounds, entries + _OFFSET + 1 little endian 32 bit
+# unsigned ints per entry: the running count of records with each signature byte there, from 0 up to the number of
+# records. Last are the postings, one block of record numbers per entry, grouped by signature byte in that order
+# and increasing within each group, as little endian 32 bit unsigned ints
+_HEADER = struct.Struct('<4sBxHHHI')
+_MAGIC = b'BBSG'
+_VERSION = 2
+_ID = struct.Struct('<I')
+_OFFSET = 4     # added to every outcome code so each signature byte is at least 1
+PYTHON_LIMIT = 2000000  # most layouts built without NumPy, where each record is a Python object
+
+
+def layout_id(atoms, size=10):
+    """Takes in a list of distinct atoms inside the entry squares and the board size, returns the layout's rank
+    among all sets of that many inner squares (the sum of comb(square, n) over its inner square numbers in
+    increasing order, counting n from 1)."""
+    inner = size - 2
+    cells = sorted((row - 1) * inner + col - 1 for row, col in atoms)
+    return sum(comb(cell, number) for number, cell in enumerate(cells, 1))
+
+
+def layout_atoms(number, atom_count, size=10):
+    """Takes in a layout id, the atoms per layout and the board size, returns the layout's sorted atoms."""
+    inner = size - 2
+    cells = []
+    for count in range(atom_count, 0, -1):
+        cell = count - 1
+        while comb(cell + 1, count) <= number:
+            cell += 1
+        number -= comb(cell, count)
+        cells.append(cell)
+    return sorted((cell // inner + 1, cell % inner + 1) for cell in cells)
+
+
+def signature(codes):
+    """Takes in the outcome code of every legal entry (exit index, HIT or TRAPPED) and returns the signature
+    bytes."""
+    return bytes(code + _OFFSET for code in codes)
+
+
+def _trace_unit(work):
+    """Takes in (size, atom count, top square, second square) and returns the records, unsorted, of every layout
+    whose two highest inner square numbers are those. Runs inside worker processes."""
+    size, atom_count, top, second = work
+    inner = size - 2
+    if atom_count == 1:
+        groups = [(top,)]
+    else:
+        groups = [rest + (second, top) for rest in combinations(range(second), atom_count - 2)]
+    layouts = [[(cell // inner + 1, cell % inner + 1) for cell in cells] for cells in groups]
+    entries = legal_entries(size)
+    if batch is not None:
+        codes = batch.trace_batch(layouts, size)
+        codes = np.where(codes == batch.REFLECT, np.arange(codes.shape[1]), codes).tolist()
+    else:
+        index = {entry: number for number, entry in enumerate(entries)}
+        codes = []
+        for atoms in layouts:
+            table = BlackBoxGame(atoms, size).exit_table()
+            codes.append([TRAPPED if entry not in table else HIT if table[entry] is None else index[table[entry]]
+                          for entry in entries])
+    records = []
+    for cells, row in zip(groups, codes):
+        number = sum(comb(cell, place) for place, cell in enumerate(cells, 1))
+        records.append(signature(row) + _ID.pack(number))
+    return b''.join(records)
+
+
+def build(path, atom_count, size=10, workers=None):
+    """Takes in the file to write, the atoms per layout, the board size and worker processes (None for one per
+    core, 1 to build in this process). Traces every layout and writes the sorted database. Returns the number of
+    layouts written. Raises ValueError for more layouts than the file can number, or more than PYTHON_LIMIT when
+    NumPy is not installed."""
+    inner = (size - 2) * (size - 2)
+    if not 0 < atom_count <= inner or comb(inner, atom_count) >= 1 << 32:
+        raise ValueError('too many layouts for a database')
+    if np is None and comb(inner, atom_count) > PYTHON_LIMIT:
+        raise ValueError('%d layouts need NumPy to build, the limit without it is %d'
+                         % (comb(inner, atom_count), PYTHON_LIMIT))
+    if atom_count == 1:
+        units = [(size, 1, top, None) for top in range(inner)]
+    else:
+        units = [(size, atom_count, top, second) for top in range(inner) for second in range(atom_count - 2, top)]
+    if workers == 1:
+        parts = list(map(_trace_unit, units))
+    else:
+        from multiprocessing import Pool
+        with Pool(workers) as pool:
+            parts = pool.map(_trace_unit, units, chunksize=8)
+    entries = len(legal_entries(size))
+    width = entries + _ID.size
+    data = b''.join(parts)
+    del parts
+    count = len(data) // width
+    values = entries + _OFFSET + 1     # signature bytes run from 0 to entries + _OFFSET - 1, plus a final bound
+    with open(path, 'wb') as out:
+        out.write(_HEADER.pack(_MAGIC, _VERSION, size, atom_count, entries, count))
+        if np is not None:
+            records = np.frombuffer(data, dtype='S%d' % width)
+            keys = np.frombuffer(data, dtype=[('signature', 'S%d' % entries), ('id', 'V4')])['signature']
+            records = records[np.argsort(keys, kind='stable')]
+            del data, keys
+            out.write(records.tobytes())
+            columns = records.view(np.uint8).reshape(count, width)[:, :entries]
+            bounds = np.zeros((entries, values), dtype='<u4')
+            for entry in range(entries):
+                bounds[entry, 1:] = np.cumsum(np.bincount(columns[:, entry], minlength=values - 1))
+            out.write(bounds.tobytes())
+            for entry in range(entries):
+                out.write(np.argsort(columns[:, entry], kind='stable').astype('<u4').tobytes())
+        else:
+            records = [data[start:start + width] for start in range(0, len(data), width)]
+            del data
+            records.sort(key=lambda record: record[:entries])
+            out.write(b''.join(records))
+            for entry in range(entries):    # every bound comes before the first posting
+                counts = [0] * (values - 1)
+                for record in records:
+                    counts[record[entry]] += 1
+                bounds = [0]
+                for number in counts:
+                    bounds.append(bounds[-1] + number)
+                out.write(struct.pack('<%dI' % values, *bounds))
+            for entry in range(entries):    # one entry's postings in memory at a time
+                groups = [[] for _ in range(values - 1)]
+                for number, record in enumerate(records):
+                    groups[record[entry]].append(number)
+                out.write(struct.pack('<%dI' % count, *[number for group in groups for number in group]))
+    return count
+
+
+class _Numbers:
+    """Sequence view of a run of little endian 32 bit unsigned ints in the mapped file, for bisect."""
+
+    def __init__(self, data, start, count):
+        """Takes in the mapped file, the byte offset of the first number and how many there are."""
+        self._data = data
+        self._start = start
+        self._count = count
+
+    def __len__(self):
+        """Returns the number of numbers."""
+        return self._count
+
+    def __getitem__(self, number):
+        """Takes in a position and returns the number there."""
+        return _ID.unpack_from(self._data, self._start + 4 * number)[0]
+
+
+class _Prefixes:
+    """Sequence view of the first few signature bytes of every record, for bisect."""
+
+    def __init__(self, data, entries, count, length):
+        """Takes in the mapped file, the entries per signature, the number of records and the prefix length."""
+        self._data = data
+        self._width = entries + _ID.size
+        self._count = count
+        self._length = length
+
+    def __len__(self):
+        """Returns the number of records."""
+        return self._count
+
+    def __getitem__(self, number):
+        """Takes in a record number and returns the start of its signature."""
+        start = _HEADER.size + number * self._width
+        return self._data[start:start + self._length]
+
+
+class SignatureDB:
+    """Read-only view of a database written by build()."""
+
+    def __init__(self, path):
+        """Takes in the path of a database and maps it. Raises ValueError if the file is not one."""
+        with open(path, 'rb') as stream:
+            self._data = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._data) < _HEADER.size:
+            raise ValueError('signature database is too short')
+        magic, version, size, atom_count, entries, count = _HEADER.unpack_from(self._data)
+        if magic != _MAGIC or version != _VERSION or entries != len(legal_entries(size)):
+            raise ValueError('not a signature database')
+        values = entries + _OFFSET + 1
+        postings = _HEADER.size + count * (entries + _ID.size)
+        if len(self._data) != postings + entries * values * 4 + entries * count * 4:
+            raise ValueError('signature database length does not match its header')
+        bounds = struct.unpack_from('<%dI' % (entries * values), self._data, postings)
+        self._bounds = [bounds[entry * values:(entry + 1) * values] for entry in range(entries)]
+        self._postings = postings + entries * values * 4     # byte offset of the first posting
+        self._size = size
+        self._atom_count = atom_count
+        self._entries = entries
+        self._count = count
+        self._index = {entry: number for number, entry in enumerate(legal_entries(size))}
+
+    def __len__(self):
+        """Returns the number of layouts in the database."""
+        return self._count
+
+    def get_size(self):
+        """Returns the board size the database was built for."""
+        return self._size
+
+    def get_atom_count(self):
+        """Returns the number of atoms in every layout."""
+        return self._atom_count
+
+    def lookup(self, observations):
+        """Takes in a list of (entry square, result) pairs, the result being what shoot_ray() returned (exit square
+        or None for a hit), and returns the sorted list of ids of the layouts that fit them all. Raises ValueError
+        for a square that is not a legal entry or exit."""
+        wanted = dict()
+        for entry, result in observations:
+            entry = tuple(entry)
+            if entry not in self._index or (result is not None and tuple(result) not in self._index):
+                raise ValueError('%s -> %s is not a legal entry and exit' % (entry, result))
+            code = HIT if result is None else self._index[tuple(result)]
+            if wanted.setdefault(self._index[entry], code) != code:
+                return []   # one entry cannot have two outcomes
+        prefix = bytearray()
+        while len(prefix) in wanted:
+            prefix.append(wanted.pop(len(prefix)) + _OFFSET)
+        prefix = bytes(prefix)
+        view = _Prefixes(self._data, self._entries, self._count, len(prefix))
+        low = bisect_left(view, prefix)
+        high = bisect_right(view, prefix, low)
+        if not wanted or low == high:
+            return self._filter(low, high, wanted)
+        # the other observations: read only the records in the shortest posting, within the prefix's range
+        entry = min(wanted, key=lambda entry: self._posting_length(entry, wanted[entry]))
+        if self._posting_length(entry, wanted[entry]) >= high - low:
+            return self._filter(low, high, wanted)
+        value = wanted.pop(entry) + _OFFSET
+        bounds = self._bounds[entry]
+        start = self._postings + 4 * (entry * self._count + bounds[value])
+        numbers = _Numbers(self._data, start, bounds[value + 1] - bounds[value])
+        first = bisect_left(numbers, low)
+        last = bisect_left(numbers, high, first)
+        return self._gather(start + 4 * first, last - first, wanted)
+
+    def layouts(self, observations):
+        """Takes in a list of (entry square, result) pairs like lookup() and returns the list of fitting layouts,
+        each a sorted list of atoms."""
+        return [layout_atoms(number, self._atom_count, self._size) for number in self.lookup(observations)]
+
+    def close(self):
+        """Unmaps the file."""
+        self._data.close()
+
+    def _posting_length(self, entry, code):
+        """Takes in an entry index and outcome code, returns the number of records with that outcome there."""
+        bounds = self._bounds[entry]
+        return bounds[code + _OFFSET + 1] - bounds[code + _OFFSET]
+
+    def _gather(self, start, length, wanted):
+        """Takes in the byte offset and length of a run of posted record numbers and a dictionary of entry index ->
+        outcome code, returns the sorted ids of the records named whose signatures have every outcome."""
+        width = self._entries + _ID.size
+        if np is not None:
+            chosen = np.frombuffer(self._data, dtype='<u4', count=length, offset=start)
+            records = np.frombuffer(self._data, dtype=np.uint8, count=self._count * width,
+                                    offset=_HEADER.size).reshape(self._count, width)
+            for entry, code in wanted.items():   # one column at a time, so each check reads fewer records
+                chosen = chosen[records[chosen, entry] == code + _OFFSET]
+            return np.sort(records[chosen, self._entries:].copy().view('<u4').ravel()).tolist()
+        found = []
+        data = self._data
+        for position in range(start, start + 4 * length, 4):
+            offset = _HEADER.size + _ID.unpack_from(data, position)[0] * width
+            if all(data[offset + entry] == code + _OFFSET for entry, code in wanted.items()):
+                found.append(_ID.unpack_from(data, offset + self._entries)[0])
+        return sorted(found)
+
+    def _filter(self, low, high, wanted):
+        """Takes in a range of record numbers and a dictionary of entry index -> outcome code, returns the sorted
+        ids of the records in the range whose signatures have every outcome."""
+        width = self._entries + _ID.size
+        start = _HEADER.size + low * width
+        if np is not None:
+            records = np.frombuffer(self._data, dtype=np.uint8, count=(high - low) * width,
+                                    offset=start).reshape(high - low, width)
+            keep = np.ones(high - low, dtype=bool)
+            for entry, code in wanted.items():
+                keep &= records[:, entry] == code + _OFFSET
+            return np.sort(records[keep, self._entries:].copy().view('<u4').ravel()).tolist()
+        found = []
+        data = self._data
+        for offset in range(start, _HEADER.size + high * width, width):
+            if all(data[offset + entry] == code + _OFFSET for entry, code in wanted.items()):
+                found.append(_ID.unpack_from(data, offset + self._entries)[0])
+        return sorted(found)
+
+
+def _observation(text):
+    """Takes in ROW,COLUMN:ROW,COLUMN or ROW,COLUMN:hit and returns the (entry, result) pair."""
+    entry, result = text.split(':')
+    entry = tuple(int(part) for part in entry.split(','))
+    return entry, None if result == 'hit' else tuple(int(part) for part in result.split(','))
+
+
+def main():
+    """Parses the command line and builds a database or looks layouts up in one."""
+    parser = argparse.ArgumentParser(description='Build or query a BlackBox ray signature database.')
+    parser.add_argument('mode', choices=('build', 'lookup'))
+    parser.add_argument('path')
+    parser.add_argument('observations', nargs='*', help='ENTRY_ROW,ENTRY_COLUMN:EXIT_ROW,EXIT_COLUMN or ...:hit')
+    parser.add_argument('--atoms', type=int, default=4)
+    parser.add_argument('--size', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, one per core by default')
+    parser.add_argument('--limit', type=int, default=20, help='most layouts printed by lookup')
+    args = parser.parse_args()
+    if args.mode == 'build':
+        count = build(args.path, args.atoms, args.size, args.workers)
+        print('%d layouts, %d bytes' % (count, os.path.getsize(args.path)))
+        return
+    db = SignatureDB(args.path)
+    found = db.lookup([_observation(text) for text in args.observations])
+    print('%d layouts fit' % len(found))
+    for number in found[:args.limit]:
+        print(layout_atoms(number, db.get_atom_count(), db.get_size()))
+    db.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
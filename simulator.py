@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# Date: 10/18/26
+# Description: Monte Carlo simulator for guessing strategies. Plays many full games (random atoms, shoot_ray() and
+# guess_atom() until atoms_left() is 0, then get_score()) spread over a process pool in chunks. Every chunk gets its
+# own seed derived from the run seed and the chunk number, so a run gives the same scores whatever the number of
+# workers, and only a score histogram per chunk travels back to the parent.
+# Usage:
+#       python3 simulator.py --games 100000 --atoms 4 --workers 8
+#       python3 simulator.py --strategy mymodule:my_strategy
+
+import argparse
+import importlib
+import random
+import time
+from collections import Counter
+
+from BlackBoxGame import BlackBoxGame
+from tracer import legal_entries
+
+
+def random_layout(rng, atom_count, size=10):
+    """Takes in a random.Random, the number of atoms and the board size, returns a list of distinct atom positions
+    inside the entry squares."""
+    squares = [(row, col) for row in range(1, size - 1) for col in range(1, size - 1)]
+    return rng.sample(squares, atom_count)
+
+
+def random_strategy(game, rng):
+    """Shoots twice as many random entries as there are atoms, then guesses squares in random order until every
+    atom has been found. Strategies are module level functions taking (game, rng) so they can be sent to worker
+    processes; they play the game to the end and the simulator reads get_score() afterwards."""
+    size = game.get_size()
+    for entry in rng.sample(legal_entries(size), min(2 * game.atoms_left(), 4 * (size - 2))):
+        try:
+            game.shoot_ray(*entry)
+        except RuntimeError:    # rays the rules cannot resolve still cost the entry point
+            pass
+    squares = [(row, col) for row in range(1, size - 1) for col in range(1, size - 1)]
+    rng.shuffle(squares)
+    for square in squares:
+        if game.atoms_left() == 0:
+            break
+        game.guess_atom(*square)
+
+
+class ScoreStats:
+    """Streaming summary of final scores: a histogram of score -> games plus the running count and total, so
+    results from any number of games fit in a few hundred bytes and merge by adding histograms."""
+
+    def __init__(self):
+        """Initializes an empty histogram."""
+        self._histogram = Counter()
+        self._games = 0
+        self._total = 0
+
+    def add(self, score):
+        """Takes in one final score and adds it to the summary."""
+        self._histogram[score] += 1
+        self._games += 1
+        self._total += score
+
+    def merge(self, other):
+        """Takes in another ScoreStats and adds its games to this one."""
+        self._histogram.update(other._histogram)
+        self._games += other._games
+        self._total += other._total
+
+    def get_games(self):
+        """Returns the number of games summarised."""
+        return self._games
+
+    def get_histogram(self):
+        """Returns the dictionary of score -> number of games."""
+        return dict(self._histogram)
+
+    def mean(self):
+        """Returns the mean score, 0 if no games were played."""
+        return self._total / self._games if self._games else 0
+
+    def percentile(self, fraction):
+        """Takes in a fraction between 0 and 1 and returns the lowest score at or above that share of games."""
+        needed = fraction * self._games
+        seen = 0
+        for score in sorted(self._histogram):
+            seen += self._histogram[score]
+            if seen >= needed:
+                return score
+        return None
+
+    def summary(self):
+        """Returns a dictionary with the game count, mean, min, median, 90th percentile and max score."""
+        return {'games': self._games, 'mean': round(self.mean(), 3),
+                'min': min(self._histogram) if self._histogram else None, 'p50': self.percentile(0.5),
+                'p90': self.percentile(0.9), 'max': max(self._histogram) if self._histogram else None}
+
+
+def play_chunk(work):
+    """Takes in a (strategy, seed, games, atom_count, size) work unit, plays that many games with one random.Random
+    seeded from seed and returns their ScoreStats. Runs inside worker processes."""
+    strategy, seed, games, atom_count, size = work
+    rng = random.Random(seed)
+    stats = ScoreStats()
+    for _ in range(games):
+        game = BlackBoxGame(random_layout(rng, atom_count, size), size)
+        strategy(game, rng)
+        stats.add(game.get_score())
+    return stats
+
+
+def simulate(strategy, games, atom_count=4, size=10, workers=None, chunk=500, seed=0):
+    """Takes in a strategy, the number of games, atoms per game, board size, worker processes (None for one per
+    core, 1 to play in this process), games per work unit and the run seed. Yields (ScoreStats so far, games per
+    second) each time a chunk finishes, the last one covering every game."""
+    chunks = [(strategy, (seed << 32) + number, min(chunk, games - start), atom_count, size)
+              for number, start in enumerate(range(0, games, chunk))]
+    stats = ScoreStats()
+    started = time.perf_counter()
+    if workers == 1:
+        results = map(play_chunk, chunks)
+        pool = None
+    else:
+        from multiprocessing import Pool
+        pool = Pool(workers)
+        results = pool.imap_unordered(play_chunk, chunks)
+    try:
+        for result in results:
+            stats.merge(result)
+            yield stats, stats.get_games() / (time.perf_counter() - started)
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+
+def load_strategy(name):
+    """Takes in a strategy name, either a function of this module or module:function, and returns the function."""
+    if ':' in name:
+        module, function = name.split(':', 1)
+        return getattr(importlib.import_module(module), function)
+    return globals()[name]
+
+
+def main():
+    """Parses the command line, runs the simulation and prints the running score distribution."""
+    parser = argparse.ArgumentParser(description='Play many BlackBox games with a strategy and summarise scores.')
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--atoms', type=int, default=4)
+    parser.add_argument('--size', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, one per core by default')
+    parser.add_argument('--chunk', type=int, default=500, help='games per work unit')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--strategy', default='random_strategy', help='function name here or module:function')
+    args = parser.parse_args()
+    strategy = load_strategy(args.strategy)
+    for stats, rate in simulate(strategy, args.games, args.atoms, args.size, args.workers, args.chunk, args.seed):
+        print('%(games)8d games  mean %(mean)7.2f  min %(min)4s  p50 %(p50)4s  p90 %(p90)4s  max %(max)4s'
+              % stats.summary(), ' %.0f games/s' % rate, flush=True)
+
+
+if __name__ == '__main__':
+    main()
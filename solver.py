@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+# Date: 10/18/26
+# Description: Works out which atom layouts are still possible after a set of shoot_ray() results. Layouts are held
+# as integer bitsets (bit row * size + column set for every atom) and enumerated in increasing square order; a
+# partial placement is thrown away as soon as one observed ray is fully decided by the squares placed so far and
+# disagrees with what was seen. The board is first turned so the observed rays start near the squares placed first.
+# Usage:
+#       solver = Solver(4)
+#       solver.add_observation((4, 9), (9, 7))
+#       solver.add_observation((1, 0), None)
+#       solver.count(), next(solver.layouts()), solver.probabilities()
+
+from functools import lru_cache
+from math import comb
+
+from BlackBoxGame import BlackBoxGame
+from tracer import legal_entries, grid_edge, entry_direction, symmetries
+
+# ray outcomes below zero, outcomes from zero up are indexes into legal_entries(size)
+HIT = -1        # same value as batch.HIT
+TRAPPED = -3    # same value as batch.TRAPPED
+UNKNOWN = -4    # ray depends on squares that have not been decided yet
+
+
+class MaskTracer:
+    """Follows rays over a layout given as an integer bitset, working out each square's behaviour from the atom
+    bits around it rather than from a prebuilt map, so a layout can be traced without building a BlackBoxGame.
+    Outcomes are exit indexes into legal_entries(size), HIT or TRAPPED, and match shoot_ray()."""
+
+    def __init__(self, size):
+        """Takes in the board size and precomputes, for every square, the bits of the atoms that can change what a
+        ray does there and, for every entry, its first step and the grid edge atoms that reflect it."""
+        self._size = size
+        self._entries = legal_entries(size)
+        self._entry_index = {entry: index for index, entry in enumerate(self._entries)}
+        self._limit = 4 * size * size + 1
+        cells = size * size
+        self._exit = [-1] * cells   # exit index of each entry square, -1 everywhere else
+        for index, (row, col) in enumerate(self._entries):
+            self._exit[row * size + col] = index
+        self._start = []     # (first square, step) of each entry
+        for row, col in self._entries:
+            dr, dc = entry_direction(size, row, col)
+            self._start.append(((row + dr) * size + col + dc, dr * size + dc))
+        self._reflect = [0] * len(self._entries)  # grid edge atoms that reflect each entry
+        for atom in grid_edge(size):
+            for square in BlackBoxGame([atom], size).get_reflection_squares():
+                if square in self._entry_index:
+                    self._reflect[self._entry_index[square]] |= 1 << (atom[0] * size + atom[1])
+        self._around = [0] * cells  # the square itself and its four diagonals
+        self._inner = [0] * cells   # diagonals holding squares inside the grid edge, the only deflecting atoms
+        for row in range(1, size - 1):
+            for col in range(1, size - 1):
+                index = row * size + col
+                self._around[index] = 1 << index
+                for dr in (-1, 1):
+                    for dc in (-1, 1):
+                        self._around[index] |= 1 << (index + dr * size + dc)
+                        if 2 <= row + dr <= size - 3 and 2 <= col + dc <= size - 3:
+                            self._inner[index] |= 1 << (index + dr * size + dc)
+
+    def get_entries(self):
+        """Returns the list of legal entry squares the outcome indexes refer to."""
+        return self._entries
+
+    def get_entry_index(self, entry):
+        """Takes in an entry square and returns its index, or None if it is not a legal entry."""
+        return self._entry_index.get(entry)
+
+    def trace_start(self, entry):
+        """Takes in an entry index and returns the index of the first square its ray moves to."""
+        return self._start[entry][0]
+
+    def trace(self, mask, entry, decided=None):
+        """Takes in a layout bitset and an entry index, returns the exit index, HIT or TRAPPED. If decided is given,
+        only squares below that index are final and UNKNOWN is returned once the ray reaches a square whose
+        behaviour could still change."""
+        return self.resume(mask, entry, None, 0, decided)[0]
+
+    def trace_zone(self, mask, entry):
+        """Takes in a layout bitset and an entry index, returns (outcome, zone) where zone is the bitset of squares
+        whose atom would change the path: the reflecting squares of the entry plus every visited square and its
+        diagonals. Adding an atom outside the zone leaves the outcome as it is."""
+        size = self._size
+        exits = self._exit
+        around = self._around
+        zone = self._reflect[entry]
+        if mask & zone:
+            return entry, zone
+        position, step = self._start[entry]
+        for _ in range(self._limit):
+            if exits[position] >= 0:
+                return exits[position], zone
+            zone |= around[position]
+            if not mask & around[position]:
+                position += step
+                continue
+            if mask >> position & 1:
+                return HIT, zone
+            result, position, step = self.resume(mask, entry, position, step, None, True)
+            if result != UNKNOWN:
+                return result, zone
+        return TRAPPED, zone
+
+    def resume(self, mask, entry, position, step, decided=None, single=False):
+        """Takes in a layout bitset, an entry index, the square and step a ray stopped at (None to start from the
+        entry) and the decided bound. Returns (outcome, square, step); on UNKNOWN the square and step say where to
+        resume once more squares are decided, as the path up to there can no longer change. With single set, only
+        the square given is handled and UNKNOWN comes back with the next square."""
+        size = self._size
+        exits = self._exit
+        around = self._around
+        if decided is None:
+            decided = (size + 1) * (size + 1)  # past the reach of every square
+        if position is None:
+            if mask & self._reflect[entry]:
+                return entry, None, 0
+            position, step = self._start[entry]
+            if position - step + size + 1 >= decided:  # entry square's reflection atoms still open
+                return UNKNOWN, None, 0
+        for _ in range(self._limit):
+            if exits[position] >= 0:
+                return exits[position], position, step
+            if not mask & around[position]:
+                if position + size + 1 >= decided:
+                    return UNKNOWN, position, step
+                position += step
+                continue
+            if mask >> position & 1:
+                return HIT, position, step
+            if position + size + 1 >= decided:
+                return UNKNOWN, position, step
+            up_left = mask >> (position - size - 1) & 1
+            up_right = mask >> (position - size + 1) & 1
+            down_left = mask >> (position + size - 1) & 1
+            down_right = mask >> (position + size + 1) & 1
+            if (up_left and (up_right or down_left)) or (down_right and (up_right or down_left)):
+                step = -step  # double deflection
+            elif mask & self._inner[position]:
+                if step == size or step == -size:
+                    if mask >> (position + step + 1) & 1:
+                        step = -1
+                    elif mask >> (position + step - 1) & 1:
+                        step = 1
+                    else:
+                        return TRAPPED, position, step
+                else:
+                    if mask >> (position + size + step) & 1:
+                        step = -size
+                    elif mask >> (position - size + step) & 1:
+                        step = size
+                    else:
+                        return TRAPPED, position, step
+            position += step
+            if single:
+                return UNKNOWN, position, step
+        return TRAPPED, position, step
+
+
+@lru_cache(maxsize=None)
+def mask_tracer(size):
+    """Takes in the board size and returns the shared MaskTracer for it."""
+    return MaskTracer(size)
+
+
+def to_mask(atom_positions, size=10):
+    """Takes in a list of atom positions and returns the layout bitset."""
+    mask = 0
+    for row, col in atom_positions:
+        mask |= 1 << (row * size + col)
+    return mask
+
+
+def to_atoms(mask, size=10):
+    """Takes in a layout bitset and returns the sorted list of atom positions."""
+    atoms = []
+    while mask:
+        low = mask & -mask
+        index = low.bit_length() - 1
+        atoms.append((index // size, index % size))
+        mask ^= low
+    return atoms
+
+
+def _turn_mask(mask, back):
+    """Takes in a layout bitset and a square map, returns the bitset with every atom moved through the map."""
+    turned = 0
+    while mask:
+        low = mask & -mask
+        turned |= 1 << back[low.bit_length() - 1]
+        mask ^= low
+    return turned
+
+
+class Solver:
+    """Tracks the atom layouts consistent with the rays seen so far. Observations are added one at a time; once the
+    candidates are few enough to be kept as a list of bitsets, each new observation only filters that list."""
+
+    def __init__(self, atom_count, size=10, keep_limit=200000):
+        """Takes in the number of hidden atoms and the board size. Atoms can sit on any square inside the entry
+        squares. keep_limit is the largest number of candidates kept in memory for incremental filtering."""
+        self._atom_count = atom_count
+        self._size = size
+        self._keep_limit = keep_limit
+        self._tracer = mask_tracer(size)
+        self._cells = [row * size + col for row in range(1, size - 1) for col in range(1, size - 1)]
+        self._orientations = []     # (entry index map, square map back) for each symmetry of the board
+        entries = self._tracer.get_entries()
+        for transform in symmetries(size):
+            entry_map = [self._tracer.get_entry_index(transform(*entry)) for entry in entries]
+            back = [0] * (size * size)
+            for row in range(size):
+                for col in range(size):
+                    turned = transform(row, col)
+                    back[turned[0] * size + turned[1]] = row * size + col
+            self._orientations.append((entry_map, back))
+        self._observations = []     # (entry index, outcome) pairs
+        self._candidates = None     # list of layout bitsets, None until counted and small enough to keep
+        self._tally = None          # (count, atoms per square) for the current observations
+
+    def add_observation(self, entry, result):
+        """Takes in an entry square and the value shoot_ray() returned for it (exit square or None for a hit) and
+        narrows the candidates. Raises ValueError for a square that is not a legal entry."""
+        index = self._tracer.get_entry_index(tuple(entry))
+        if index is None:
+            raise ValueError('%s is not a legal entry square' % (entry,))
+        if result is None:
+            outcome = HIT
+        else:
+            outcome = self._tracer.get_entry_index(tuple(result))
+            if outcome is None:
+                raise ValueError('%s is not a legal exit square' % (result,))
+        self._observations.append((index, outcome))
+        self._tally = None
+        if self._candidates is not None:
+            trace = self._tracer.trace
+            self._candidates = [mask for mask in self._candidates if trace(mask, index) == outcome]
+
+    def get_atom_count(self):
+        """Returns the number of hidden atoms."""
+        return self._atom_count
+
+    def get_observations(self):
+        """Returns the list of (entry square, result) observations added so far."""
+        entries = self._tracer.get_entries()
+        return [(entries[index], None if outcome == HIT else entries[outcome])
+                for index, outcome in self._observations]
+
+    def masks(self):
+        """Returns a lazy iterator over the bitsets of every consistent layout."""
+        if self._candidates is not None:
+            return iter(self._candidates)
+        return self._enumerate()
+
+    def layouts(self):
+        """Returns a lazy iterator over every consistent layout as a sorted list of atom positions."""
+        size = self._size
+        return (to_atoms(mask, size) for mask in self.masks())
+
+    def count(self):
+        """Returns the number of consistent layouts. Subtrees no observation depends on are counted without being
+        enumerated; when the total is within keep_limit the candidates are kept for later observations."""
+        if self._candidates is not None:
+            return len(self._candidates)
+        return self._get_tally()[0]
+
+    def probabilities(self):
+        """Returns a dictionary mapping every square that can hold an atom to the fraction of consistent layouts
+        that have an atom there."""
+        size = self._size
+        if self._candidates is not None:
+            total = len(self._candidates)
+            counts = dict.fromkeys(self._cells, 0)
+            for mask in self._candidates:
+                while mask:
+                    low = mask & -mask
+                    counts[low.bit_length() - 1] += 1
+                    mask ^= low
+        else:
+            total, counts = self._get_tally()
+        total = total or 1
+        return {(cell // size, cell % size): counts[cell] / total for cell in self._cells}
+
+    def _get_tally(self):
+        """Returns (count, atoms per square) for the current observations. Every subtree left free of observations
+        adds its size with comb() and spreads its atoms over the remaining squares with a difference array. Keeps
+        the expanded candidates when there are no more than keep_limit of them."""
+        if self._tally is None:
+            cells = self._cells
+            roots, back = self._roots()
+            roots = list(roots)
+            total = 0
+            counts = dict.fromkeys(cells, 0)
+            spread = [0] * (len(cells) + 1)
+            for start, mask, remaining in roots:
+                rest = len(cells) - start
+                ways = comb(rest, remaining)
+                total += ways
+                while mask:
+                    low = mask & -mask
+                    counts[low.bit_length() - 1] += ways
+                    mask ^= low
+                if remaining:
+                    spread[start] += comb(rest - 1, remaining - 1)
+            running = 0
+            for position, cell in enumerate(cells):
+                running += spread[position]
+                counts[cell] += running
+            self._tally = (total, {back[cell]: counts[cell] for cell in cells})
+            if total <= self._keep_limit:
+                self._candidates = list(self._expand(roots, back))
+        return self._tally
+
+    def _enumerate(self):
+        """Yields every consistent layout bitset for the current observations."""
+        return self._expand(*self._roots())
+
+    def _roots(self):
+        """Picks the symmetry of the board that brings the ends of the observed rays closest to the first squares
+        in the search order, so their rays are decided after few placements. Returns the _search() generator over
+        the turned board and the map from turned squares back to real ones."""
+        start = [self._tracer.trace_start(entry) for entry in range(len(self._tracer.get_entries()))]
+        best = None
+        for entry_map, back in self._orientations:
+            cost = 0
+            turned = []
+            for entry, outcome in self._observations:
+                entry = entry_map[entry]
+                outcome = outcome if outcome < 0 else entry_map[outcome]
+                cost += start[entry] if outcome < 0 else max(start[entry], start[outcome])
+                turned.append((entry, outcome, None, 0))
+            if best is None or cost < best[0]:
+                best = (cost, turned, back)
+        if not best[1]:
+            return iter([(0, 0, self._atom_count)]), best[2]
+        return self._search(0, 0, self._atom_count, best[1]), best[2]
+
+    def _expand(self, roots, back):
+        """Takes in the (start, mask, remaining) subtrees found by _search() on a turned board and the map back to
+        real squares, yields every layout in them as a real bitset."""
+        for start, mask, remaining in roots:
+            if remaining == 0:
+                yield _turn_mask(mask, back)
+            else:
+                for layout in self._free(start, mask, remaining):
+                    yield _turn_mask(layout, back)
+
+    def _search(self, start, mask, remaining, pending):
+        """Takes in the next position in the square list, the atoms placed so far, how many are still to place and
+        the observations not yet decided by them. Rejects a placement as soon as a decided ray disagrees with its
+        observation and yields (start, mask, remaining) for every subtree whose completions all agree. Pending
+        observations carry the square and step their ray stopped at, so each placement only extends the paths."""
+        cells = self._cells
+        resume = self._tracer.resume
+        if remaining == 0:
+            if all(resume(mask, entry, position, step)[0] == outcome for entry, outcome, position, step in pending):
+                yield start, mask, 0
+            return
+        if remaining == 1:
+            yield from self._search_last(start, mask, pending)
+            return
+        for index in range(start, len(cells) - remaining + 1):
+            cell = cells[index]
+            placed = mask | 1 << cell
+            decided = cell + 1  # later atoms can only go on higher squares
+            still = []
+            for entry, outcome, position, step in pending:
+                result, position, step = resume(placed, entry, position, step, decided)
+                if result == UNKNOWN:
+                    still.append((entry, outcome, position, step))
+                elif result != outcome:
+                    break
+            else:
+                if not still:
+                    yield index + 1, placed, remaining - 1
+                else:
+                    yield from self._search(index + 1, placed, remaining - 1, still)
+
+    def _search_last(self, start, mask, pending):
+        """Places the last atom. Traces every pending ray once without it; the atom can only change a ray if it
+        lands in that ray's zone, so a ray that disagrees without it rules out every square outside its zone and
+        only the rays whose zone holds the square are traced again."""
+        cells = self._cells
+        resume = self._tracer.resume
+        trace_zone = self._tracer.trace_zone
+        allowed = -1    # squares the last atom may use, every one until a ray disagrees
+        zones = []
+        for entry, outcome, position, step in pending:
+            result, zone = trace_zone(mask, entry)
+            if result != outcome:
+                allowed &= zone
+            zones.append((zone, entry, outcome, position, step))
+        for index in range(start, len(cells)):
+            cell = cells[index]
+            if not allowed >> cell & 1:
+                continue
+            placed = mask | 1 << cell
+            for zone, entry, outcome, position, step in zones:
+                if zone >> cell & 1 and resume(placed, entry, position, step)[0] != outcome:
+                    break
+            else:
+                yield index + 1, placed, 0
+
+    def _free(self, start, mask, remaining):
+        """Yields every way to place the remaining atoms on squares from start on, once no observation depends on
+        them any more."""
+        cells = self._cells
+        for position in range(start, len(cells) - remaining + 1):
+            placed = mask | 1 << cells[position]
+            if remaining == 1:
+                yield placed
+            else:
+                yield from self._free(position + 1, placed, remaining - 1)
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# Date: 10/18/26
+# Description: Loop based ray tracer for BlackBox boards of any size. The special squares found by BlackBoxGame are
+# folded into a flat per-cell map once, then every ray is followed with an explicit (row, column, row step,
+# column step) state instead of one recursive call per square, so long paths on large boards never reach the
+# recursion limit. Results match BlackBoxGame.rec_shoot_ray() square for square. CellMap.path() follows the same
+# walk one step at a time and yields every square and event along the way.
+
+from functools import lru_cache
+
+# kinds of square stored in the per-cell map
+EMPTY = 0       # ray continues straight
+ATOM = 1        # ray is absorbed
+EDGE = 2        # legal entry/exit square, ray leaves the box
+REFLECT = 3     # legal entry square next to a grid edge atom, ray is sent straight back out
+DOUBLE = 4      # double deflection square, ray reverses
+DEFLECT = 5     # deflection square, ray turns away from the atom it approaches
+CORNER = 6      # corner square, never reached by a ray
+
+# events yielded by CellMap.path() as (event, (row, column)) pairs
+PATH_EVENTS = ('enter', 'cell', 'deflect', 'double', 'reflect', 'hit', 'exit')
+
+
+@lru_cache(maxsize=None)
+def legal_entries(size):
+    """Takes in the board size and returns the tuple of legal entry squares in the same order BlackBoxGame always
+    used: top row, left column, right column, bottom row. The tuple is shared by every caller."""
+    last = size - 1
+    entries = [(0, col) for col in range(1, last)]
+    entries += [(row, 0) for row in range(1, last)]
+    entries += [(row, last) for row in range(1, last)]
+    entries += [(last, col) for col in range(1, last)]
+    return tuple(entries)
+
+
+@lru_cache(maxsize=None)
+def grid_edge(size):
+    """Takes in the board size and returns the tuple of squares that form the outer ring of the playing area,
+    directly inside the entry squares. The tuple is shared by every caller."""
+    last = size - 2
+    squares = [(1, col) for col in range(1, last + 1)]
+    squares += [(row, last) for row in range(2, last)]
+    squares += [(row, 1) for row in range(2, last + 1)]
+    squares += [(last, col) for col in range(2, last + 1)]
+    return tuple(squares)
+
+
+def entry_direction(size, row, column):
+    """Takes in the board size and a legal entry square, returns the (row step, column step) of the first move."""
+    if row == 0:
+        return 1, 0
+    if row == size - 1:
+        return -1, 0
+    if column == 0:
+        return 0, 1
+    return 0, -1
+
+
+def symmetries(size):
+    """Takes in the board size and returns the eight rotations and mirror images of the board as functions
+    (row, column) -> (row, column). The first one is the identity. The ray rules treat all eight alike, so a
+    layout's exits map onto the exits of its transformed layout."""
+    last = size - 1
+    return [lambda r, c: (r, c), lambda r, c: (c, last - r), lambda r, c: (last - r, last - c),
+            lambda r, c: (last - c, r), lambda r, c: (r, last - c), lambda r, c: (last - r, c),
+            lambda r, c: (c, r), lambda r, c: (last - c, last - r)]
+
+
+class CellMap:
+    """Flat per-cell map of a board. Each square holds one of the kinds above, picked with the same precedence
+    rec_shoot_ray() checks its sets in, and deflection squares also hold the direction a ray leaves in for every
+    direction it can arrive from."""
+
+    def __init__(self, size, atom_positions, reflection, deflection, double_deflection):
+        """Takes in the board size, the atom positions and the reflection, deflection and double deflection
+        square sets built by BlackBoxGame and fills the map in one pass over each of them."""
+        self._size = size
+        self._kind = bytearray(size * size)
+        self._turn = dict()  # (cell index, row step, column step) -> (row step, column step) after deflection
+        self._limit = 4 * size * size + 1  # more steps than this means the ray revisits a state forever
+        kind = self._kind
+        atoms = set(atom_positions)
+        for square in deflection:
+            kind[square[0] * size + square[1]] = DEFLECT
+            self.set_turns(square, atoms)
+        for square in double_deflection:
+            kind[square[0] * size + square[1]] = DOUBLE
+        last = size - 1
+        for square in legal_entries(size):
+            kind[square[0] * size + square[1]] = EDGE
+        for square in reflection:
+            if 0 < square[0] < last or 0 < square[1] < last:  # corners can be marked but are never entered
+                kind[square[0] * size + square[1]] = REFLECT
+        for square in ((0, 0), (0, last), (last, 0), (last, last)):
+            kind[square[0] * size + square[1]] = CORNER
+        for atom in atoms:
+            kind[atom[0] * size + atom[1]] = ATOM
+
+    def set_turns(self, square, atoms):
+        """Takes in a deflection square and the set of atoms, records the new direction for each incoming direction
+        that approaches a diagonal atom. The ray turns away from the atom it is moving towards."""
+        row, col = square
+        index = row * self._size + col
+        for step in (1, -1):
+            # moving vertically towards an atom on the next row
+            if (row + step, col + 1) in atoms:
+                self._turn[(index, step, 0)] = (0, -1)
+            elif (row + step, col - 1) in atoms:
+                self._turn[(index, step, 0)] = (0, 1)
+            # moving horizontally towards an atom in the next column
+            if (row + 1, col + step) in atoms:
+                self._turn[(index, 0, step)] = (-1, 0)
+            elif (row - 1, col + step) in atoms:
+                self._turn[(index, 0, step)] = (1, 0)
+
+    def set_square(self, square, atoms, reflection, deflection, double_deflection):
+        """Takes in a square, the atoms (anything supporting in) and the reflection, deflection and double
+        deflection square sets, and sets the square's kind and turns again with the same precedence the map was
+        filled with. Used to update the squares around an atom that was added or removed."""
+        row, col = square
+        index = row * self._size + col
+        for step in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            self._turn.pop((index,) + step, None)
+        last = self._size - 1
+        border = row in (0, last) or col in (0, last)
+        if square in atoms:
+            kind = ATOM
+        elif row in (0, last) and col in (0, last):
+            kind = CORNER
+        elif square in reflection:
+            kind = REFLECT
+        elif border:
+            kind = EDGE
+        elif square in double_deflection:
+            kind = DOUBLE
+        elif square in deflection:
+            kind = DEFLECT
+            self.set_turns(square, atoms)
+        else:
+            kind = EMPTY
+        self._kind[index] = kind
+
+    def copy(self):
+        """Returns a map of the same class with its own copy of the kinds and turns."""
+        cell_map = object.__new__(type(self))
+        cell_map.__dict__.update(self.__dict__)
+        cell_map._kind = bytearray(self._kind)
+        cell_map._turn = dict(self._turn)
+        return cell_map
+
+    def get_size(self):
+        """Returns the board size the map was built for."""
+        return self._size
+
+    def get_kind(self, row, column):
+        """Returns the kind of the square at row, column."""
+        return self._kind[row * self._size + column]
+
+    def trace(self, row, column):
+        """Takes in a legal entry square and follows the ray until it leaves the box. Returns the (row, column) exit
+        square, or None if the ray hits an atom. Raises RuntimeError if the ray can never leave the box."""
+        size = self._size
+        kind = self._kind
+        if kind[row * size + column] == REFLECT:
+            return row, column
+        dr, dc = entry_direction(size, row, column)
+        r = row + dr
+        c = column + dc
+        for step in range(self._limit):
+            index = r * size + c
+            k = kind[index]
+            if k == EMPTY:
+                r += dr
+                c += dc
+                continue
+            if k == EDGE or k == REFLECT:
+                return r, c
+            if k == ATOM:
+                return None
+            if k == DOUBLE:
+                dr = -dr
+                dc = -dc
+            else:
+                turn = self._turn.get((index, dr, dc))
+                if turn is None:
+                    raise RuntimeError('ray from %s is stuck at %s' % ((row, column), (r, c)))
+                dr, dc = turn
+            r += dr
+            c += dc
+        raise RuntimeError('ray from %s never leaves the box' % ((row, column),))
+
+    def path(self, row, column):
+        """Takes in a legal entry square and follows the ray one square at a time, yielding (event, square) pairs:
+        'enter' for the entry square, 'cell' for every square inside the box the ray passes through, then
+        'deflect', 'double' or 'reflect' on the square where the ray turns, and last 'hit' with the atom square or
+        'exit' with the exit square. Nothing is traced ahead of what has been asked for. Raises RuntimeError where
+        trace() would, once the walk gets there."""
+        size = self._size
+        kind = self._kind
+        yield 'enter', (row, column)
+        if kind[row * size + column] == REFLECT:
+            yield 'reflect', (row, column)
+            yield 'exit', (row, column)
+            return
+        dr, dc = entry_direction(size, row, column)
+        r = row + dr
+        c = column + dc
+        for step in range(self._limit):
+            index = r * size + c
+            k = kind[index]
+            if k == EDGE or k == REFLECT:
+                yield 'exit', (r, c)
+                return
+            if k == ATOM:
+                yield 'hit', (r, c)
+                return
+            yield 'cell', (r, c)
+            if k == DOUBLE:
+                yield 'double', (r, c)
+                dr = -dr
+                dc = -dc
+            elif k == DEFLECT:
+                turn = self._turn.get((index, dr, dc))
+                if turn is None:
+                    raise RuntimeError('ray from %s is stuck at %s' % ((row, column), (r, c)))
+                yield 'deflect', (r, c)
+                dr, dc = turn
+            r += dr
+            c += dc
+        raise RuntimeError('ray from %s never leaves the box' % ((row, column),))
@@ -3,8 +3,33 @@
 # Date: 8/11/20
 # Description:
 from BlackBoxGame import *
+from solver import Solver, to_atoms, to_mask
+from simulator import simulate, random_strategy
+from server import SessionTable, GameServer
+from cache import LayoutCache
+from eventlog import EventLog
+from advisor import ShotAdvisor
+from blackbox import run
+from metrics import InstrumentedGame, get_global
+from puzzles import generate, is_unique, make, rate
+from puzzle import Puzzle
+from signatures import SignatureDB, build, layout_atoms, layout_id
+from reference import ReferenceGame
+from benchmark import compare, run_suite
+import fuzz
+import io
+import json
+import os
+import tempfile
 import unittest
 
+try:
+    import batch
+    import replay
+except ImportError:     # numpy is optional, only the batch tracer and log replay need it
+    batch = None
+    replay = None
+
 
 class Tie(unittest.TestCase):
     """unit testing class"""
@@ -82,5 +107,381 @@ class Tie(unittest.TestCase):
         #game.print_board()
         #print(game.get_score())
 
+    def test_exit_table(self):
+        """tests that the exit table matches shoot_ray without changing the score"""
+        game = BlackBoxGame([(7, 1), (7, 3), (3, 6), (1, 6)])
+        table = game.exit_table()
+        self.assertEqual(len(table), 32)
+        self.assertEqual(game.get_score(), 25)  # reading the table is free
+        self.assertEqual(table[(4, 9)], (9, 7))
+        self.assertEqual(game.shoot_ray(4, 9), table[(4, 9)])
+        self.assertEqual(game.get_score(), 23)  # entry and exit charged once each
+        with self.assertRaises(TypeError):
+            table[(4, 9)] = None  # table is read-only
+
+    def test_board_size(self):
+        """tests boards larger than 10x10 and long rays that would exceed the recursion limit"""
+        game = BlackBoxGame([(10, 10), (5, 5)], 12)
+        self.assertEqual(game.shoot_ray(11, 9), (11, 9))  # reflection next to bottom right corner atom
+        self.assertEqual(game.shoot_ray(9, 11), (9, 11))  # reflection next to bottom right corner atom
+        self.assertEqual(game.shoot_ray(0, 5), None)       # vertical hit
+        self.assertEqual(game.shoot_ray(0, 4), (4, 0))     # down to left deflection
+        self.assertEqual(game.shoot_ray(11, 11), False)    # corner of a 12x12 board
+        game = BlackBoxGame([(100, 300), (300, 100)], 400)
+        self.assertEqual(game.shoot_ray(0, 1), (399, 1))    # 400 squares in a single ray
+        self.assertEqual(game.shoot_ray(0, 299), (99, 0))   # up to left deflection far from the edge
+        for entry in game.exit_table():
+            game.shoot_ray(*entry)
+        self.assertEqual(len(game.exit_table()), 4 * 398)
+
+    @unittest.skipIf(batch is None, 'numpy is not installed')
+    def test_trace_batch(self):
+        """tests that the batch tracer agrees with the exit table of every layout above"""
+        layouts = [[(7, 1), (7, 3), (3, 6), (1, 6)], [(5, 2), (5, 4), (3, 6), (1, 6)], [(4, 5), (8, 8), (8, 3), (1, 6)],
+                   [(2, 5), (6, 5), (6, 7)], [(8, 8), (1, 1), (1, 8)], [(7, 4), (6, 5), (6, 6), (8, 3)]]
+        codes = batch.trace_batch(layouts)
+        self.assertEqual(codes.shape, (6, 32))
+        for atoms, row in zip(layouts, codes):
+            self.assertEqual(batch.decode(row), dict(BlackBoxGame(atoms).exit_table()))
+        self.assertEqual(codes[2, 4], batch.REFLECT)     # (0, 5) reflects off (1, 6)
+        self.assertEqual(codes[4, 8], batch.HIT)         # (1, 0) hits (1, 1)
+        self.assertEqual(codes[5, 4], batch.TRAPPED)     # (0, 5) is stuck after turning at (5, 5)
+
+    def test_solver(self):
+        """tests that the solver narrows the layouts down to the hidden one"""
+        game = BlackBoxGame([(7, 1), (7, 3), (3, 6), (1, 6)])
+        solver = Solver(4)
+        self.assertEqual(solver.count(), 635376)    # every way to place 4 atoms on 64 squares
+        solver.add_observation((4, 9), game.shoot_ray(4, 9))
+        solver.add_observation((0, 4), game.shoot_ray(0, 4))
+        self.assertEqual(solver.count(), 408)
+        self.assertIn([(1, 6), (3, 6), (7, 1), (7, 3)], list(solver.layouts()))
+        self.assertAlmostEqual(sum(solver.probabilities().values()), 4)
+        for entry, exit_point in game.exit_table().items():
+            solver.add_observation(entry, exit_point)
+        self.assertEqual(list(solver.layouts()), [[(1, 6), (3, 6), (7, 1), (7, 3)]])
+        self.assertEqual(solver.probabilities()[(3, 6)], 1)
+        with self.assertRaises(ValueError):
+            solver.add_observation((0, 0), None)    # corner is not an entry
+
+    def test_simulator(self):
+        """tests that simulated runs are repeatable and every game is counted"""
+        runs = [list(simulate(random_strategy, 60, chunk=25, workers=1, seed=3)) for _ in range(2)]
+        self.assertEqual(len(runs[0]), 3)                       # one update per chunk
+        stats = runs[0][-1][0]
+        self.assertEqual(stats.get_games(), 60)
+        self.assertEqual(stats.get_histogram(), runs[1][-1][0].get_histogram())
+        self.assertLessEqual(stats.summary()['max'], 25)
+
+    def test_bitboards(self):
+        """tests guesses, entry/exits and atoms left kept as bitboards"""
+        game = BlackBoxGame([(3, 4), (4, 5), (8, 8)])
+        self.assertEqual(game.atoms_left(), 3)
+        self.assertEqual(game.guess_atom(4, 5), True)
+        self.assertEqual(game.guess_atom(4, 5), True)     # repeat correct guess is not counted twice
+        self.assertEqual(game.atoms_left(), 2)
+        self.assertEqual(game.guess_atom(12, 1), False)   # off the board guesses are remembered too
+        self.assertEqual(game.guess_atom(12, 1), False)
+        self.assertEqual(game.get_score(), 20)
+        self.assertEqual(game._player.get_guess(), {(4, 5), (12, 1)})
+        game.shoot_ray(0, 2)
+        self.assertEqual(game._player.get_entry_exit(), {(0, 2), (9, 2)})
+        self.assertEqual(game._board.get_board()[0][0], 'X')
+        self.assertEqual(game._board.get_board()[3][4], 'A')
+        with self.assertRaises(AttributeError):
+            game.extra = 1      # game state lives in slots
+
+    def test_snapshot_clone(self):
+        """tests that snapshots restore the same game and clones do not share mutable state"""
+        game = BlackBoxGame([(7, 1), (7, 3), (3, 6), (1, 6)])
+        game.shoot_ray(4, 9)
+        game.guess_atom(7, 1)
+        game.guess_atom(-1, 4)
+        data = game.snapshot()
+        self.assertLess(len(data), 100)
+        restored = BlackBoxGame.restore(data)
+        self.assertEqual(restored.get_score(), game.get_score())
+        self.assertEqual(restored.atoms_left(), 3)
+        self.assertEqual(restored._player.get_guess(), {(7, 1), (-1, 4)})
+        self.assertEqual(restored.snapshot(), data)
+        copy = game.clone()
+        self.assertEqual(copy.guess_atom(5, 5), False)
+        self.assertEqual(copy.get_score(), game.get_score() - 5)
+        self.assertEqual(copy.shoot_ray(4, 9), (9, 7))
+        with self.assertRaises(ValueError):
+            BlackBoxGame.restore(data[:-1])
+
+    def test_server(self):
+        """tests server commands and least recently used/idle session eviction"""
+        now = [0.0]
+        table = SessionTable(capacity=2, idle=60, clock=lambda: now[0])
+        server = GameServer(table)
+        first = server.handle({'cmd': 'new', 'atoms': [[7, 1], [7, 3], [3, 6], [1, 6]]})['session']
+        self.assertEqual(server.handle({'cmd': 'shoot', 'session': first, 'row': 4, 'column': 9, 'tag': 5}),
+                         {'ok': True, 'exit': [9, 7], 'score': 23, 'tag': 5})
+        self.assertEqual(server.handle({'cmd': 'guess', 'session': first, 'row': 7, 'column': 1})['atoms_left'], 3)
+        self.assertEqual(server.handle({'cmd': 'board', 'session': first})['board'][7], '*A       *')
+        second = server.handle({'cmd': 'new', 'atoms': 3})['session']
+        server.handle({'cmd': 'score', 'session': first})      # second is now least recently used
+        server.handle({'cmd': 'new'})
+        self.assertFalse(server.handle({'cmd': 'score', 'session': second})['ok'])
+        self.assertTrue(server.handle({'cmd': 'score', 'session': first})['ok'])
+        now[0] = 61
+        self.assertFalse(server.handle({'cmd': 'score', 'session': first})['ok'])
+        self.assertEqual(table.get_stats(), {'sessions': 0, 'evictions': 1, 'expirations': 2})
+        self.assertIn('bad request', server.handle({'cmd': 'shoot'})['error'])     # no session given
+        self.assertIn('bad request', server.handle({'cmd': 'new', 'size': float('inf')})['error'])
+        self.assertIn('bad request', server.handle({'cmd': 'new', 'size': 100})['error'])
+
+    def test_layout_cache(self):
+        """tests that rotated and mirrored layouts share one cache entry with exits mapped back"""
+        cache = LayoutCache(capacity=2)
+        game = cache.game([(7, 1), (7, 3), (3, 6), (1, 6)])
+        self.assertEqual(game.shoot_ray(4, 9), (9, 7))
+        mirrored = cache.game([(7, 8), (7, 6), (3, 3), (1, 3)])     # left to right mirror image
+        self.assertEqual(mirrored.shoot_ray(4, 0), (9, 2))
+        self.assertEqual(dict(mirrored.exit_table()), dict(BlackBoxGame([(7, 8), (7, 6), (3, 3), (1, 3)]).exit_table()))
+        rotated = cache.game([(1, 2), (3, 2), (6, 6), (6, 8)])       # quarter turn
+        self.assertEqual(dict(rotated.exit_table()), dict(BlackBoxGame([(1, 2), (3, 2), (6, 6), (6, 8)]).exit_table()))
+        # the quarter turn is the canonical form itself, only the mirror image had to be mapped
+        self.assertEqual(cache.get_stats(), {'hits': 2, 'symmetric_hits': 1, 'misses': 1, 'evictions': 0,
+                                             'layouts': 1})
+        cache.game([(2, 2)])
+        cache.game([(2, 5)])
+        self.assertEqual(cache.get_stats()['evictions'], 1)
+
+    def test_event_log(self):
+        """tests that recorded games are written as fixed size records and replay to the same scores"""
+        path = os.path.join(tempfile.mkdtemp(), 'events.log')
+        with EventLog(path, batch=64) as log:
+            game = log.game([(7, 1), (7, 3), (3, 6), (1, 6)])
+            self.assertEqual(game.shoot_ray(4, 9), (9, 7))
+            self.assertEqual(game.shoot_ray(0, 0), False)
+            self.assertEqual(game.guess_atom(7, 1), True)
+            other = log.game([(2, 2)])
+            other.guess_atom(2, 2)
+        self.assertEqual(os.path.getsize(path), 11 * 32)      # 2 new, 5 atom, 2 shoot, 2 guess events
+        with self.assertRaises(ValueError):
+            game.shoot_ray(0, 3)                # the log is closed
+        with self.assertRaises(ValueError):
+            log.flush()
+        log = EventLog(path + '.bad')
+        bad = log.game([(2, 2)])
+        with self.assertRaises(ValueError):
+            bad.guess_atom(1 << 20, 0)          # does not fit a record, so the game is left alone
+        self.assertEqual(bad.get_score(), 25)
+        log._file.close()                       # make the writer thread fail
+        with self.assertRaises(ValueError):
+            log.flush()
+        with self.assertRaises(ValueError):
+            log.close()                         # still stops the writer, then raises its error
+        with self.assertRaises(ValueError):
+            bad.shoot_ray(0, 3)                 # the log is closed, so the game is left alone
+        self.assertEqual(bad.get_score(), 25)
+        with self.assertRaises(ValueError):
+            log.flush()
+        log.close()
+        self.assertFalse(log._writer.is_alive())
+        if replay is None:
+            return
+        events = replay.load(path)
+        ids, scores, atoms_left = replay.final_scores(events)
+        self.assertEqual(dict(zip(ids.tolist(), scores.tolist())),
+                         {game.get_game_id(): game.get_score(), other.get_game_id(): 25})
+        steps = replay.timeline(events, game.get_game_id())
+        self.assertEqual([step['event'] for step in steps], ['new'] + ['atom'] * 4 + ['shoot', 'shoot', 'guess'])
+        self.assertEqual(steps[5]['exit'], (9, 7))
+        self.assertEqual(replay.entry_stats(events)[(4, 9)]['shots'], 1)
+        with EventLog(path + '.returns') as log:
+            game = log.game([(7, 1), (7, 3), (3, 6), (1, 6)])
+            self.assertEqual(game.shoot_ray(0, 5), (0, 5))      # reflection square
+            self.assertEqual(game.shoot_ray(0, 2), (0, 2))      # comes back off the double deflection
+        stats = replay.entry_stats(replay.load(path + '.returns'))
+        self.assertEqual((stats[(0, 5)]['reflections'], stats[(0, 5)]['returns']), (1, 0))
+        self.assertEqual((stats[(0, 2)]['reflections'], stats[(0, 2)]['returns']), (0, 1))
+
+    def test_recommend_shots(self):
+        """tests that shot suggestions skip fired entries, leave the score alone and narrow to the real layout"""
+        game = BlackBoxGame([(7, 1), (7, 3), (3, 6), (1, 6)])
+        suggestions = game.recommend_shots(3)
+        self.assertEqual(len(suggestions), 3)
+        self.assertEqual(game.get_score(), 25)
+        entry, bits, points = suggestions[0]
+        self.assertGreater(bits, 0)
+        self.assertGreaterEqual(points, 1)
+        game.shoot_ray(*entry)
+        self.assertNotIn(entry, [square for square, _, _ in game.recommend_shots(32)])
+        advisor = ShotAdvisor(4, seed=1)
+        for square, exit_point in game.exit_table().items():
+            advisor.add_observation(square, exit_point)
+        self.assertTrue(advisor.is_exact())
+        self.assertEqual(advisor.get_pool(), [to_mask([(7, 1), (7, 3), (3, 6), (1, 6)])])
+        self.assertEqual(advisor.recommend(3), [])      # every entry has been observed
+
+    def test_trace_path(self):
+        """tests that ray paths end where shoot_ray does, show their events and leave the score alone"""
+        game = BlackBoxGame([(7, 1), (7, 3), (3, 6), (1, 6)])
+        path = list(game.trace_path(4, 9))
+        self.assertEqual(path[0], ('enter', (4, 9)))
+        self.assertIn(('deflect', (4, 7)), path)
+        self.assertEqual(path[-1], ('exit', (9, 7)))
+        self.assertEqual(list(game.trace_path(9, 1)), [('enter', (9, 1)), ('cell', (8, 1)), ('hit', (7, 1))])
+        self.assertIn(('double', (6, 2)), game.trace_path(0, 2))
+        self.assertEqual(game.get_score(), 25)
+        for entry, exit_point in game.exit_table().items():
+            event, square = list(game.trace_path(*entry))[-1]
+            self.assertEqual(square if event == 'exit' else None, exit_point)
+        self.assertRaises(ValueError, game.trace_path, 0, 0)
+
+    def test_headless_cli(self):
+        """tests that scripted games stream through in order, alone and across worker processes"""
+        game = '{"id": %d, "atoms": [[7, 1], [7, 3], [3, 6], [1, 6]], "shots": [[4, 9], [0, 0]], "guesses": [[7, 1]]}'
+        lines = [game % number for number in range(40)] + ['', '{"atoms": [[0, 5]]}', '[1, 2]', '{"size": 1e400}']
+        results = []
+        for jobs in (1, 2):
+            out = io.StringIO()
+            self.assertEqual(run(enumerate(lines, 1), out, jobs, chunk=7), 43)
+            results.append(out.getvalue())
+        self.assertEqual(results[0], results[1])
+        first = json.loads(results[0].splitlines()[0])
+        self.assertEqual(first, {'id': 0, 'exits': [[9, 7], False], 'hits': [True], 'score': 23, 'atoms_left': 3})
+        self.assertEqual([json.loads(line)['line'] for line in results[0].splitlines()[-3:]], [42, 43, 44])
+
+    def test_metrics(self):
+        """tests that instrumented games play like plain ones and count every ray per game and globally"""
+        atoms = [(7, 1), (7, 3), (3, 6), (1, 6)]
+        plain = BlackBoxGame(atoms)
+        rays = get_global().get_stats()['rays']
+        game = InstrumentedGame(atoms)
+        self.assertEqual(game.shoot_ray(4, 9), (9, 7))
+        self.assertEqual(dict(game.exit_table()), dict(plain.exit_table()))
+        stats = game.get_metrics().get_stats()
+        self.assertEqual(stats['rays'], 32)     # the exit table traces every legal entry once
+        self.assertEqual(stats['hits'] + stats['exits'] + stats['trapped'], 32)
+        self.assertGreater(stats['deflections'], 0)
+        self.assertEqual(stats['phases']['exit_table']['runs'], 1)
+        self.assertEqual(get_global().get_stats()['rays'], rays + 32)
+        self.assertIs(game.clone().get_metrics(), game.get_metrics())
+        self.assertIn('blackbox_rays_total 32', game.get_metrics().to_prometheus())
+        game.shoot_ray(4, 9)    # answered from the exit table, still counted as a shot
+        game.shoot_ray(0, 0)    # corner, not a shot
+        stats = game.get_metrics().get_stats()
+        self.assertEqual((stats['rays'], stats['shots'], stats['shot_exits']), (32, 2, 2))
+        steps = sum(1 for event, _ in plain.trace_path(4, 9) if event == 'cell')
+        self.assertEqual(stats['shot_steps'], 2 * steps)
+
+    def test_puzzles(self):
+        """tests that generated puzzles are unique, at the asked difficulty and the same for a seed with any jobs"""
+        puzzles = list(generate(12, 4, difficulty='hard', seed=7, chunk=5))
+        self.assertEqual(len(puzzles), 12)
+        for atoms in puzzles:
+            game = BlackBoxGame(atoms)
+            self.assertTrue(is_unique(game))
+            self.assertEqual(rate(game), 'hard')
+        self.assertEqual(list(generate(12, 4, difficulty='hard', seed=7, jobs=2, chunk=5)), puzzles)
+        self.assertFalse(is_unique(BlackBoxGame([(1, 1), (1, 3), (3, 1), (4, 4)], 6)))
+        self.assertTrue(is_unique(BlackBoxGame([(7, 1), (7, 3), (3, 6), (1, 6)])))
+        with self.assertRaises(ValueError):
+            make(1, 1, 6, difficulty='easy')     # one atom never blocks half the rays
+
+    def test_add_remove_atom(self):
+        """tests that editing atoms matches a game built from scratch and leaves shared data alone"""
+        atoms = [(7, 1), (7, 3), (3, 6), (1, 6)]
+        cache = LayoutCache()
+        game = cache.game(atoms)
+        copy = game.clone()
+        self.assertTrue(game.add_atom(5, 5))
+        self.assertTrue(game.remove_atom(7, 1))
+        self.assertFalse(game.add_atom(5, 5))
+        self.assertFalse(game.add_atom(0, 5))
+        self.assertFalse(game.remove_atom(7, 1))
+        fresh = BlackBoxGame([(7, 3), (3, 6), (1, 6), (5, 5)])
+        self.assertEqual(game.get_derived(), fresh.get_derived())
+        self.assertEqual(game.shoot_ray(4, 9), fresh.shoot_ray(4, 9))
+        self.assertEqual(atoms, [(7, 1), (7, 3), (3, 6), (1, 6)])
+        self.assertEqual(cache.game(atoms).get_derived(), BlackBoxGame(atoms).get_derived())
+        self.assertEqual(copy.get_derived(), BlackBoxGame(atoms).get_derived())
+        game.guess_atom(5, 5)
+        self.assertEqual(game.atoms_left(), 3)
+        game.remove_atom(5, 5)
+        self.assertEqual(game.atoms_left(), 3)
+
+    def test_shared_puzzle(self):
+        """tests that sessions of a shared puzzle score like separate games and read the same shared block"""
+        atoms = [(7, 1), (7, 3), (3, 6), (1, 6)]
+        published = Puzzle.from_atoms(atoms).publish()
+        attached = Puzzle.attach(published.get_name())
+        first, second = attached.session(), published.session()
+        game = BlackBoxGame(atoms)
+        for session in (first, second):
+            self.assertEqual(session.shoot_ray(4, 9), game.shoot_ray(4, 9))
+            self.assertEqual(session.shoot_ray(0, 0), False)
+            self.assertEqual(session.shoot_ray(9, 1), None)
+            self.assertEqual(session.guess_atom(7, 1), True)
+            self.assertEqual(session.guess_atom(2, 2), False)
+            self.assertEqual(session.guess_atom(2, 2), False)
+        game.shoot_ray(9, 1), game.guess_atom(7, 1), game.guess_atom(2, 2)
+        self.assertEqual(first.get_score(), game.get_score())
+        self.assertEqual(second.atoms_left(), 3)
+        self.assertEqual(attached.to_bytes(), Puzzle.from_atoms(atoms).to_bytes())
+        attached.close()
+        published.close()
+        published.unlink()
+
+    def test_fuzz(self):
+        """tests that the engines agree with the reference and that a broken engine is caught and shrunk"""
+        reference = ReferenceGame([(7, 1), (7, 3), (3, 6), (1, 6)])
+        self.assertEqual((reference.shoot_ray(4, 9), reference.shoot_ray(3, 9), reference.shoot_ray(0, 0)),
+                         ((9, 7), None, False))
+        checked = list(fuzz.fuzz(['table', 'path', 'edited', 'solver'], 60, workers=1, chunk=30, seed=3))
+        self.assertEqual(checked[-1][0], 60)
+        self.assertEqual([mismatch for _, _, mismatches, _ in checked for mismatch in mismatches], [])
+
+        def blind(layouts, size):
+            """engine that cannot see an atom at (2, 2)"""
+            return fuzz.table_engine([[atom for atom in atoms if atom != (2, 2)] for atoms in layouts], size)
+        atoms = [(7, 1), (2, 2), (3, 6), (1, 6)]
+        self.assertTrue(fuzz.disagreements(fuzz.recursive_engine, blind, atoms, 10))
+        self.assertEqual(fuzz.shrink(fuzz.recursive_engine, blind, atoms, 10), [(2, 2)])
+
+    def test_signatures(self):
+        """tests that the signature database finds the same layouts as the solver for partial observations"""
+        atoms = [(1, 1), (2, 3), (4, 2)]
+        self.assertEqual(layout_atoms(layout_id(atoms, 6), 3, 6), atoms)
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'signatures.db')
+            self.assertEqual(build(path, 3, 6, workers=1), 560)
+            db = SignatureDB(path)
+            table = BlackBoxGame(atoms, 6).exit_table()
+            self.assertEqual(db.layouts(table.items()), [atoms])
+            for entries in ([(0, 1), (0, 2)], [(3, 5), (5, 2)], [(2, 0)], [(0, 1), (4, 5), (5, 3)]):
+                solver = Solver(3, 6)
+                for entry in entries:
+                    solver.add_observation(entry, table[entry])
+                expected = sorted(layout_id(to_atoms(mask, 6), 6) for mask in solver.masks())
+                self.assertEqual(db.lookup([(entry, table[entry]) for entry in entries]), expected)
+            self.assertEqual(db.lookup([((0, 1), None), ((0, 1), (0, 1))]), [])
+            with self.assertRaises(ValueError):
+                db.lookup([((0, 0), None)])
+            db.close()
+
+    def test_benchmark_compare(self):
+        """tests that a saved baseline flags median and tail latency regressions with their own thresholds"""
+        path = os.path.join(tempfile.mkdtemp(), 'baseline.json')
+        with open(path, 'w') as handle:
+            json.dump({'results': run_suite([2], [6], games=5, repeat=1)}, handle)
+        with open(path) as handle:
+            baseline = json.load(handle)['results']
+        self.assertEqual(compare(baseline, baseline, 0.2), [])
+        slower = json.loads(json.dumps(baseline))
+        name = sorted(slower)[0]
+        slower[name]['shoot_ray']['p99_us'] = baseline[name]['shoot_ray']['p99_us'] * 3 + 1
+        regressions = compare(slower, baseline, 0.2, tail_threshold=0.5)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn('%s shoot_ray p99' % name, regressions[0])
+        self.assertEqual(compare(slower, baseline, 0.2, tail_threshold=100), [])
+        slower[name]['construct']['p50_us'] = baseline[name]['construct']['p50_us'] * 2 + 1
+        self.assertIn('%s construct p50' % name, compare(slower, baseline, 0.2, tail_threshold=100)[0])
+
 if __name__ == '__main__':
     unittest.main()